@@ -0,0 +1,36 @@
+"""
+Native async versions of the hottest views, chosen with ``ASYNC_VIEWS``.
+
+Under ASGI a sync view runs in a worker thread; the async versions run on
+the event loop and only leave it for database queries. They subclass the
+sync views and reuse their validation, session and message handling, so
+the sync views stay the fallback for WSGI (where an async view would need
+an event loop per request). URLconfs pick the class with ``pick`` when
+they are imported; ``core.testing.use_async_views`` switches them in
+tests and benchmarks.
+"""
+import inspect
+
+from django.conf import settings
+
+
+class AsyncViewMixin:
+    """
+    Loads the user, and with it the session, before the sync ``dispatch``
+    runs, so the login checks and session reads inherited from the sync
+    view no longer query the database. All handlers must be coroutines.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        response = super().dispatch(request, *args, **kwargs)
+        # The sync checks return a redirect, the handlers a coroutine
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+
+def pick(sync_view, async_view):
+    """``async_view`` when ``ASYNC_VIEWS`` is set, otherwise ``sync_view``"""
+    return async_view if getattr(settings, 'ASYNC_VIEWS', False) else sync_view
+
@@ -0,0 +1,30 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+
+Benchmarks run against the configured database inside a transaction that
+is always rolled back, so they can be pointed at a development database
+without leaving fixtures behind.
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def rolled_back(using=None):
+    """Run the block in a transaction and roll it back afterwards"""
+    with transaction.atomic(using=using):
+        yield
+        transaction.set_rollback(True, using=using)
+
+
+@contextmanager
+def timer():
+    """Yield a dict whose ``seconds`` key is filled when the block exits"""
+    result = {'seconds': 0.0}
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - started
@@ -0,0 +1,160 @@
+"""
+Streaming CSV exports shared by the apps' ``exports`` modules.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` and
+written one at a time, so no model instances are created and memory use
+does not grow with the table. Each app declares its exports as
+``CSVExport`` subclasses; they register themselves by ``name`` for the
+``export_csv`` command and are served by ``CSVExportView``.
+"""
+import csv
+import datetime
+from decimal import Decimal
+
+from django import forms
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+from django.views import View
+
+from mixins import AdminRequiredMixin
+
+registry = {}
+
+
+class Echo:
+    """File-like object whose ``write`` hands the CSV line back"""
+
+    def write(self, value):
+        return value
+
+
+class ExportFilterForm(forms.Form):
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    status = forms.CharField(required=False)
+
+    def __init__(self, *args, export_class=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.export_class = export_class
+
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        if status and status not in self.export_class.status_choices():
+            raise forms.ValidationError(f'Unknown status: {status}')
+        return status
+
+
+class CSVExport:
+    """
+    One CSV export.
+
+    ``columns`` are ``(header, lookup)`` pairs read with ``values_list``;
+    ``date_field`` and ``status_field`` name the lookups the date-range and
+    status filters apply to. Columns listed in ``total_columns`` are summed
+    while streaming and written as a last row.
+    """
+    name = None
+    columns = ()
+    date_field = None
+    status_field = None
+    total_columns = ()
+    chunk_size = 2000
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.name:
+            registry[cls.name] = cls
+
+    def __init__(self, date_from=None, date_to=None, status=None):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.status = status
+
+    def get_queryset(self):
+        raise NotImplementedError('Exports must implement get_queryset()')
+
+    @classmethod
+    def status_choices(cls):
+        return {}
+
+    def filtered_queryset(self):
+        queryset = self.get_queryset()
+        if self.date_field and self.date_from:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': self._start_of(self.date_from)})
+        if self.date_field and self.date_to:
+            # Inclusive end date, as a range on the column so indexes apply
+            end = self._start_of(self.date_to + datetime.timedelta(days=1))
+            queryset = queryset.filter(**{f'{self.date_field}__lt': end})
+        if self.status_field and self.status not in (None, ''):
+            queryset = queryset.filter(**{self.status_field: self.status})
+        return queryset
+
+    def rows(self):
+        lookups = [lookup for _, lookup in self.columns]
+        return self.filtered_queryset().values_list(*lookups).iterator(chunk_size=self.chunk_size)
+
+    def stream(self):
+        """Yield the CSV a line at a time, starting with a BOM for Excel"""
+        writer = csv.writer(Echo())
+        totals = {index: 0 for index, (header, _) in enumerate(self.columns) if header in self.total_columns}
+        yield '\ufeff' + writer.writerow([header for header, _ in self.columns])
+        for row in self.rows():
+            for index in totals:
+                totals[index] += row[index] or 0
+            yield writer.writerow([self.format_value(value) for value in row])
+        if totals:
+            yield writer.writerow([
+                self.format_value(totals[index]) if index in totals else ('جمع' if index == 0 else '')
+                for index in range(len(self.columns))
+            ])
+
+    def write_to(self, file):
+        """Write the export to an open text file; returns the data row count"""
+        count = -1
+        for line in self.stream():
+            file.write(line)
+            count += 1
+        return count - (1 if self.total_columns else 0)
+
+    def filename(self):
+        return f'{self.name}-{timezone.localdate():%Y%m%d}.csv'
+
+    @staticmethod
+    def format_value(value):
+        if value is None:
+            return ''
+        if isinstance(value, datetime.datetime):
+            return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(value, Decimal):
+            return format(value, 'f')
+        if isinstance(value, bool):
+            return int(value)
+        return value
+
+    @staticmethod
+    def _start_of(date):
+        return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def get_export(name):
+    """Return the export class registered as ``name`` (``None`` if unknown)"""
+    autodiscover_modules('exports')
+    return registry.get(name)
+
+
+class CSVExportView(AdminRequiredMixin, View):
+    """Stream a registered export as a CSV download, filtered by the query string"""
+
+    def get(self, request, name):
+        export_class = get_export(name)
+        if export_class is None:
+            raise Http404(f'No export named {name!r}')
+        form = ExportFilterForm(request.GET, export_class=export_class)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+
+        export = export_class(**form.cleaned_data)
+        response = StreamingHttpResponse(export.stream(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{export.filename()}"'
+        return response
@@ -0,0 +1,109 @@
+"""
+Batched deletion of stale rows, shared by the apps' ``purges`` modules.
+
+Each app declares what may be deleted as ``Purge`` subclasses; they
+register themselves by ``name`` for the ``purge_stale_data`` command,
+which cron runs on one host, e.g. every six hours with ``flock`` so a slow
+run is never overlapped by the next:
+
+    0 */6 * * * flock -n /tmp/purge.lock python manage.py purge_stale_data
+
+Rows are deleted in primary-key ranges of at most ``batch_size`` rows,
+each in its own short transaction, so a large purge never holds the write
+lock for long (SQLite has one lock for the whole database).
+"""
+import datetime
+import time
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+registry = {}
+
+
+@dataclass(frozen=True)
+class PurgeResult:
+    name: str
+    rows: int
+    seconds: float
+    dry_run: bool = False
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class Purge:
+    """
+    One kind of stale row. ``get_queryset`` returns the rows to delete,
+    usually older than ``days`` (see ``cutoff``).
+    """
+    name = None
+    default_days = 30
+    batch_size = 1000
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.name:
+            registry[cls.name] = cls
+
+    def __init__(self, days=None, batch_size=None):
+        self.days = self.default_days if days is None else days
+        self.batch_size = batch_size or self.batch_size
+
+    def get_queryset(self):
+        raise NotImplementedError('Purges must implement get_queryset()')
+
+    def cutoff(self):
+        return timezone.now() - datetime.timedelta(days=self.days)
+
+    def run(self, dry_run=False, pause=0):
+        """Delete the rows batch by batch and return a ``PurgeResult``"""
+        started = time.perf_counter()
+        if dry_run:
+            rows = self.get_queryset().count()
+        else:
+            rows = 0
+            for deleted in self.delete_batches():
+                rows += deleted
+                if pause:
+                    time.sleep(pause)
+        return PurgeResult(self.name, rows, time.perf_counter() - started, dry_run)
+
+    def delete_batches(self):
+        """
+        Walk the candidates in primary-key order and delete each range of
+        ``batch_size`` of them, re-checking the condition inside the range;
+        yields the rows deleted per batch.
+        """
+        queryset = self.get_queryset()
+        model = queryset.model
+        last = None
+        while True:
+            candidates = queryset.order_by('pk')
+            if last is not None:
+                candidates = candidates.filter(pk__gt=last)
+            pks = list(candidates.values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                return
+            with transaction.atomic():
+                batch = queryset.filter(pk__gte=pks[0], pk__lte=pks[-1])
+                yield batch.delete()[1].get(model._meta.label, 0)
+            last = pks[-1]
+
+
+def get_purges(names=None):
+    """Registered purge classes in registration order, optionally only ``names``"""
+    autodiscover_modules('purges')
+    if not names:
+        return list(registry.values())
+    unknown = set(names) - set(registry)
+    if unknown:
+        raise KeyError(', '.join(sorted(unknown)))
+    return [registry[name] for name in names]
+
+
+def run_purges(names=None, days=None, dry_run=False, pause=0):
+    return [purge_class(days=days).run(dry_run=dry_run, pause=pause) for purge_class in get_purges(names)]
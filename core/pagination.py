@@ -0,0 +1,213 @@
+"""
+Keyset (cursor) pagination for list views.
+
+OFFSET pagination makes the database walk and discard every row before
+the page, and Django's ``Paginator`` adds a ``COUNT(*)`` on each request,
+so deep pages over a large table get linearly slower. A keyset paginator
+instead remembers the sort key of the last row shown and asks for rows
+after it (``WHERE (name, id) > (last_name, last_id)``), which an index on
+the ordering serves in constant time on any page.
+
+Cursors are signed, opaque tokens, so they cannot be forged to seek on
+arbitrary values.
+"""
+import hashlib
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connections, models
+from django.http import Http404
+
+CURSOR_SALT = 'core.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """One page of results, with cursors for its neighbours"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None, count=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` on ``ordering``, which must end in a unique field
+    (``('name', 'id')`` or ``('-id',)``) so every row has a distinct key.
+
+    ``count`` is ``None`` (no count, the default), ``'exact'`` or
+    ``'approximate'``: the planner's row estimate for an unfiltered table
+    on PostgreSQL, otherwise an exact count cached for
+    ``PAGINATION_COUNT_TIMEOUT`` seconds.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-id',), count=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.count_mode = count
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    def page(self, cursor=None):
+        if cursor:
+            direction, values = self.decode(cursor)
+        else:
+            direction, values = 'next', None
+
+        backwards = direction == 'previous'
+        ordering = [self._flip(field) for field in self.ordering] if backwards else self.ordering
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+        rows = list(queryset[:self.per_page + 1])
+
+        has_more = len(rows) > self.per_page
+        if backwards and not has_more:
+            # Paged back to the start; show a full first page
+            return self.page()
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self.encode('next', rows[-1])
+            if values is not None and (has_more or not backwards):
+                previous_cursor = self.encode('previous', rows[0])
+        return KeysetPage(rows, self, next_cursor, previous_cursor, self.count())
+
+    def count(self):
+        if self.count_mode == 'exact':
+            return self.queryset.count()
+        if self.count_mode == 'approximate':
+            return self._approximate_count()
+        return None
+
+    def encode(self, direction, row):
+        values = [self._value(row, field) for field in self.fields]
+        return signing.dumps([direction[0], values], salt=CURSOR_SALT, compress=True)
+
+    def decode(self, cursor):
+        try:
+            direction, values = signing.loads(cursor, salt=CURSOR_SALT)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise InvalidCursor('Invalid cursor')
+        if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor('Cursor does not match this listing')
+        return ('next' if direction == 'n' else 'previous'), values
+
+    def _seek(self, values, backwards):
+        """
+        Rows strictly after ``values`` in the ordering: for (a, b) that is
+        ``a > x OR (a = x AND b > y)``, with each comparison flipped for
+        descending fields and again when paging backwards.
+        """
+        steps = []
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith('-') != backwards
+            step = models.Q(**{f'{self.fields[index]}__{"lt" if descending else "gt"}': values[index]})
+            for previous, value in zip(self.fields[:index], values):
+                step &= models.Q(**{previous: value})
+            steps.append(step)
+        return reduce(operator.or_, steps)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _value(row, field):
+        value = row[field] if isinstance(row, dict) else getattr(row, field)
+        if not isinstance(value, (str, int, float, bool, type(None))):
+            value = str(value)
+        return value
+
+    def _approximate_count(self):
+        connection = connections[self.queryset.db]
+        query = self.queryset.query
+        if connection.vendor == 'postgresql' and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [self.queryset.model._meta.db_table],
+                )
+                estimate = cursor.fetchone()[0]
+            if estimate >= 0:
+                return estimate
+        sql, params = query.sql_with_params()
+        key = 'pagination:count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.queryset.count()
+            cache.set(key, count, getattr(settings, 'PAGINATION_COUNT_TIMEOUT', 300))
+        return count
+
+
+class KeysetPaginationMixin:
+    """
+    ``ListView`` mixin offering keyset pagination next to the default
+    numbered pages. It is used when ``pagination_mode`` is ``'keyset'`` or
+    the request asks for it with ``?paging=keyset`` or carries a
+    ``cursor``; the template then gets ``keyset_pagination`` and a
+    ``page_obj`` with ``next_cursor``/``previous_cursor``. Return ``None``
+    from ``get_keyset_ordering`` (e.g. for ranked search results) to keep
+    numbered pages.
+    """
+    pagination_mode = 'offset'
+    keyset_ordering = ('-id',)
+    keyset_count = None
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def uses_keyset(self):
+        if self.get_keyset_ordering() is None:
+            return False
+        return (
+            self.pagination_mode == 'keyset'
+            or self.request.GET.get('paging') == 'keyset'
+            or self.cursor_kwarg in self.request.GET
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.uses_keyset():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(
+            queryset, page_size, ordering=self.get_keyset_ordering(), count=self.keyset_count,
+        )
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['keyset_pagination'] = self.uses_keyset()
+        return context
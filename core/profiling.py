@@ -0,0 +1,199 @@
+"""
+Per-request SQL profiling, enabled with ``QUERY_PROFILER_ENABLED``.
+
+``QueryProfilerMiddleware`` times every query of a request through a
+database execute wrapper, adds a ``Server-Timing`` header and appends one
+JSON line per request to a rotating log: view name, query count, database
+time and the queries run more than once (an N+1 usually shows up as one
+fingerprint repeated per row). ``query_report`` aggregates the log. When
+the setting is off the middleware removes itself from the stack.
+"""
+import functools
+import json
+import logging
+import re
+import statistics
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from logging.handlers import MemoryHandler, RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Placeholder lists, as in ``IN (%s, %s, %s)``, so IN lists of any length match
+PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+NUMBER = re.compile(r'\b\d+\b')
+# Duplicated fingerprints logged per request
+MAX_DUPLICATES = 10
+
+_loggers = {}
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """The query with literal numbers and placeholder lists collapsed"""
+    return NUMBER.sub('N', PLACEHOLDER_LIST.sub('(...)', sql))
+
+
+def log_path():
+    return Path(getattr(settings, 'QUERY_PROFILER_LOG', Path(settings.BASE_DIR) / 'logs' / 'queries.log'))
+
+
+def get_profile_logger():
+    """
+    A logger writing bare lines to the rotating ``QUERY_PROFILER_LOG``,
+    buffered in memory and written ``QUERY_PROFILER_LOG_BUFFER`` at a time
+    """
+    path = log_path()
+    if path not in _loggers:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            path, delay=True, encoding='utf-8',
+            maxBytes=getattr(settings, 'QUERY_PROFILER_LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=getattr(settings, 'QUERY_PROFILER_LOG_BACKUPS', 5),
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        buffer = MemoryHandler(getattr(settings, 'QUERY_PROFILER_LOG_BUFFER', 50), target=handler)
+        logger = logging.getLogger(f'{__name__}.{len(_loggers)}')
+        logger.handlers = [buffer]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _loggers[path] = logger
+    return _loggers[path]
+
+
+class QueryRecorder:
+    """Execute wrapper collecting ``(sql, seconds)`` for every query"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def seconds(self):
+        return sum(seconds for sql, seconds in self.queries)
+
+    def duplicates(self):
+        """``{fingerprint: count}`` of the queries run more than once, most repeated first"""
+        counts = {}
+        for sql, seconds in self.queries:
+            counts[sql] = counts.get(sql, 0) + 1
+        # Identical SQL strings are fingerprinted once
+        merged = {}
+        for sql, count in counts.items():
+            key = fingerprint(sql)
+            merged[key] = merged.get(key, 0) + count
+        repeated = sorted(((count, key) for key, count in merged.items() if count > 1), reverse=True)
+        return {key: count for count, key in repeated[:MAX_DUPLICATES]}
+
+
+class QueryProfilerMiddleware:
+    """
+    Records the queries of each request. Sync only: under ASGI Django runs
+    it in the thread the view's queries use, so async views are covered.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.logger = get_profile_logger()
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        db_ms, total_ms = recorder.seconds * 1000, elapsed * 1000
+        duplicates = recorder.duplicates()
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{len(recorder.queries)} queries, {sum(duplicates.values())} repeated", '
+            f'app;dur={total_ms:.1f}'
+        )
+        self.logger.info(json.dumps({
+            'view': self.view_name(request),
+            'method': request.method,
+            'status': response.status_code,
+            'queries': len(recorder.queries),
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'duplicates': duplicates,
+        }, ensure_ascii=False))
+        return response
+
+    @staticmethod
+    def view_name(request):
+        # Named after the URL, or the view's dotted path when it has no name
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else ''
+
+
+@dataclass
+class ViewProfile:
+    """Aggregated requests of one view"""
+    view: str
+    requests: int = 0
+    queries: list = field(default_factory=list)
+    db_ms: float = 0.0
+    repeated: int = 0
+
+    @property
+    def avg_queries(self):
+        return sum(self.queries) / self.requests if self.requests else 0.0
+
+    @property
+    def max_queries(self):
+        return max(self.queries, default=0)
+
+    @property
+    def avg_db_ms(self):
+        return self.db_ms / self.requests if self.requests else 0.0
+
+    @property
+    def p95_queries(self):
+        if len(self.queries) < 2:
+            return self.max_queries
+        return statistics.quantiles(self.queries, n=20)[-1]
+
+
+def read_profiles(path=None):
+    """Yield the logged request records, oldest rotated file first"""
+    path = Path(path or log_path())
+    backups = sorted(path.parent.glob(f'{path.name}.*'), key=lambda file: int(file.suffix[1:]), reverse=True)
+    for file in [*backups, path]:
+        if not file.exists():
+            continue
+        with file.open(encoding='utf-8') as lines:
+            for line in lines:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash or a rotation
+                    continue
+
+
+def summarize(records):
+    """``(views, duplicates)``: a ``ViewProfile`` per view and ``{(view, fingerprint): count}``"""
+    views, duplicates = {}, {}
+    for record in records:
+        profile = views.setdefault(record['view'], ViewProfile(record['view']))
+        profile.requests += 1
+        profile.queries.append(record['queries'])
+        profile.db_ms += record['db_ms']
+        for key, count in record['duplicates'].items():
+            profile.repeated += count
+            duplicates[record['view'], key] = duplicates.get((record['view'], key), 0) + count
+    return views, duplicates
@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Removes itself unless QUERY_PROFILER_ENABLED; first, so it sees every query
+    'core.profiling.QueryProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,6 +87,56 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Catalog listings; swap for FileBasedCache or Redis to share between workers
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        # One breadcrumb entry per category on top of the listings
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_ENABLED = True
+CATALOG_CACHE_TIMEOUT = 60 * 60  # safety net; signals invalidate exactly
+
+# The typeahead index lives in each worker; reload to see other workers' edits
+AUTOCOMPLETE_REFRESH_SECONDS = 5 * 60
+# Stale indexes are reloaded on a background thread; False reloads inline
+AUTOCOMPLETE_REFRESH_ASYNC = True
+
+# Recent barcode scans kept per worker; stock shown may lag by the timeout
+BARCODE_CACHE_SIZE = 5000
+BARCODE_CACHE_TIMEOUT = 10
+
+# Image derivatives are made on a background thread pool of this size;
+# set THUMBNAIL_ASYNC = False to make them inline
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+# Pages re-check storage for derivatives still missing after this many seconds
+THUMBNAIL_MISSING_TIMEOUT = 60
+
+# Search ranks at most this many products; pages say when more matched
+SEARCH_MAX_RESULTS = 1000
+
+# Approximate list counts on keyset pages are cached this long
+PAGINATION_COUNT_TIMEOUT = 5 * 60
+
+# Stale OTPs and carts are purged by ``purge_stale_data`` from cron on one
+# host (see core/maintenance.py); it sleeps this long between batches
+MAINTENANCE_BATCH_PAUSE = 0.05
+
+# Dashboard counters that scan products/orders are recomputed at most this often
+DASHBOARD_CACHE_TIMEOUT = 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -150,6 +202,37 @@ OTP_EXPIRE_MINUTES = 5
 OTP_MAX_ATTEMPTS = 3
 OTP_RATE_LIMIT_MINUTES = 2
 OTP_MAX_REQUESTS_PER_PERIOD = 3
+# users.otp.DatabaseOTPBackend or users.otp.CacheOTPBackend; the cache
+# backend needs OTP_CACHE_ALIAS to be shared by all workers (Redis, Memcached)
+OTP_BACKEND = 'users.otp.DatabaseOTPBackend'
+OTP_CACHE_ALIAS = 'default'
+
+# SMS outbox: messages are sent by a background worker through SMS_PROVIDER
+# (ConsoleSMSProvider prints them and only runs with DEBUG; set a real
+# provider in production); SMS_ASYNC = False sends them inline
+SMS_PROVIDER = 'users.sms.ConsoleSMSProvider'
+SMS_PROVIDER_OPTIONS = {}
+SMS_ASYNC = True
+SMS_BATCH_SIZE = 50
+SMS_MAX_ATTEMPTS = 5
+SMS_RETRY_DELAY = 30  # seconds, doubled after every failed attempt
+SMS_LEASE_SECONDS = 60
+SMS_POLL_INTERVAL = 5
+
+# Serve the login, add-to-cart, cart summary and product detail views with
+# their native async versions; enable when running under ASGI (core.asgi)
+ASYNC_VIEWS = False
+
+# Per-request SQL profiling: Server-Timing headers and a rotating JSON-lines
+# log summarized by the query_report command
+QUERY_PROFILER_ENABLED = False
+QUERY_PROFILER_LOG = BASE_DIR / 'logs' / 'queries.log'
+QUERY_PROFILER_LOG_MAX_BYTES = 10 * 1024 * 1024
+QUERY_PROFILER_LOG_BACKUPS = 5
+QUERY_PROFILER_LOG_BUFFER = 50  # requests held in memory between writes
+
+# Order Settings
+ORDER_NUMBER_GENERATOR = 'orders.numbering.SequenceOrderNumberGenerator'
 
 CSRF_TRUSTED_ORIGINS = [
     'http://localhost:8000',
@@ -0,0 +1,54 @@
+"""
+Test helpers shared by the apps' test suites.
+"""
+import importlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse, set_urlconf
+
+# URL modules that call ``core.asyncviews.pick``, reloaded by ``use_async_views``
+URLCONFS = ('users.urls', 'orders.urls', 'products.urls')
+
+
+class ChangelistQueryBudgetMixin:
+    """
+    ``TestCase`` mixin that renders a Django admin changelist and fails if it
+    runs more than a fixed number of queries. Use it with more rows than
+    the budget, so a per-row lazy load (an N+1) cannot fit in it. The test
+    client must be logged in as a superuser.
+    """
+
+    def assertChangelistQueries(self, model, max_queries, params=None):
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{model.__name__} changelist ran {len(queries)} queries (budget {max_queries}):\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+        return response
+
+
+@contextmanager
+def use_async_views(enabled=True):
+    """Re-import the URLconfs with ``ASYNC_VIEWS = enabled`` for the duration of the block"""
+    try:
+        with override_settings(ASYNC_VIEWS=enabled):
+            _reload_urlconfs()
+            yield
+    finally:
+        _reload_urlconfs()
+
+
+def _reload_urlconfs():
+    for name in URLCONFS:
+        importlib.reload(importlib.import_module(name))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+    set_urlconf(None)
@@ -3,11 +3,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static 
 
+from core.exports import CSVExportView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls')),
     path('', include('products.urls')),
     path('orders/', include('orders.urls')),
+    path('dashboard/exports/<slug:name>.csv', CSVExportView.as_view(), name='csv_export'),
 ]
 
 if settings.DEBUG:
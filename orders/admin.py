@@ -2,7 +2,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import Cart, CartItem, Order, OrderItem, OrderStatusHistory
+from .services import CartPricingService
+from .models import Cart, CartItem, DailySales, Order, OrderItem, OrderStatusHistory
 
 
 @admin.register(Cart)
@@ -12,13 +13,19 @@ class CartAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__email', 'user__first_name', 'user__last_name', 'user__phone_number')
     readonly_fields = ('created_at', 'updated_at')
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user').with_totals()
+    
     def total_items_display(self, obj):
-        return obj.total_items
+        return obj.items_total
     total_items_display.short_description = 'تعداد اقلام'
+    total_items_display.admin_order_field = 'items_total'
     
     def subtotal_display(self, obj):
-        return f"{obj.subtotal_price:,} ریال"
+        totals = CartPricingService.build_totals(obj.gross_cents_total, obj.net_cents_total, obj.items_total)
+        return f"{totals.discounted_subtotal:,} ریال"
     subtotal_display.short_description = 'جمع کل'
+    subtotal_display.admin_order_field = 'net_cents_total'
 
 
 @admin.register(CartItem)
@@ -27,6 +34,7 @@ class CartItemAdmin(admin.ModelAdmin):
     list_filter = ('created_at', 'updated_at')
     search_fields = ('product__name', 'product__sku', 'cart__user__username', 'cart__user__phone_number')
     readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('cart__user', 'product')
     
     def cart_user(self, obj):
         return obj.cart.user.get_full_name() or obj.cart.user.phone_number
@@ -51,15 +59,29 @@ class OrderStatusHistoryInline(admin.TabularInline):
     fields = ('previous_status', 'new_status', 'changed_by', 'notes', 'created_at')
 
 
+class NeedsProcessingFilter(admin.SimpleListFilter):
+    title = 'نیاز به پردازش'
+    parameter_name = 'needs_processing'
+    
+    def lookups(self, request, model_admin):
+        return (('1', 'بله'),)
+    
+    def queryset(self, request, queryset):
+        if self.value() == '1':
+            return queryset.needs_processing()
+        return queryset
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('order_number', 'user_display', 'status_display', 'payment_status_display', 
                    'total_amount_display', 'created_at')
-    list_filter = ('status', 'payment_status', 'created_at', 'updated_at')
+    list_filter = (NeedsProcessingFilter, 'status', 'payment_status', 'created_at', 'updated_at')
     search_fields = ('order_number', 'user__username', 'user__email', 'user__phone_number', 
                     'customer_name', 'customer_phone')
     readonly_fields = ('order_number', 'created_at', 'updated_at', 'confirmed_at', 
                       'shipped_at', 'delivered_at')  # Fixed: removed 'subtotal_display'
+    list_select_related = ('user',)
     
     fieldsets = (
         ('اطلاعات سفارش', {
@@ -134,6 +156,7 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_filter = ('created_at', 'order__status', 'order__payment_status')
     search_fields = ('order__order_number', 'product__name', 'product__sku', 'product_name', 'product_sku')
     readonly_fields = ('line_total', 'created_at')  # Fixed: use actual field name
+    list_select_related = ('order',)
     
     def order_number(self, obj):
         url = reverse('admin:orders_order_change', args=[obj.order.pk])
@@ -159,6 +182,7 @@ class OrderStatusHistoryAdmin(admin.ModelAdmin):
     list_filter = ('new_status', 'created_at')
     search_fields = ('order__order_number', 'changed_by__username', 'notes')
     readonly_fields = ('created_at',)
+    list_select_related = ('order', 'changed_by')
     
     def order_number(self, obj):
         url = reverse('admin:orders_order_change', args=[obj.order.pk])
@@ -183,6 +207,26 @@ class OrderStatusHistoryAdmin(admin.ModelAdmin):
     new_status_display.short_description = 'وضعیت جدید'
 
 
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    """Read-only view of the sales rollups; rebuild them with rebuild_sales_rollups"""
+    list_display = ('date', 'order_count', 'items_sold', 'revenue_display', 'updated_at')
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def revenue_display(self, obj):
+        return f"{obj.revenue:,} ریال"
+    revenue_display.short_description = 'فروش'
+
+
 # Additional admin configurations
 admin.site.site_header = "مدیریت فروشگاه دارو"
 admin.site.site_title = "پنل مدیریت"
@@ -0,0 +1,111 @@
+# orders/dashboard.py
+import datetime
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .rollups import SalesRollup
+
+
+@dataclass(frozen=True)
+class Widget:
+    """A dashboard value and the time the data behind it was last updated"""
+    value: object
+    as_of: datetime.datetime = None
+
+
+class SalesDashboard:
+    """
+    Numbers for the staff dashboard.
+
+    Sales widgets read the daily rollups, so each is one query over at most
+    a year of day rows however many orders there are. Counters that would
+    scan the products or orders tables (low stock, orders awaiting
+    processing) are computed together and cached for
+    ``DASHBOARD_CACHE_TIMEOUT`` seconds. Every widget carries the time its
+    data was last updated.
+    """
+    counters_key = 'dashboard:counters'
+
+    def __init__(self, days=30, months=12, top=5):
+        self.days = days
+        self.months = months
+        self.top = top
+        self.today = timezone.localdate()
+
+    def build(self):
+        daily = self.daily_revenue()
+        counters = self.counters()
+        return {
+            'daily_revenue': daily,
+            'monthly_revenue': self.monthly_revenue(),
+            'top_sellers': Widget(list(SalesRollup.top_products(limit=self.top, days=self.days)), daily.as_of),
+            'average_basket': self.average_basket(daily),
+            'low_stock_count': Widget(counters['low_stock'], counters['as_of']),
+            'needs_processing_count': Widget(counters['needs_processing'], counters['as_of']),
+        }
+
+    def daily_revenue(self):
+        """``(date, revenue, orders)`` for each of the last ``days`` days, oldest first"""
+        from .models import DailySales
+
+        start = self.today - datetime.timedelta(days=self.days - 1)
+        rows = {row.date: row for row in DailySales.objects.filter(date__gte=start)}
+        days = []
+        for offset in range(self.days):
+            date = start + datetime.timedelta(days=offset)
+            row = rows.get(date)
+            days.append((date, row.revenue if row else 0, row.order_count if row else 0))
+        return Widget(days, max((row.updated_at for row in rows.values()), default=None))
+
+    def monthly_revenue(self):
+        """``(month, revenue, orders)`` for the last ``months`` months, oldest first"""
+        from .models import DailySales
+
+        year, month = divmod(self.today.year * 12 + self.today.month - self.months, 12)
+        start = datetime.date(year, month + 1, 1)
+        rows = list(
+            DailySales.objects.filter(date__gte=start)
+            .annotate(month=TruncMonth('date')).values('month')
+            .annotate(
+                revenue=models.Sum('revenue'),
+                orders=models.Sum('order_count'),
+                updated_at=models.Max('updated_at'),
+            ).order_by('month')
+        )
+        return Widget(
+            [(row['month'], row['revenue'], row['orders']) for row in rows],
+            max((row['updated_at'] for row in rows), default=None),
+        )
+
+    @staticmethod
+    def average_basket(daily):
+        revenue = sum(revenue for _, revenue, _ in daily.value)
+        orders = sum(count for _, _, count in daily.value)
+        return Widget(revenue / orders if orders else 0, daily.as_of)
+
+    def counters(self):
+        counters = cache.get(self.counters_key)
+        if counters is None:
+            counters = self.compute_counters()
+            cache.set(self.counters_key, counters, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60))
+        return counters
+
+    @staticmethod
+    def compute_counters():
+        from products.models import Product
+        from .models import Order
+
+        return {
+            'low_stock': Product.objects.low_stock().count(),
+            'needs_processing': Order.objects.needs_processing().count(),
+            'as_of': timezone.now(),
+        }
+
+    @classmethod
+    def refresh_counters(cls):
+        cache.delete(cls.counters_key)
@@ -0,0 +1,57 @@
+# orders/exports.py
+from core.exports import CSVExport
+
+from .models import Order, OrderItem
+
+
+class OrderExport(CSVExport):
+    """The order book: one row per order"""
+    name = 'orders'
+    columns = (
+        ('order_number', 'order_number'),
+        ('created_at', 'created_at'),
+        ('status', 'status'),
+        ('payment_status', 'payment_status'),
+        ('customer_name', 'customer_name'),
+        ('customer_phone', 'customer_phone'),
+        ('subtotal', 'subtotal'),
+        ('discount_amount', 'discount_amount'),
+        ('shipping_cost', 'shipping_cost'),
+        ('total_amount', 'total_amount'),
+    )
+    date_field = 'created_at'
+    status_field = 'status'
+    total_columns = ('subtotal', 'discount_amount', 'shipping_cost', 'total_amount')
+
+    @classmethod
+    def status_choices(cls):
+        return dict(Order.ORDER_STATUS_CHOICES)
+
+    def get_queryset(self):
+        return Order.objects.order_by('id')
+
+
+class OrderItemExport(CSVExport):
+    """Order lines with their order's number, date and status"""
+    name = 'order-items'
+    columns = (
+        ('order_number', 'order__order_number'),
+        ('created_at', 'order__created_at'),
+        ('status', 'order__status'),
+        ('sku', 'product_sku'),
+        ('product', 'product_name'),
+        ('unit_price', 'unit_price'),
+        ('quantity', 'quantity'),
+        ('discount_amount', 'discount_amount'),
+        ('line_total', 'line_total'),
+    )
+    date_field = 'order__created_at'
+    status_field = 'order__status'
+    total_columns = ('quantity', 'discount_amount', 'line_total')
+
+    @classmethod
+    def status_choices(cls):
+        return dict(Order.ORDER_STATUS_CHOICES)
+
+    def get_queryset(self):
+        return OrderItem.objects.order_by('order_id', 'id')
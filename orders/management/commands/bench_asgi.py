@@ -0,0 +1,107 @@
+import asyncio
+import contextlib
+import io
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from core.benchmarks import rolled_back, timer
+from core.testing import use_async_views
+from orders.models import Cart
+from products.models import Product
+from users.models import User
+from users.otp import get_otp_backend
+
+
+class Command(BaseCommand):
+    help = 'Load-test the hot views through the ASGI handler with their sync and async versions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help='Requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with rolled_back(), override_settings(ALLOWED_HOSTS=['testserver']):
+            with timer() as elapsed:
+                self.products = self._seed(options['products'], options['concurrency'], options['requests'])
+            self.stdout.write(f'{options["products"]} products generated in {elapsed["seconds"]:.1f}s')
+            self.stdout.write(f'{"endpoint":16} {"mode":6} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8}')
+
+            for endpoint in ('product_detail', 'cart_summary', 'add_to_cart', 'login'):
+                for enabled in (False, True):
+                    # The login views print debugging output
+                    with use_async_views(enabled), contextlib.redirect_stdout(io.StringIO()):
+                        seconds, latencies = async_to_sync(self._load)(
+                            getattr(self, f'_{endpoint}'), rng, options['requests'], options['concurrency'],
+                        )
+                    latencies.sort()
+                    self.stdout.write(
+                        f'{endpoint:16} {"async" if enabled else "sync":6} {len(latencies) / seconds:8.1f} '
+                        f'{statistics.median(latencies) * 1000:8.2f} '
+                        f'{latencies[int(len(latencies) * 0.99) - 1] * 1000:8.2f}'
+                    )
+
+    async def _load(self, request, rng, count, concurrency):
+        """Run ``count`` requests from ``concurrency`` clients; returns the wall time and every latency"""
+        latencies = []
+        queue = iter(range(count))
+
+        async def worker(index):
+            client = AsyncClient()
+            if index < len(self.users):
+                await client.aforce_login(self.users[index])
+            for number in queue:
+                started = time.perf_counter()
+                await request(client, rng, number)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+        return time.perf_counter() - started, latencies
+
+    async def _product_detail(self, client, rng, number):
+        response = await client.get(reverse('products:product_detail', args=[rng.choice(self.products)[1]]))
+        assert response.status_code == 200, response.status_code
+
+    async def _cart_summary(self, client, rng, number):
+        response = await client.get(reverse('orders:cart_api_summary'))
+        assert response.status_code == 200, response.status_code
+
+    async def _add_to_cart(self, client, rng, number):
+        response = await client.post(reverse('orders:add_to_cart', args=[rng.choice(self.products)[0]]))
+        assert response.status_code == 302, response.status_code
+
+    async def _login(self, client, rng, number):
+        # Two requests, timed together: phone entry and code verification
+        client, phone = AsyncClient(), self._phone(number)
+        await client.post(reverse('users:phone_entry'), {'phone_number': phone})
+        code = (await get_otp_backend().alatest(phone)).otp_code
+        response = await client.post(reverse('users:otp_verification'), {'phone_number': phone, 'otp_code': code})
+        assert response.url == reverse('users:user_dashboard'), response.url
+
+    @staticmethod
+    def _phone(number):
+        return f'0937{number:07d}'
+
+    def _seed(self, count, users, logins):
+        Product.objects.bulk_create([
+            Product(
+                name=f'محصول آزمایشی {index}', slug=f'bench-asgi-{index}', sku=f'BA-{index}',
+                unit_price=Decimal('10000'), cost_price=Decimal('6000'), quantity=1_000_000,
+            )
+            for index in range(count)
+        ])
+        self.users = User.objects.bulk_create([User(phone_number=f'0938{index:07d}') for index in range(users)])
+        Cart.objects.bulk_create([Cart(user=user) for user in self.users])
+        # Users who log in through the benchmark already have accounts
+        User.objects.bulk_create([User(phone_number=self._phone(number)) for number in range(logins)])
+        return list(Product.objects.filter(slug__startswith='bench-asgi-').values_list('id', 'slug'))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.benchmarks import rolled_back, timer
+from orders.models import Cart, CartItem
+from orders.services import OrderPlacementService
+from products.models import Product
+from users.models import User
+
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Command(BaseCommand):
+    help = 'Measure queries and writes per order as cart size grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1, 5, 10, 30, 100],
+            help='Cart sizes (number of distinct lines) to measure',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'lines':>6} {'queries':>8} {'writes':>7} {'legacy writes':>14} {'ms':>8}")
+        for size in options['sizes']:
+            with rolled_back():
+                cart = self._build_cart(size)
+                with CaptureQueriesContext(connection) as queries, timer() as elapsed:
+                    OrderPlacementService.place_order(cart, shipping_address={'title': 'bench'})
+
+            writes = sum(
+                1 for query in queries.captured_queries
+                if query['sql'].lstrip().upper().startswith(WRITE_PREFIXES)
+            )
+            # One INSERT and one product UPDATE per line, plus order,
+            # status history and cart clearing in the per-line implementation.
+            legacy_writes = 2 * size + 3
+            self.stdout.write(
+                f"{size:>6} {len(queries):>8} {writes:>7} {legacy_writes:>14} "
+                f"{elapsed['seconds'] * 1000:>8.1f}"
+            )
+
+    def _build_cart(self, size):
+        user = User.objects.create(phone_number='09000000000')
+        cart = Cart.objects.create(user=user)
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'bench-{index}', slug=f'bench-checkout-{index}', sku=f'BENCH-CHK-{index}',
+                unit_price=10000 + index, cost_price=5000, quantity=1000, discount_percent=index % 20,
+            )
+            for index in range(size)
+        ])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=1 + index % 3)
+            for index, product in enumerate(products)
+        ])
+        return cart
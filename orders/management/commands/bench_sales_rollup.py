@@ -0,0 +1,130 @@
+import datetime
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from core.benchmarks import rolled_back, timer
+from orders.models import Order, OrderItem
+from orders.rollups import SalesRollup
+from products.models import Product
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare the sales reports on the raw orders table with the daily rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=730, help='Days of history to spread orders over')
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            with timer() as elapsed:
+                self._populate(random.Random(options['seed']), options)
+            self.stdout.write(f'{options["orders"]} orders generated in {elapsed["seconds"]:.1f}s')
+
+            with timer() as elapsed:
+                days = SalesRollup.rebuild()
+            self.stdout.write(f'rebuild: {days} days in {elapsed["seconds"]:.1f}s')
+
+            today = timezone.localdate()
+            reports = [
+                ('daily sales', lambda: self._live_daily(today), lambda: SalesRollup.daily_sales(today)),
+                ('monthly sales', lambda: self._live_monthly(today), lambda: SalesRollup.monthly_sales()),
+                ('top 10, 30 days', lambda: list(self._live_top(30)), lambda: list(SalesRollup.top_products(days=30))),
+                ('top 10, 365 days', lambda: list(self._live_top(365)), lambda: list(SalesRollup.top_products(days=365))),
+            ]
+            self.stdout.write(f'{"report":18} {"orders table":>14} {"rollups":>10}')
+            for label, live, rollup in reports:
+                self.stdout.write(
+                    f'{label:18} {self._best(live, options["repeat"]):12.1f}ms {self._best(rollup, options["repeat"]):8.2f}ms'
+                )
+
+            order = Order.objects.filter(payment_status='pending').first()
+            with timer() as elapsed:
+                order.payment_status = 'paid'
+                order.save()
+            self.stdout.write(f'marking one order paid: {elapsed["seconds"] * 1000:.1f}ms')
+
+    @staticmethod
+    def _best(func, repeat):
+        best = None
+        for _ in range(repeat):
+            with timer() as elapsed:
+                func()
+            best = elapsed['seconds'] if best is None else min(best, elapsed['seconds'])
+        return best * 1000
+
+    # The manager queries as they were before the rollups
+    @staticmethod
+    def _live_daily(date):
+        return Order.objects.filter(created_at__date=date, payment_status='paid').aggregate(
+            total=models.Sum('total_amount'),
+        )['total'] or 0
+
+    @staticmethod
+    def _live_monthly(date):
+        return Order.objects.filter(
+            created_at__year=date.year, created_at__month=date.month, payment_status='paid',
+        ).aggregate(total=models.Sum('total_amount'), count=models.Count('id'))
+
+    @staticmethod
+    def _live_top(days):
+        return OrderItem.objects.filter(
+            order__created_at__gte=timezone.now() - datetime.timedelta(days=days),
+            order__payment_status='paid',
+        ).values('product__name', 'product__sku').annotate(
+            total_quantity=models.Sum('quantity'), total_revenue=models.Sum('line_total'),
+        ).order_by('-total_quantity')[:10]
+
+    def _populate(self, rng, options):
+        user = User.objects.create(phone_number='09000000000')
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'bench-{index}', slug=f'bench-rollup-{index}', sku=f'BENCH-ROLL-{index}',
+                unit_price=10000 + index * 100, cost_price=5000, quantity=0,
+            )
+            for index in range(options['products'])
+        ])
+        per_day = max(1, options['orders'] // options['days'])
+        batch_size = 5000
+        for start in range(0, options['orders'], batch_size):
+            count = min(batch_size, options['orders'] - start)
+            baskets = [
+                [(product, rng.randint(1, 4)) for product in rng.sample(products, rng.randint(1, 3))]
+                for _ in range(count)
+            ]
+            orders = Order.objects.bulk_create([
+                Order(
+                    order_number=f'B{start + index:012d}', user=user,
+                    status='delivered', payment_status='paid' if rng.random() < 0.8 else 'pending',
+                    subtotal=total, total_amount=total, shipping_address={},
+                    customer_phone=user.phone_number, customer_name='bench',
+                )
+                for index, total in enumerate(
+                    sum(product.unit_price * quantity for product, quantity in basket) for basket in baskets
+                )
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order, product=product, product_name=product.name, product_sku=product.sku,
+                    unit_price=product.unit_price, quantity=quantity, line_total=product.unit_price * quantity,
+                )
+                for order, basket in zip(orders, baskets)
+                for product, quantity in basket
+            ])
+            self.stdout.write(f'{start + count} orders', ending='\r')
+        self.stdout.write('')
+
+        # auto_now_add stamps every row with now; spread the orders back in time
+        ids = list(Order.objects.filter(user=user).order_by('id').values_list('id', flat=True)[::per_day])
+        now = timezone.now()
+        for day, first_id in enumerate(ids):
+            Order.objects.filter(id__gte=first_id, id__lt=first_id + per_day).update(
+                created_at=now - datetime.timedelta(days=day),
+            )
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.maintenance import get_purges, registry
+
+
+class Command(BaseCommand):
+    help = 'Delete used/expired OTPs, old SMS, abandoned cart items and old empty carts in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Purges to run (all by default)')
+        parser.add_argument('--days', type=int, help="Age in days, instead of each purge's default")
+        parser.add_argument('--batch-size', type=int, help='Rows per DELETE')
+        parser.add_argument(
+            '--pause', type=float, default=getattr(settings, 'MAINTENANCE_BATCH_PAUSE', 0),
+            help='Seconds to sleep between batches',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted')
+
+    def handle(self, *args, **options):
+        try:
+            purges = get_purges(options['names'])
+        except KeyError as error:
+            raise CommandError(f'Unknown purge {error}; choose from {", ".join(registry)}')
+
+        for purge_class in purges:
+            purge = purge_class(days=options['days'], batch_size=options['batch_size'])
+            result = purge.run(dry_run=options['dry_run'], pause=options['pause'])
+            if result.dry_run:
+                self.stdout.write(f'{result.name:12} {result.rows} rows older than {purge.days} days would be deleted')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{result.name:12} {result.rows} rows deleted in {result.seconds:.2f}s '
+                    f'({result.rows_per_second:.0f} rows/s)'
+                ))
@@ -0,0 +1,17 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from orders.rollups import SalesRollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollups from the orders table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=datetime.date.fromisoformat, help='YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', type=datetime.date.fromisoformat, help='YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        days = SalesRollup.rebuild(date_from=options['date_from'], date_to=options['date_to'])
+        self.stdout.write(self.style.SUCCESS(f'{days} days of sales rebuilt'))
@@ -0,0 +1,60 @@
+import datetime
+import multiprocessing
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from orders.models import OrderNumberSequence
+from orders.numbering import get_order_number_generator
+
+
+# A date no real order uses, so the stress run never touches live counters
+STRESS_DATE = datetime.date(2000, 1, 1)
+
+
+def _generate_batch(count):
+    connections.close_all()
+    generator = get_order_number_generator()
+    numbers = []
+    while len(numbers) < count:
+        try:
+            numbers.append(generator.generate(for_date=STRESS_DATE))
+        except OperationalError:
+            # SQLite reports a busy database instead of waiting forever
+            time.sleep(random.uniform(0, 0.01))
+    connections.close_all()
+    return numbers
+
+
+class Command(BaseCommand):
+    help = 'Generate order numbers from several processes and check none collide'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100_000, help='Total numbers to generate')
+        parser.add_argument('--processes', type=int, default=8, help='Number of worker processes')
+
+    def handle(self, *args, **options):
+        count, processes = options['count'], options['processes']
+        batches = [count // processes + (1 if index < count % processes else 0) for index in range(processes)]
+
+        OrderNumberSequence.objects.filter(date=STRESS_DATE).delete()
+        connections.close_all()
+        started = time.perf_counter()
+        try:
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                numbers = [number for batch in pool.map(_generate_batch, batches) for number in batch]
+        finally:
+            OrderNumberSequence.objects.filter(date=STRESS_DATE).delete()
+        elapsed = time.perf_counter() - started
+
+        unique = len(set(numbers))
+        self.stdout.write(
+            f'{len(numbers)} numbers from {processes} processes in {elapsed:.1f}s '
+            f'({len(numbers) / elapsed:.0f}/s), {unique} unique'
+        )
+        if unique != count:
+            raise CommandError(f'{count - unique} duplicate order numbers generated')
+        last = max(numbers, key=lambda number: int(number.rsplit('-', 1)[1]))
+        self.stdout.write(self.style.SUCCESS(f'Last number: {last}'))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberSequence',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'شمارنده شماره سفارش',
+                'verbose_name_plural': 'شمارنده\u200cهای شماره سفارش',
+                'db_table': 'order_number_sequences',
+            },
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    # A frozen copy of SalesRollup.rebuild() for all dates
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    DailySales = apps.get_model('orders', 'DailySales')
+    DailyProductSales = apps.get_model('orders', 'DailyProductSales')
+
+    items = OrderItem.objects.filter(order__payment_status='paid')
+    item_totals = dict(
+        items.annotate(day=TruncDate('order__created_at')).values('day')
+        .annotate(total=models.Sum('quantity')).values_list('day', 'total')
+    )
+    now = django.utils.timezone.now()
+    DailySales.objects.bulk_create([
+        DailySales(
+            date=row['day'],
+            order_count=row['order_count'],
+            items_sold=item_totals.get(row['day']) or 0,
+            revenue=row['revenue'],
+            discount_amount=row['discount'],
+            updated_at=now,
+        )
+        for row in Order.objects.filter(payment_status='paid').annotate(day=TruncDate('created_at')).values('day')
+        .annotate(
+            order_count=models.Count('id'), revenue=models.Sum('total_amount'), discount=models.Sum('discount_amount'),
+        ).order_by()
+    ], batch_size=2000)
+
+    batch = []
+    product_rows = items.annotate(day=TruncDate('order__created_at')).values('day', 'product_id').annotate(
+        quantity=models.Sum('quantity'), revenue=models.Sum('line_total'),
+    ).order_by()
+    for row in product_rows.iterator(chunk_size=2000):
+        batch.append(DailyProductSales(
+            date=row['day'], product_id=row['product_id'], quantity=row['quantity'], revenue=row['revenue'],
+        ))
+        if len(batch) >= 2000:
+            DailyProductSales.objects.bulk_create(batch)
+            batch = []
+    DailyProductSales.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_number_sequence'),
+        ('products', '0006_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('order_count', models.IntegerField(default=0)),
+                ('items_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('discount_amount', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'فروش روزانه',
+                'verbose_name_plural': 'فروش روزانه',
+                'db_table': 'daily_sales',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'فروش روزانه محصول',
+                'verbose_name_plural': 'فروش روزانه محصولات',
+                'db_table': 'daily_product_sales',
+                'unique_together': {('date', 'product')},
+            },
+        ),
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,12 @@
 # orders/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from django.utils import timezone
+from .managers import (
+    CartItemQuerySet, CartQuerySet, OrderItemManager, OrderManager, OrderStatusHistoryQuerySet,
+)
+from .services import CartPricingService
 
 User = get_user_model()
 
@@ -13,6 +17,8 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CartQuerySet.as_manager()
+    
     class Meta:
         db_table = 'carts'
         verbose_name = 'سبد خرید'
@@ -31,10 +37,7 @@ class Cart(models.Model):
     @property
     def subtotal_price(self):
         """Calculate subtotal price of cart"""
-        total = Decimal('0')
-        for item in self.items.select_related('product'):
-            total += item.line_total
-        return total
+        return self.get_totals().discounted_subtotal
     
     @property
     def is_empty(self):
@@ -47,13 +50,11 @@ class Cart(models.Model):
         
     def get_total_discount(self):
         """Calculate total discount amount"""
-        total_discount = Decimal('0')
-        for item in self.items.select_related('product'):
-            if item.product.has_discount:
-                original_price = item.product.unit_price * item.quantity
-                discounted_price = item.line_total
-                total_discount += (original_price - discounted_price)
-        return total_discount
+        return self.get_totals().discount_amount
+    
+    def get_totals(self):
+        """Get subtotal, discount, shipping and item count in one query"""
+        return CartPricingService.get_totals(self)
 
 
 class CartItem(models.Model):
@@ -64,6 +65,8 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CartItemQuerySet.as_manager()
+    
     class Meta:
         db_table = 'cart_items'
         verbose_name = 'آیتم سبد خرید'
@@ -160,7 +163,7 @@ class Order(models.Model):
     shipped_at = models.DateTimeField(null=True, blank=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
     
-    objects = models.Manager()  # We'll add custom manager in managers.py
+    objects = OrderManager()
     
     class Meta:
         db_table = 'orders'
@@ -177,23 +180,47 @@ class Order(models.Model):
             self.customer_name = self.user.get_full_name()
         if not self.customer_phone:
             self.customer_phone = self.user.phone_number
-            
-        super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'payment_status' not in update_fields:
+            return super().save(*args, **kwargs)
+        
+        # Paid orders are counted in the daily sales rollups
+        from .rollups import SalesRollup
+        is_paid = self.payment_status == 'paid'
+        with transaction.atomic():
+            if self._state.adding:
+                super().save(*args, **kwargs)
+                changed = is_paid
+            else:
+                changed = self._switch_payment_status(self.payment_status)
+                super().save(*args, **kwargs)
+            if changed:
+                SalesRollup.record(self, sign=1 if is_paid else -1)
+    
+    def delete(self, *args, **kwargs):
+        from .rollups import SalesRollup
+        with transaction.atomic():
+            if self.pk is not None and self._switch_payment_status('refunded'):
+                SalesRollup.reverse(self)
+            return super().delete(*args, **kwargs)
+    
+    def _switch_payment_status(self, status):
+        """
+        Whether the stored row moved into or out of ``paid``, decided by a
+        conditional UPDATE to ``status``. The row stays locked until the
+        transaction ends, so of two saves racing on the same order only one
+        sees the change and counts it in the rollups.
+        """
+        rows = type(self).objects.filter(pk=self.pk)
+        if status == 'paid':
+            return bool(rows.exclude(payment_status='paid').update(payment_status=status))
+        return bool(rows.filter(payment_status='paid').update(payment_status=status))
     
     def generate_order_number(self):
         """Generate unique order number"""
-        import random
-        import string
-        from datetime import datetime
-        
-        # Ensure uniqueness
-        while True:
-            date_part = datetime.now().strftime('%y%m%d')
-            random_part = ''.join(random.choices(string.digits, k=4))
-            order_number = f"ORD-{date_part}-{random_part}"
-            
-            if not Order.objects.filter(order_number=order_number).exists():
-                return order_number
+        from .numbering import get_order_number_generator
+        return get_order_number_generator().generate()
     
     def __str__(self):
         return f"سفارش {self.order_number}"
@@ -240,6 +267,8 @@ class OrderItem(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = OrderItemManager()
+    
     class Meta:
         db_table = 'order_items'
         unique_together = ['order', 'product']
@@ -271,6 +300,8 @@ class OrderStatusHistory(models.Model):
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = OrderStatusHistoryQuerySet.as_manager()
+    
     class Meta:
         db_table = 'order_status_history'
         ordering = ['-created_at']
@@ -279,3 +310,57 @@ class OrderStatusHistory(models.Model):
     
     def __str__(self):
         return f"{self.order.order_number}: {self.previous_status} → {self.new_status}"
+
+
+class OrderNumberSequence(models.Model):
+    """Per-day counter backing sequential order numbers"""
+    date = models.DateField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'order_number_sequences'
+        verbose_name = 'شمارنده شماره سفارش'
+        verbose_name_plural = 'شمارنده‌های شماره سفارش'
+    
+    def __str__(self):
+        return f"{self.date}: {self.last_value}"
+
+
+class DailySales(models.Model):
+    """Totals of the orders paid for each day, maintained by ``SalesRollup``"""
+    date = models.DateField(primary_key=True)
+    order_count = models.IntegerField(default=0)
+    items_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'daily_sales'
+        ordering = ['-date']
+        verbose_name = 'فروش روزانه'
+        verbose_name_plural = 'فروش روزانه'
+    
+    def __str__(self):
+        return f"{self.date}: {self.revenue:,} ریال"
+    
+    @property
+    def average_basket(self):
+        return self.revenue / self.order_count if self.order_count else 0
+
+
+class DailyProductSales(models.Model):
+    """Units and revenue of one product on paid orders of one day"""
+    date = models.DateField()
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='daily_sales')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    
+    class Meta:
+        db_table = 'daily_product_sales'
+        unique_together = ['date', 'product']
+        verbose_name = 'فروش روزانه محصول'
+        verbose_name_plural = 'فروش روزانه محصولات'
+    
+    def __str__(self):
+        return f"{self.date}: {self.quantity}x {self.product_id}"
@@ -0,0 +1,77 @@
+# orders/numbering.py
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class BaseOrderNumberGenerator:
+    """
+    Interface for order number generators.
+
+    Numbers always look like ``ORD-YYMMDD-NNNN``; subclasses only decide how
+    the per-day suffix is allocated.
+    """
+    prefix = 'ORD'
+    min_digits = 4
+
+    def generate(self, for_date=None):
+        """Return a new unique order number for ``for_date`` (today by default)"""
+        for_date = for_date or timezone.localdate()
+        return self.format(for_date, self.next_value(for_date))
+
+    def next_value(self, for_date):
+        raise NotImplementedError('Order number generators must implement next_value()')
+
+    def date_prefix(self, for_date):
+        return f"{self.prefix}-{for_date:%y%m%d}-"
+
+    def format(self, for_date, value):
+        return f"{self.date_prefix(for_date)}{value:0{self.min_digits}d}"
+
+
+class SequenceOrderNumberGenerator(BaseOrderNumberGenerator):
+    """
+    Allocate suffixes from a per-day counter row.
+
+    The counter is bumped with an ``F()`` update, so concurrent checkouts
+    serialize on that single row and never see the same value; no
+    existence check against ``orders`` is needed.
+    """
+
+    def next_value(self, for_date):
+        from .models import OrderNumberSequence
+
+        counter = OrderNumberSequence.objects.filter(date=for_date)
+        with transaction.atomic():
+            if not counter.update(last_value=models.F('last_value') + 1):
+                try:
+                    with transaction.atomic():
+                        OrderNumberSequence.objects.create(
+                            date=for_date,
+                            last_value=self._initial_value(for_date) + 1,
+                        )
+                except IntegrityError:
+                    # Another checkout created today's counter first
+                    counter.update(last_value=models.F('last_value') + 1)
+            return counter.values_list('last_value', flat=True).get()
+
+    def _initial_value(self, for_date):
+        """Start after any number already issued for the day (e.g. by older code)"""
+        from .models import Order
+
+        prefix = self.date_prefix(for_date)
+        issued = Order.objects.filter(order_number__startswith=prefix).values_list('order_number', flat=True)
+        suffixes = [int(number[len(prefix):]) for number in issued if number[len(prefix):].isdigit()]
+        return max(suffixes, default=0)
+
+
+_generators = {}
+
+
+def get_order_number_generator():
+    """Return the generator configured by ``ORDER_NUMBER_GENERATOR``"""
+    path = getattr(settings, 'ORDER_NUMBER_GENERATOR', 'orders.numbering.SequenceOrderNumberGenerator')
+    if path not in _generators:
+        _generators[path] = import_string(path)()
+    return _generators[path]
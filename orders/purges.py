@@ -0,0 +1,20 @@
+from core.maintenance import Purge
+from .models import Cart, CartItem
+
+
+class AbandonedCartItemPurge(Purge):
+    """Cart lines nobody has touched for ``days``"""
+    name = 'cart-items'
+    default_days = 90
+
+    def get_queryset(self):
+        return CartItem.objects.filter(updated_at__lt=self.cutoff())
+
+
+class EmptyCartPurge(Purge):
+    """Carts left empty for ``days``; runs after the item purge so it also catches the carts that emptied"""
+    name = 'carts'
+    default_days = 30
+
+    def get_queryset(self):
+        return Cart.objects.old_empty_carts(days=self.days)
@@ -0,0 +1,166 @@
+# orders/rollups.py
+import datetime
+
+from django.apps import apps as global_apps
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+# Product rows written per INSERT while rebuilding
+BATCH_SIZE = 2000
+
+
+class SalesRollup:
+    """
+    Daily sales totals kept up to date as orders are paid.
+
+    A paid order counts towards the local date it was placed, like the
+    ``created_at__date`` lookups it replaces. ``record`` adds the order to
+    ``DailySales`` and its lines to ``DailyProductSales`` when its payment
+    status becomes ``paid``; ``reverse`` subtracts them again on refund or
+    deletion. Counters only change through ``F()`` increments, so two
+    payments landing on the same day cannot overwrite each other. Reports
+    read O(days) rollup rows instead of scanning every order.
+    """
+
+    @classmethod
+    def record(cls, order, sign=1):
+        """Add a paid order to its day's totals (``sign=-1`` takes it out)"""
+        from .models import DailyProductSales, DailySales, OrderItem
+
+        day = timezone.localdate(order.created_at)
+        lines = list(OrderItem.objects.filter(order_id=order.pk).values_list('product_id', 'quantity', 'line_total'))
+        now = timezone.now()
+
+        with transaction.atomic():
+            DailySales.objects.bulk_create([DailySales(date=day)], ignore_conflicts=True)
+            DailySales.objects.filter(date=day).update(
+                order_count=models.F('order_count') + sign,
+                items_sold=models.F('items_sold') + sign * sum(quantity for _, quantity, _ in lines),
+                revenue=models.F('revenue') + sign * order.total_amount,
+                discount_amount=models.F('discount_amount') + sign * order.discount_amount,
+                updated_at=now,
+            )
+            if not lines:
+                return
+            DailyProductSales.objects.bulk_create(
+                [DailyProductSales(date=day, product_id=product_id) for product_id, _, _ in lines],
+                ignore_conflicts=True,
+            )
+            DailyProductSales.objects.filter(date=day, product_id__in=[line[0] for line in lines]).update(
+                quantity=models.F('quantity') + models.Case(*[
+                    models.When(product_id=product_id, then=models.Value(sign * quantity))
+                    for product_id, quantity, _ in lines
+                ]),
+                revenue=models.F('revenue') + models.Case(*[
+                    models.When(product_id=product_id, then=models.Value(sign * line_total))
+                    for product_id, _, line_total in lines
+                ], output_field=models.DecimalField(max_digits=14, decimal_places=0)),
+            )
+
+    @classmethod
+    def reverse(cls, order):
+        cls.record(order, sign=-1)
+
+    @classmethod
+    def rebuild(cls, date_from=None, date_to=None, apps=global_apps):
+        """
+        Recompute the rollups for a date range (all dates by default) from
+        the raw orders and return the number of days written. ``apps`` lets
+        migrations pass their historical models.
+        """
+        Order = apps.get_model('orders', 'Order')
+        OrderItem = apps.get_model('orders', 'OrderItem')
+        DailySales = apps.get_model('orders', 'DailySales')
+        DailyProductSales = apps.get_model('orders', 'DailyProductSales')
+
+        orders = Order.objects.filter(payment_status='paid')
+        items = OrderItem.objects.filter(order__payment_status='paid')
+        days = DailySales.objects.all()
+        product_days = DailyProductSales.objects.all()
+        if date_from:
+            start = _start_of(date_from)
+            orders, items = orders.filter(created_at__gte=start), items.filter(order__created_at__gte=start)
+            days, product_days = days.filter(date__gte=date_from), product_days.filter(date__gte=date_from)
+        if date_to:
+            end = _start_of(date_to + datetime.timedelta(days=1))
+            orders, items = orders.filter(created_at__lt=end), items.filter(order__created_at__lt=end)
+            days, product_days = days.filter(date__lte=date_to), product_days.filter(date__lte=date_to)
+
+        item_totals = dict(
+            items.annotate(day=TruncDate('order__created_at')).values('day')
+            .annotate(total=models.Sum('quantity')).values_list('day', 'total')
+        )
+        now = timezone.now()
+        with transaction.atomic():
+            days.delete()
+            product_days.delete()
+            rows = DailySales.objects.bulk_create([
+                DailySales(
+                    date=row['day'],
+                    order_count=row['order_count'],
+                    items_sold=item_totals.get(row['day']) or 0,
+                    revenue=row['revenue'],
+                    discount_amount=row['discount'],
+                    updated_at=now,
+                )
+                for row in orders.annotate(day=TruncDate('created_at')).values('day').annotate(
+                    order_count=models.Count('id'),
+                    revenue=models.Sum('total_amount'),
+                    discount=models.Sum('discount_amount'),
+                ).order_by()
+            ], batch_size=BATCH_SIZE)
+
+            batch = []
+            product_rows = items.annotate(day=TruncDate('order__created_at')).values('day', 'product_id').annotate(
+                quantity=models.Sum('quantity'), revenue=models.Sum('line_total'),
+            ).order_by()
+            for row in product_rows.iterator(chunk_size=BATCH_SIZE):
+                batch.append(DailyProductSales(
+                    date=row['day'], product_id=row['product_id'], quantity=row['quantity'], revenue=row['revenue'],
+                ))
+                if len(batch) >= BATCH_SIZE:
+                    DailyProductSales.objects.bulk_create(batch)
+                    batch = []
+            DailyProductSales.objects.bulk_create(batch)
+        return len(rows)
+
+    @staticmethod
+    def daily_sales(date=None):
+        """Revenue of paid orders placed on ``date`` (today by default)"""
+        from .models import DailySales
+
+        date = date or timezone.localdate()
+        return DailySales.objects.filter(date=date).values_list('revenue', flat=True).first() or 0
+
+    @staticmethod
+    def monthly_sales(year=None, month=None):
+        """``{'total': revenue, 'count': orders}`` for paid orders in a month"""
+        from .models import DailySales
+
+        today = timezone.localdate()
+        year, month = year or today.year, month or today.month
+        start = datetime.date(year, month, 1)
+        end = datetime.date(year + month // 12, month % 12 + 1, 1)
+        return DailySales.objects.filter(date__gte=start, date__lt=end).aggregate(
+            total=models.Sum('revenue'),
+            count=Coalesce(models.Sum('order_count'), 0),
+        )
+
+    @staticmethod
+    def top_products(limit=10, days=30):
+        """Best sellers by quantity over the last ``days`` whole days"""
+        from .models import DailyProductSales
+
+        since = timezone.localdate() - datetime.timedelta(days=days)
+        return DailyProductSales.objects.filter(date__gte=since).values(
+            'product__name',
+            'product__sku',
+        ).annotate(
+            total_quantity=models.Sum('quantity'),
+            total_revenue=models.Sum('revenue'),
+        ).filter(total_quantity__gt=0).order_by('-total_quantity')[:limit]
+
+
+def _start_of(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
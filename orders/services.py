@@ -0,0 +1,224 @@
+# orders/services.py
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models.functions import Greatest
+
+from products.stock import InsufficientStockError, StockLedger
+
+
+# Free shipping over 500,000 Rials
+FREE_SHIPPING_THRESHOLD = Decimal('500000')
+SHIPPING_COST = Decimal('25000')
+
+
+@dataclass(frozen=True)
+class CartTotals:
+    """Immutable snapshot of cart financial totals"""
+    subtotal: Decimal
+    discount_amount: Decimal
+    shipping_cost: Decimal
+    total_amount: Decimal
+    total_items: int
+
+    @property
+    def discounted_subtotal(self):
+        """Subtotal after product discounts, before shipping"""
+        return self.subtotal - self.discount_amount
+
+    @property
+    def has_discount(self):
+        return self.discount_amount > 0
+
+    @property
+    def has_items(self):
+        return self.total_items > 0
+
+
+class CartPricingService:
+    """
+    Cart totals computed in the database with one aggregate query.
+
+    Prices are summed in hundredths of a Rial so the percent-then-fixed
+    discount rule of ``Product.effective_unit_price`` stays exact in SQL:
+    ``max(0, price * (100 - percent) - fixed * 100)`` is 100x the effective
+    unit price.
+    """
+
+    @staticmethod
+    def line_expressions(prefix=''):
+        """
+        Return ``(gross_cents, net_cents)`` expressions for cart item rows.
+        ``prefix`` points at the cart item relation, e.g. ``'items__'``.
+        """
+        product = f'{prefix}product__'
+        quantity = models.F(f'{prefix}quantity')
+        gross_cents = models.ExpressionWrapper(
+            models.F(f'{product}unit_price') * quantity * 100,
+            output_field=models.DecimalField(max_digits=20, decimal_places=0),
+        )
+        net_cents = models.ExpressionWrapper(
+            Greatest(
+                models.F(f'{product}unit_price') * (100 - models.F(f'{product}discount_percent'))
+                - models.F(f'{product}discount_per_unit') * 100,
+                models.Value(0),
+                output_field=models.DecimalField(max_digits=20, decimal_places=0),
+            ) * quantity,
+            output_field=models.DecimalField(max_digits=20, decimal_places=0),
+        )
+        return gross_cents, net_cents
+
+    @staticmethod
+    def calculate_shipping(discounted_subtotal):
+        """Calculate shipping cost based on the payable subtotal"""
+        if discounted_subtotal >= FREE_SHIPPING_THRESHOLD:
+            return Decimal('0')
+        return SHIPPING_COST
+
+    @classmethod
+    def build_totals(cls, gross_cents, net_cents, total_items):
+        """Build a ``CartTotals`` from summed line values"""
+        subtotal = Decimal(gross_cents or 0) / 100
+        discounted_subtotal = Decimal(net_cents or 0) / 100
+        shipping_cost = cls.calculate_shipping(discounted_subtotal) if total_items else Decimal('0')
+        return CartTotals(
+            subtotal=subtotal,
+            discount_amount=subtotal - discounted_subtotal,
+            shipping_cost=shipping_cost,
+            total_amount=discounted_subtotal + shipping_cost,
+            total_items=total_items or 0,
+        )
+
+    @classmethod
+    def get_totals(cls, cart):
+        """Calculate all cart totals in a single query"""
+        gross_cents, net_cents = cls.line_expressions()
+        result = cart.items.aggregate(
+            gross_cents=models.Sum(gross_cents),
+            net_cents=models.Sum(net_cents),
+            total_items=models.Sum('quantity'),
+        )
+        return cls.build_totals(result['gross_cents'], result['net_cents'], result['total_items'])
+
+    @classmethod
+    def get_lines(cls, items):
+        """
+        Return ``(lines, totals)`` for a cart item queryset in a single query.
+        Each line is a dict with product fields and its gross/net cents.
+        """
+        lines = list(cls.line_values(items))
+        return lines, cls.sum_lines(lines)
+
+    @classmethod
+    async def aget_lines(cls, items):
+        """Async version of ``get_lines``"""
+        lines = [line async for line in cls.line_values(items)]
+        return lines, cls.sum_lines(lines)
+
+    @classmethod
+    def line_values(cls, items):
+        gross_cents, net_cents = cls.line_expressions()
+        return items.values(
+            'id', 'quantity', 'product_id', 'product__name',
+            'product__slug', 'product__image',
+        ).annotate(gross_cents=gross_cents, net_cents=net_cents)
+
+    @classmethod
+    def sum_lines(cls, lines):
+        return cls.build_totals(
+            sum(line['gross_cents'] for line in lines),
+            sum(line['net_cents'] for line in lines),
+            sum(line['quantity'] for line in lines),
+        )
+
+
+class OrderPlacementService:
+    """
+    Turn a cart into an order with a constant number of writes.
+
+    Product rows are locked once (ordered by id so concurrent checkouts
+    cannot deadlock), stock is decremented through the stock ledger with a
+    single conditional ``UPDATE`` and sale movements and order items are
+    written with ``bulk_create``, all inside one transaction. Stock is
+    taken before any other row is written, so checkouts queue on the
+    product rows first.
+    """
+
+    @classmethod
+    def place_order(cls, cart, shipping_address, customer_notes='', changed_by=None):
+        """Create order from cart and return it"""
+        from products.models import Product, StockMovement
+        from .models import Order, OrderItem, OrderStatusHistory
+
+        with transaction.atomic():
+            quantities = dict(cart.items.values_list('product_id', 'quantity'))
+            if not quantities:
+                raise ValueError('سبد خرید خالی است.')
+
+            products = list(
+                Product.objects.select_for_update()
+                .filter(id__in=quantities)
+                .order_by('id')
+            )
+            for product in products:
+                if not product.is_available or quantities[product.id] > product.quantity:
+                    raise InsufficientStockError(f'موجودی {product.name} کافی نیست.')
+
+            StockLedger.apply(
+                StockMovement(
+                    product=product,
+                    movement_type='sale',
+                    quantity=-quantities[product.id],
+                    note='فروش اینترنتی',
+                    created_by=changed_by,
+                )
+                for product in products
+            )
+
+            totals = CartPricingService.get_totals(cart)
+            order = Order.objects.create(
+                user=cart.user,
+                cart=cart,
+                subtotal=totals.subtotal,
+                discount_amount=totals.discount_amount,
+                shipping_cost=totals.shipping_cost,
+                total_amount=totals.total_amount,
+                shipping_address=shipping_address,
+                customer_notes=customer_notes,
+                status='pending',
+                payment_status='pending',
+            )
+
+            OrderItem.objects.bulk_create([
+                cls._build_order_item(order, product, quantities[product.id])
+                for product in products
+            ])
+            OrderStatusHistory.objects.create(
+                order=order,
+                new_status='pending',
+                changed_by=changed_by,
+                notes='سفارش ایجاد شد',
+            )
+
+            cart.items.all().delete()
+
+        return order
+
+    @staticmethod
+    def _build_order_item(order, product, quantity):
+        """Build an unsaved order item with the product snapshot"""
+        from .models import OrderItem
+
+        original_line_total = product.unit_price * quantity
+        discount_amount = original_line_total - product.effective_unit_price * quantity
+        return OrderItem(
+            order=order,
+            product=product,
+            product_name=product.name,
+            product_sku=product.sku,
+            unit_price=product.unit_price,
+            quantity=quantity,
+            discount_amount=discount_amount,
+            line_total=original_line_total - discount_amount,
+        )
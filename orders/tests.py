@@ -1,3 +1,723 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from core.maintenance import run_purges
+from core.profiling import QueryRecorder, read_profiles, summarize
+from core.testing import ChangelistQueryBudgetMixin, use_async_views
+from products.models import Product
+from users.models import User
+from .dashboard import SalesDashboard
+from .exports import OrderExport, OrderItemExport
+from .models import (
+    Cart, CartItem, DailyProductSales, DailySales, Order, OrderItem, OrderNumberSequence, OrderStatusHistory,
+)
+from .numbering import SequenceOrderNumberGenerator
+from .purges import EmptyCartPurge
+from .rollups import SalesRollup
+from .services import CartPricingService, InsufficientStockError, OrderPlacementService
+
+
+def create_product(index, **kwargs):
+    defaults = {
+        'name': f'محصول {index}',
+        'slug': f'product-{index}',
+        'sku': f'SKU-{index}',
+        'unit_price': Decimal('10000'),
+        'cost_price': Decimal('5000'),
+        'quantity': 10,
+    }
+    defaults.update(kwargs)
+    return Product.objects.create(**defaults)
+
+
+def create_cart(phone_number, lines):
+    """Create a user cart holding ``(product, quantity)`` lines"""
+    user = User.objects.create(phone_number=phone_number)
+    cart = Cart.objects.create(user=user)
+    for product, quantity in lines:
+        CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+    return cart
+
+
+class CartPricingServiceTests(TestCase):
+    def setUp(self):
+        self.percent = create_product(1, discount_percent=10)
+        self.fixed = create_product(2, discount_per_unit=12000)
+        self.cart = create_cart('09120000001', [(self.percent, 2), (self.fixed, 3)])
+
+    def test_line_values_carry_product_fields_and_cents(self):
+        lines = {line['product_id']: line for line in CartPricingService.line_values(self.cart.items.order_by('id'))}
+
+        self.assertEqual(lines[self.percent.id]['product__slug'], self.percent.slug)
+        self.assertEqual(lines[self.percent.id]['gross_cents'], 2000000)
+        self.assertEqual(lines[self.percent.id]['net_cents'], 1800000)
+        self.assertEqual(lines[self.fixed.id]['net_cents'], 0, 'a fixed discount above the price stops at zero')
+
+    def test_get_lines_matches_get_totals_in_one_query(self):
+        with self.assertNumQueries(1):
+            lines, totals = CartPricingService.get_lines(self.cart.items.all())
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(totals, CartPricingService.get_totals(self.cart))
+        self.assertEqual((totals.subtotal, totals.discount_amount, totals.total_items), (Decimal('50000'), Decimal('32000'), 5))
+
+    def test_get_lines_of_an_empty_cart(self):
+        lines, totals = CartPricingService.get_lines(CartItem.objects.none())
+
+        self.assertEqual(lines, [])
+        self.assertFalse(totals.has_items)
+        self.assertEqual(totals.shipping_cost, 0)
+
+
+class OrderPlacementServiceTests(TestCase):
+    def test_place_order_snapshots_lines_and_decrements_stock(self):
+        discounted = create_product(1, discount_percent=10)
+        plain = create_product(2)
+        cart = create_cart('09120000001', [(discounted, 2), (plain, 3)])
+
+        order = OrderPlacementService.place_order(cart, shipping_address={'title': 'خانه'})
+
+        self.assertEqual(order.subtotal, Decimal('50000'))
+        self.assertEqual(order.discount_amount, Decimal('2000'))
+        self.assertEqual(order.total_amount, Decimal('48000') + order.shipping_cost)
+        items = {item.product_id: item for item in order.items.all()}
+        self.assertEqual(items[discounted.id].line_total, Decimal('18000'))
+        self.assertEqual(items[plain.id].product_sku, plain.sku)
+        discounted.refresh_from_db()
+        plain.refresh_from_db()
+        self.assertEqual((discounted.quantity, plain.quantity), (8, 7))
+        self.assertTrue(OrderStatusHistory.objects.filter(order=order, new_status='pending').exists())
+        self.assertFalse(cart.items.exists())
+
+    def test_insufficient_stock_rolls_back(self):
+        product = create_product(1, quantity=1)
+        cart = create_cart('09120000001', [(product, 1)])
+        Product.objects.filter(id=product.id).update(quantity=0)
+
+        with self.assertRaises(InsufficientStockError):
+            OrderPlacementService.place_order(cart, shipping_address={})
+
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(cart.items.count(), 1)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        small = create_cart('09120000001', [(create_product(0), 1)])
+        large = create_cart('09120000002', [(create_product(index), 1) for index in range(1, 31)])
+        # The first order of the day also creates the order number counter
+        SequenceOrderNumberGenerator().generate()
+
+        with CaptureQueriesContext(connection) as small_queries:
+            OrderPlacementService.place_order(small, shipping_address={})
+        with CaptureQueriesContext(connection) as large_queries:
+            OrderPlacementService.place_order(large, shipping_address={})
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(OrderItem.objects.filter(order__cart=large).count(), 30)
+
+
+def run_concurrent_checkouts(carts, timeout=30):
+    """
+    Place one order per cart from parallel threads, all released at once.
+
+    Returns a list of ``'ok'`` / ``'out_of_stock'`` outcomes. Lock errors
+    raised by the database are retried, as a client would on a busy site.
+    """
+    barrier = threading.Barrier(len(carts))
+
+    def checkout(cart):
+        barrier.wait()
+        deadline = time.monotonic() + timeout
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    OrderPlacementService.place_order(cart, shipping_address={})
+                    return 'ok'
+                except InsufficientStockError:
+                    return 'out_of_stock'
+                except OperationalError:
+                    # SQLite reports lock contention instead of blocking
+                    time.sleep(random.uniform(0, 0.02))
+            return 'gave_up'
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(carts)) as pool:
+        return list(pool.map(checkout, carts))
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    def test_parallel_checkouts_never_oversell(self):
+        product = create_product(1, quantity=5)
+        carts = [
+            create_cart(f'0912000{index:04d}', [(product, 1)])
+            for index in range(12)
+        ]
+
+        outcomes = run_concurrent_checkouts(carts)
+
+        product.refresh_from_db()
+        self.assertNotIn('gave_up', outcomes)
+        self.assertEqual(outcomes.count('ok'), 5)
+        self.assertEqual(product.quantity, 0)
+        self.assertEqual(OrderItem.objects.filter(product=product).count(), 5)
+
+
+class OrderNumberGeneratorTests(TestCase):
+    def setUp(self):
+        self.generator = SequenceOrderNumberGenerator()
+        self.date = datetime.date(2025, 3, 9)
+
+    def test_numbers_are_sequential_per_day(self):
+        numbers = [self.generator.generate(for_date=self.date) for _ in range(3)]
+
+        self.assertEqual(numbers, ['ORD-250309-0001', 'ORD-250309-0002', 'ORD-250309-0003'])
+        self.assertEqual(
+            self.generator.generate(for_date=self.date + datetime.timedelta(days=1)),
+            'ORD-250310-0001',
+        )
+
+    def test_counter_starts_after_numbers_issued_by_older_code(self):
+        cart = create_cart('09120000001', [(create_product(1), 1)])
+        order = OrderPlacementService.place_order(cart, shipping_address={})
+        Order.objects.filter(pk=order.pk).update(order_number='ORD-250309-4821')
+
+        self.assertEqual(self.generator.generate(for_date=self.date), 'ORD-250309-4822')
+
+    def test_suffix_grows_past_four_digits(self):
+        OrderNumberSequence.objects.create(date=self.date, last_value=9999)
+
+        self.assertEqual(self.generator.generate(for_date=self.date), 'ORD-250309-10000')
+
+    def test_orders_use_configured_generator(self):
+        cart = create_cart('09120000001', [(create_product(1), 1)])
+
+        order = OrderPlacementService.place_order(cart, shipping_address={})
+
+        self.assertRegex(order.order_number, r'^ORD-\d{6}-0001$')
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.product = create_product(1)
+        self.pending = OrderPlacementService.place_order(
+            create_cart('09120000001', [(self.product, 2)]), shipping_address={},
+        )
+        self.shipped = OrderPlacementService.place_order(
+            create_cart('09120000002', [(self.product, 1)]), shipping_address={},
+        )
+        Order.objects.filter(pk=self.shipped.pk).update(
+            status='shipped', created_at=self.pending.created_at - datetime.timedelta(days=3),
+        )
+
+    def read(self, export):
+        return [line.rstrip('\r\n').split(',') for line in export.stream()]
+
+    def test_status_and_date_filters(self):
+        today = self.pending.created_at.date()
+
+        shipped = self.read(OrderExport(status='shipped'))
+        recent = self.read(OrderExport(date_from=today - datetime.timedelta(days=1), date_to=today))
+
+        self.assertEqual([row[0] for row in shipped[1:-1]], [self.shipped.order_number])
+        self.assertEqual([row[0] for row in recent[1:-1]], [self.pending.order_number])
+
+    def test_items_are_totalled_in_a_last_row(self):
+        rows = self.read(OrderItemExport())
+
+        self.assertEqual(rows[0][:2], ['\ufefforder_number', 'created_at'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[-1][0], 'جمع')
+        self.assertEqual(rows[-1][6], '3')
+
+    def test_download_streams_for_staff_only(self):
+        url = reverse('csv_export', args=['orders'])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(User.objects.create(phone_number='09129999999', is_staff=True))
+        response = self.client.get(url, {'status': 'pending'})
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn('orders-', response['Content-Disposition'])
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn(self.pending.order_number, body)
+        self.assertNotIn(self.shipped.order_number, body)
+        self.assertEqual(self.client.get(url, {'status': 'bogus'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('csv_export', args=['nope'])).status_code, 404)
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.first = create_product(1)
+        self.second = create_product(2)
+        self.orders = [
+            OrderPlacementService.place_order(
+                create_cart(f'0912000000{index}', [(self.first, 1 + index), (self.second, 1)]), shipping_address={},
+            )
+            for index in range(3)
+        ]
+
+    def pay(self, order, status='paid'):
+        order = Order.objects.get(pk=order.pk)
+        order.payment_status = status
+        order.save()
+        return order
+
+    def live_totals(self):
+        paid = Order.objects.filter(payment_status='paid')
+        return (
+            paid.count(),
+            sum(order.total_amount for order in paid),
+            sum(item.quantity for item in OrderItem.objects.filter(order__in=paid)),
+        )
+
+    def rollup_totals(self):
+        day = DailySales.objects.filter(date=timezone.localdate()).first()
+        return (day.order_count, day.revenue, day.items_sold) if day else (0, 0, 0)
+
+    def test_payment_and_refund_move_the_rollups(self):
+        self.assertFalse(DailySales.objects.exists())
+        self.pay(self.orders[0])
+        paid = self.pay(self.orders[2])
+        self.assertEqual(self.rollup_totals(), self.live_totals())
+        self.assertEqual(DailyProductSales.objects.get(product=self.first).quantity, 4)
+
+        # Saving again without a payment change is not counted twice
+        paid.admin_notes = 'بررسی شد'
+        paid.save()
+        self.pay(self.orders[2], 'refunded')
+
+        self.assertEqual(self.rollup_totals(), self.live_totals())
+        self.assertEqual(DailyProductSales.objects.get(product=self.first).quantity, 1)
+
+    def test_racing_saves_count_a_payment_once(self):
+        # Both copies were loaded unpaid, like two requests saving one order
+        first, second = Order.objects.get(pk=self.orders[0].pk), Order.objects.get(pk=self.orders[0].pk)
+        first.payment_status = second.payment_status = 'paid'
+        first.save()
+        second.save()
+        self.assertEqual(self.rollup_totals(), self.live_totals())
+
+        first.payment_status = second.payment_status = 'refunded'
+        first.save()
+        second.delete()
+        self.assertEqual(self.rollup_totals(), (0, 0, 0))
+
+    def test_deleting_a_paid_order_takes_it_out(self):
+        self.pay(self.orders[1]).delete()
+
+        self.assertEqual(self.rollup_totals(), (0, 0, 0))
+
+    def test_manager_queries_answer_from_rollups(self):
+        for order in self.orders:
+            self.pay(order)
+        with self.assertNumQueries(1):
+            revenue = Order.objects.calculate_daily_sales()
+        monthly = Order.objects.calculate_monthly_sales()
+        top = list(OrderItem.objects.top_selling_products(limit=1))
+
+        self.assertEqual(revenue, self.live_totals()[1])
+        self.assertEqual(monthly, {'total': revenue, 'count': 3})
+        self.assertEqual(top[0]['product__sku'], self.first.sku)
+        self.assertEqual(top[0]['total_quantity'], 6)
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.pay(self.orders[0])
+        self.pay(self.orders[1])
+        # Bulk updates bypass save(); rebuild picks them up
+        Order.objects.filter(pk=self.orders[2].pk).update(payment_status='paid')
+        expected = self.live_totals()
+
+        self.assertEqual(SalesRollup.rebuild(), 1)
+
+        self.assertEqual(self.rollup_totals(), expected)
+        self.assertEqual(
+            dict(DailyProductSales.objects.values_list('product_id', 'quantity')),
+            {self.first.pk: 6, self.second.pk: 3},
+        )
+
+
+class SalesDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = create_product(1, reorder_level=20)
+        self.staff = User.objects.create(phone_number='09129999999', is_staff=True)
+
+    def place_paid_order(self, phone_number, quantity):
+        order = OrderPlacementService.place_order(
+            create_cart(phone_number, [(self.product, quantity)]), shipping_address={},
+        )
+        order.payment_status = 'paid'
+        order.save()
+        return order
+
+    def test_widgets_read_rollups_and_cached_counters(self):
+        first = self.place_paid_order('09120000001', 1)
+        second = self.place_paid_order('09120000002', 3)
+
+        widgets = SalesDashboard().build()
+
+        self.assertEqual(widgets['daily_revenue'].value[-1][1:], (first.total_amount + second.total_amount, 2))
+        self.assertEqual(widgets['average_basket'].value, (first.total_amount + second.total_amount) / 2)
+        self.assertEqual(widgets['top_sellers'].value[0]['total_quantity'], 4)
+        self.assertEqual(widgets['monthly_revenue'].value[-1][2], 2)
+        self.assertEqual((widgets['low_stock_count'].value, widgets['needs_processing_count'].value), (1, 2))
+        self.assertIsNotNone(widgets['daily_revenue'].as_of)
+
+        # Counters are cached until they expire or are refreshed
+        self.place_paid_order('09120000003', 1)
+        self.assertEqual(SalesDashboard().build()['needs_processing_count'].value, 2)
+        SalesDashboard.refresh_counters()
+        self.assertEqual(SalesDashboard().build()['needs_processing_count'].value, 3)
+
+    def test_page_queries_do_not_grow_with_history(self):
+        self.client.force_login(self.staff)
+        url = reverse('products:admin_dashboard')
+        self.place_paid_order('09120000001', 1)
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as short_history:
+            self.client.get(url)
+        for day in range(1, 200):
+            DailySales.objects.create(date=timezone.localdate() - datetime.timedelta(days=day), order_count=1, revenue=1)
+        with CaptureQueriesContext(connection) as long_history:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(long_history), len(short_history))
+        self.assertContains(response, self.product.sku)
+
+
+class OrderQuerySetTests(TestCase):
+    def test_filters_chain(self):
+        product = create_product(1)
+        order = OrderPlacementService.place_order(create_cart('09120000001', [(product, 1)]), shipping_address={})
+        OrderPlacementService.place_order(create_cart('09120000002', [(product, 1)]), shipping_address={})
+        Order.objects.filter(pk=order.pk).update(payment_status='paid')
+
+        orders = Order.objects.for_user(order.user).recent().needs_processing().with_items()
+
+        with self.assertNumQueries(2):
+            self.assertEqual([item.product.category for found in orders for item in found.items.all()], [None])
+        self.assertEqual(list(Cart.objects.for_user(order.user).old_empty_carts(days=0)), [order.user.cart])
+        self.assertEqual(Order.objects.paid().pending().get(), order)
+
+
+class OrderViewQueryCountTests(TestCase):
+    """Query budgets for the cart, checkout and order pages, whatever the cart size"""
+
+    def setUp(self):
+        self.products = [create_product(index) for index in range(5)]
+        self.cart = create_cart('09120000001', [(product, 1) for product in self.products])
+        self.user = self.cart.user
+        self.user.addresses.create(
+            title='خانه', province='تهران', city='تهران', street='آزادی', postal_code='1234567890',
+            recipient_name='مشتری', recipient_phone='09120000001', is_default=True,
+        )
+        self.client.force_login(self.user)
+
+    def assertQueries(self, count, method, url, data=None):
+        with self.assertNumQueries(count):
+            response = getattr(self.client, method)(url, data or {})
+        self.assertLess(response.status_code, 400)
+        return response
+
+    def test_cart_pages(self):
+        # Every request loads the session and user and saves the session (5 queries)
+        item = self.cart.items.first()
+        self.assertQueries(8, 'get', reverse('orders:cart_detail'))
+        self.assertQueries(6, 'get', reverse('orders:cart_api_summary'))
+        self.assertQueries(9, 'post', reverse('orders:add_to_cart', args=[self.products[0].pk]))
+        self.assertQueries(10, 'post', reverse('orders:cart_api_add', args=[self.products[1].pk]))
+        self.assertQueries(7, 'post', reverse('orders:update_cart_item', args=[item.pk]), {'quantity': 2})
+        self.assertQueries(8, 'post', reverse('orders:cart_api_update', args=[item.pk]), {'quantity': 3})
+        self.assertQueries(7, 'post', reverse('orders:cart_api_remove', args=[item.pk]))
+        self.assertQueries(7, 'post', reverse('orders:remove_cart_item', args=[self.cart.items.first().pk]))
+        self.assertQueries(8, 'post', reverse('orders:clear_cart'))
+
+    def test_checkout_and_order_pages(self):
+        self.assertQueries(9, 'get', reverse('orders:checkout'))
+        response = self.assertQueries(32, 'post', reverse('orders:checkout'), {
+            'address_id': self.user.addresses.get().pk,
+        })
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('orders:order_detail', args=[order.order_number]))
+        self.assertQueries(7, 'get', reverse('orders:order_detail', args=[order.order_number]))
+
+
+class AsyncCartViewTests(TestCase):
+    """The async cart views behave like the sync ones, with no extra queries"""
+
+    def setUp(self):
+        self.enterContext(use_async_views())
+        self.products = [create_product(index) for index in range(3)]
+        self.cart = create_cart('09120000001', [(self.products[0], 1)])
+        self.client.force_login(self.cart.user)
+
+    def test_async_views_are_routed(self):
+        self.assertEqual(resolve(reverse('orders:cart_api_summary')).func.view_class.__name__, 'AsyncCartSummaryAPIView')
+
+    def test_add_to_cart(self):
+        url = reverse('orders:add_to_cart', args=[self.products[0].pk])
+        with self.assertNumQueries(9):
+            response = self.client.post(url, {'quantity': 2})
+        self.assertRedirects(response, reverse('orders:cart_detail'), fetch_redirect_response=False)
+        self.client.post(reverse('orders:add_to_cart', args=[self.products[1].pk]))
+        self.client.post(url, {'quantity': 9})
+
+        self.assertEqual(dict(self.cart.items.values_list('product_id', 'quantity')), {
+            self.products[0].pk: 10, self.products[1].pk: 1,
+        })
+
+    def test_add_to_cart_refuses_unavailable_products(self):
+        Product.objects.filter(pk=self.products[2].pk).update(quantity=0)
+        response = self.client.post(reverse('orders:add_to_cart', args=[self.products[2].pk]))
+
+        self.assertRedirects(
+            response, reverse('products:product_detail', args=[self.products[2].slug]), fetch_redirect_response=False,
+        )
+        self.assertEqual(self.client.post(reverse('orders:add_to_cart', args=[0])).status_code, 404)
+
+    def test_cart_summary_matches_the_sync_view(self):
+        url = reverse('orders:cart_api_summary')
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        with use_async_views(False):
+            expected = self.client.get(url)
+
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response['ETag'], expected['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_login_is_required(self):
+        self.client.logout()
+
+        self.assertEqual(self.client.get(reverse('orders:cart_api_summary')).status_code, 401)
+        response = self.client.post(reverse('orders:add_to_cart', args=[self.products[0].pk]))
+        self.assertEqual(response.status_code, 302)
+
+
+class CartAPIViewTests(TestCase):
+    """The mini-cart JSON endpoints: add, update and remove"""
+
+    def setUp(self):
+        self.product = create_product(1, quantity=5, discount_percent=10)
+        self.cart = create_cart('09120000001', [])
+        self.client.force_login(self.cart.user)
+
+    def add(self, product_id, data=None, **kwargs):
+        return self.client.post(reverse('orders:cart_api_add', args=[product_id]), data or {}, **kwargs)
+
+    def test_add_returns_the_summary(self):
+        response = self.add(self.product.pk, {'quantity': 2})
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertTrue(payload['success'])
+        self.assertIn(self.product.name, payload['message'])
+        self.assertEqual(payload['total_items'], 2)
+        [item] = payload['items']
+        self.assertEqual((item['product_id'], item['quantity'], item['unit_price'], item['line_total']), (
+            self.product.pk, 2, 9000.0, 18000.0,
+        ))
+        self.assertTrue(item['has_discount'])
+        self.assertEqual(payload['totals']['discount_amount'], 2000.0)
+
+    def test_add_reads_json_and_caps_at_stock(self):
+        self.add(self.product.pk, {'quantity': 3})
+        response = self.add(self.product.pk, '{"quantity": 4}', content_type='application/json')
+
+        self.assertEqual(response.json()['items'][0]['quantity'], 5)
+
+    def test_add_rejects_bad_quantities_and_unavailable_products(self):
+        for quantity in ('abc', '0', '-1'):
+            response = self.add(self.product.pk, {'quantity': quantity})
+            self.assertEqual(response.status_code, 400, quantity)
+            self.assertFalse(response.json()['success'])
+        inactive = create_product(2, is_active=False)
+        sold_out = create_product(3, quantity=0)
+
+        for product_id in (inactive.pk, sold_out.pk, 0):
+            self.assertEqual(self.add(product_id).status_code, 400)
+        self.assertFalse(self.cart.items.exists())
+
+    def test_update_sets_the_quantity(self):
+        item = CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+        url = reverse('orders:cart_api_update', args=[item.pk])
+
+        response = self.client.post(url, {'quantity': 4})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['items'][0]['quantity'], 4)
+        for quantity in ('', 'x', '0'):
+            self.assertEqual(self.client.post(url, {'quantity': quantity}).status_code, 400, quantity)
+        response = self.client.post(url, {'quantity': 6})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('5', response.json()['message'])
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 4)
+
+    def test_remove_returns_the_emptied_summary(self):
+        item = CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+        url = reverse('orders:cart_api_remove', args=[item.pk])
+
+        response = self.client.post(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['has_items'], response.json()['items']), (False, []))
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+    def test_items_of_other_users_are_not_found(self):
+        other = create_cart('09120000002', [(self.product, 1)]).items.get()
+
+        self.assertEqual(self.client.post(reverse('orders:cart_api_update', args=[other.pk]), {'quantity': 2}).status_code, 404)
+        self.assertEqual(self.client.post(reverse('orders:cart_api_remove', args=[other.pk])).status_code, 404)
+        other.refresh_from_db()
+        self.assertEqual(other.quantity, 1)
+
+    def test_anonymous_users_get_json_401(self):
+        item = CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+        self.client.logout()
+
+        for url in (
+            reverse('orders:cart_api_add', args=[self.product.pk]),
+            reverse('orders:cart_api_update', args=[item.pk]),
+            reverse('orders:cart_api_remove', args=[item.pk]),
+        ):
+            response = self.client.post(url, {'quantity': 1})
+            self.assertEqual(response.status_code, 401, url)
+            self.assertEqual(response.json()['success'], False)
+        self.assertTrue(CartItem.objects.filter(pk=item.pk).exists())
+
+
+class AdminChangelistQueryTests(ChangelistQueryBudgetMixin, TestCase):
+    """Changelists stay within a fixed query budget for a full page of rows"""
+    rows = 30
+
+    def setUp(self):
+        products = [create_product(index, quantity=100, discount_percent=10) for index in range(3)]
+        for index in range(self.rows):
+            cart = create_cart(f'0912{index:07d}', [(product, 1) for product in products])
+            order = OrderPlacementService.place_order(cart, shipping_address={})
+            CartItem.objects.create(cart=cart, product=products[index % 3], quantity=2)
+            order.payment_status = 'paid'
+            order.save()
+        self.client.force_login(User.objects.create(phone_number='09129999999', is_staff=True, is_superuser=True))
+
+    def test_order_changelists(self):
+        for model in (Cart, CartItem, Order, OrderItem, OrderStatusHistory):
+            with self.subTest(model=model.__name__):
+                self.assertChangelistQueries(model, 10)
+
+    def test_cart_totals_are_annotated(self):
+        response = self.assertChangelistQueries(Cart, 10)
+
+        cart = response.context['cl'].result_list[0]
+        self.assertEqual(cart.items_total, cart.total_items)
+        self.assertEqual(
+            CartPricingService.build_totals(cart.gross_cents_total, cart.net_cents_total, cart.items_total),
+            cart.get_totals(),
+        )
+
+
+class StaleDataPurgeTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - datetime.timedelta(days=120)
+        self.abandoned = create_cart('09120000011', [(create_product(1), 1)])
+        self.fresh = create_cart('09120000012', [(create_product(2), 1)])
+        self.empty = Cart.objects.create(user=User.objects.create(phone_number='09120000013'))
+        CartItem.objects.filter(cart=self.abandoned).update(updated_at=old)
+        Cart.objects.filter(pk__in=[self.abandoned.pk, self.empty.pk]).update(updated_at=old)
+
+    def test_purges_abandoned_items_then_the_carts_they_leave_empty(self):
+        results = run_purges(['cart-items', 'carts'])
+
+        self.assertEqual([(result.name, result.rows) for result in results], [('cart-items', 1), ('carts', 2)])
+        self.assertEqual(list(Cart.objects.all()), [self.fresh])
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_deletes_in_bounded_batches(self):
+        for index in range(5):
+            Cart.objects.create(user=User.objects.create(phone_number=f'0912000010{index}'))
+        Cart.objects.update(updated_at=timezone.now() - datetime.timedelta(days=60))
+
+        batches = list(EmptyCartPurge(batch_size=2).delete_batches())
+
+        self.assertEqual(batches, [2, 2, 2])
+        self.assertCountEqual(Cart.objects.all(), [self.fresh, self.abandoned])
+
+    def test_dry_run_only_counts(self):
+        output = io.StringIO()
+
+        call_command('purge_stale_data', 'carts', dry_run=True, stdout=output)
+
+        self.assertIn('1 rows older than 30 days would be deleted', output.getvalue())
+        self.assertEqual(Cart.objects.count(), 3)
+
+
+class QueryProfilerTests(TestCase):
+    def setUp(self):
+        self.log = f'{self.enterContext(tempfile.TemporaryDirectory())}/queries.log'
+        self.enterContext(override_settings(
+            QUERY_PROFILER_ENABLED=True, QUERY_PROFILER_LOG=self.log, QUERY_PROFILER_LOG_BUFFER=1,
+        ))
+        self.products = [create_product(index) for index in range(3)]
+        self.client.force_login(create_cart('09120000001', [(product, 1) for product in self.products]).user)
+
+    def test_records_queries_per_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('orders:cart_api_summary'))
+
+        self.assertRegex(response['Server-Timing'], rf'^db;dur=[\d.]+;desc="{len(queries)} queries, 0 repeated", app;dur=')
+        [record] = read_profiles(self.log)
+        self.assertEqual(record['view'], 'orders:cart_api_summary')
+        self.assertEqual((record['method'], record['status'], record['queries']), ('GET', 200, len(queries)))
+
+    def test_repeated_queries_are_fingerprinted(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            # One lookup per product, the shape of an N+1
+            for index, product in enumerate(self.products):
+                Product.objects.filter(pk__in=[product.pk, *range(-index, 0)]).first()
+            Cart.objects.count()
+
+        [(key, count)] = recorder.duplicates().items()
+        self.assertEqual(count, 3)
+        self.assertIn('IN (...)', key)
+
+        views, duplicates = summarize([
+            {'view': 'a', 'queries': 5, 'db_ms': 2.0, 'duplicates': {key: 3}},
+            {'view': 'a', 'queries': 1, 'db_ms': 1.0, 'duplicates': {}},
+        ])
+        self.assertEqual((views['a'].requests, views['a'].avg_queries, views['a'].repeated), (2, 3.0, 3))
+        self.assertEqual(duplicates, {('a', key): 3})
+
+    def test_report_command(self):
+        self.client.get(reverse('orders:cart_api_summary'))
+        out = io.StringIO()
+
+        call_command('query_report', log=self.log, stdout=out)
+
+        self.assertIn('orders:cart_api_summary', out.getvalue())
+
+    @override_settings(QUERY_PROFILER_ENABLED=False)
+    def test_disabled_profiler_leaves_no_trace(self):
+        response = self.client.get(reverse('orders:cart_api_summary'))
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(list(read_profiles(self.log)), [])
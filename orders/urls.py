@@ -1,5 +1,6 @@
 # orders/urls.py
 from django.urls import path
+from core.asyncviews import pick
 from . import views
 
 app_name = 'orders'
@@ -7,11 +8,18 @@ app_name = 'orders'
 urlpatterns = [
     # Cart URLs
     path('cart/', views.CartDetailView.as_view(), name='cart_detail'),
-    path('cart/add/<int:product_id>/', views.AddToCartView.as_view(), name='add_to_cart'),
+    path('cart/add/<int:product_id>/', pick(views.AddToCartView, views.AsyncAddToCartView).as_view(), name='add_to_cart'),
     path('cart/update/<int:item_id>/', views.UpdateCartItemView.as_view(), name='update_cart_item'),  
     path('cart/remove/<int:item_id>/', views.RemoveCartItemView.as_view(), name='remove_cart_item'), 
     path('cart/clear/', views.ClearCartView.as_view(), name='clear_cart'),
     
+    # Cart JSON API
+    path('cart/api/', pick(views.CartSummaryAPIView, views.AsyncCartSummaryAPIView).as_view(), name='cart_api_summary'),
+    path('cart/api/add/<int:product_id>/', views.CartAddAPIView.as_view(), name='cart_api_add'),
+    path('cart/api/items/<int:item_id>/', views.CartItemUpdateAPIView.as_view(), name='cart_api_update'),
+    path('cart/api/items/<int:item_id>/remove/', views.CartItemRemoveAPIView.as_view(), name='cart_api_remove'),
+    
     # Checkout & Orders
     path('checkout/', views.CheckoutView.as_view(), name='checkout'), 
+    path('order/<str:order_number>/', views.OrderDetailView.as_view(), name='order_detail'),
 ]
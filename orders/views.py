@@ -1,16 +1,23 @@
 # orders/views.py
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, View
 from django.db import transaction
-from django.urls import reverse_lazy
-from decimal import Decimal
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+import hashlib
+import json
 
+from core.asyncviews import AsyncViewMixin
 from products.models import Product
+from products.thumbnails import thumbnail_url
 from .models import Cart, CartItem, Order, OrderItem, OrderStatusHistory
+from .services import CartPricingService, OrderPlacementService
 
 
 class AddToCartView(LoginRequiredMixin, View):
@@ -20,6 +27,32 @@ class AddToCartView(LoginRequiredMixin, View):
         product = get_object_or_404(Product, id=product_id, is_active=True)
         quantity = int(request.POST.get('quantity', 1))
         
+        refused = self.refuse(product, quantity)
+        if refused is not None:
+            return refused
+        
+        # Get or create cart for user
+        cart, created = Cart.objects.get_or_create_for_user(request.user)
+        
+        # Get or create cart item
+        cart_item, item_created = CartItem.objects.get_or_create(
+            cart=cart,
+            product=product,
+            defaults={'quantity': quantity}
+        )
+        
+        cart_item.product = product  # already loaded; save() checks its stock
+        
+        if not item_created:
+            self.merge(cart_item, product, quantity)
+            cart_item.save()
+        
+        return self.added(product, quantity, cart_item, item_created)
+    
+    def refuse(self, product, quantity):
+        """Redirect back to the product when it cannot be added, else ``None``"""
+        request = self.request
+        
         # Validate product availability and stock
         if not product.is_available:
             messages.error(request, f'محصول "{product.name}" در حال حاضر موجود نیست.')
@@ -36,43 +69,62 @@ class AddToCartView(LoginRequiredMixin, View):
             messages.error(request, 'تعداد محصول باید حداقل 1 باشد.')
             return redirect('products:product_detail', slug=product.slug)
         
-        # Get or create cart for user
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        
-        # Get or create cart item
-        cart_item, item_created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': quantity}
-        )
+        return None
+    
+    def merge(self, cart_item, product, quantity):
+        """Add ``quantity`` to an existing item, capped at the stock"""
+        new_quantity = cart_item.quantity + quantity
         
-        if not item_created:
-            # Update existing item
-            new_quantity = cart_item.quantity + quantity
-            
-            # Ensure we don't exceed stock
-            if new_quantity > product.quantity:
-                messages.warning(
-                    request,
-                    f'حداکثر {product.quantity} عدد از این محصول قابل سفارش است. تعداد به {product.quantity} تنظیم شد.'
-                )
-                cart_item.quantity = product.quantity
-            else:
-                cart_item.quantity = new_quantity
-                
-            cart_item.save()
-            messages.success(
-                request,
-                f'{quantity} عدد از "{product.name}" به سبد خرید اضافه شد. (مجموع: {cart_item.quantity})'
+        # Ensure we don't exceed stock
+        if new_quantity > product.quantity:
+            messages.warning(
+                self.request,
+                f'حداکثر {product.quantity} عدد از این محصول قابل سفارش است. تعداد به {product.quantity} تنظیم شد.'
             )
+            cart_item.quantity = product.quantity
         else:
+            cart_item.quantity = new_quantity
+    
+    def added(self, product, quantity, cart_item, item_created):
+        if item_created:
             messages.success(
-                request,
+                self.request,
                 f'"{product.name}" با موفقیت به سبد خرید اضافه شد.'
             )
+        else:
+            messages.success(
+                self.request,
+                f'{quantity} عدد از "{product.name}" به سبد خرید اضافه شد. (مجموع: {cart_item.quantity})'
+            )
         
         return redirect('orders:cart_detail')
 
+
+class AsyncAddToCartView(AsyncViewMixin, AddToCartView):
+    """``AddToCartView`` on the async ORM, for ASGI"""
+    
+    async def post(self, request, product_id):
+        product = await aget_object_or_404(Product, id=product_id, is_active=True)
+        quantity = int(request.POST.get('quantity', 1))
+        
+        refused = self.refuse(product, quantity)
+        if refused is not None:
+            return refused
+        
+        cart, created = await Cart.objects.aget_or_create_for_user(request.user)
+        cart_item, item_created = await CartItem.objects.aget_or_create(
+            cart=cart,
+            product=product,
+            defaults={'quantity': quantity}
+        )
+        cart_item.product = product
+        
+        if not item_created:
+            self.merge(cart_item, product, quantity)
+            await cart_item.asave()
+        
+        return self.added(product, quantity, cart_item, item_created)
+
 class CartDetailView(LoginRequiredMixin, DetailView):
     """Display user's cart contents"""
     
@@ -82,94 +134,58 @@ class CartDetailView(LoginRequiredMixin, DetailView):
     
     def get_object(self, queryset=None):
         """Get or create cart for user"""
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        print(f"Cart created: {created}, Cart ID: {cart.id}")
+        cart, created = Cart.objects.get_or_create_for_user(self.request.user)
         return cart
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cart = self.get_object()
+        cart = self.object
         
         # Get cart items with product data
-        cart_items = cart.items.select_related('product')
-        
-        # DEBUG: Print cart items count
-        print(f"Cart items count: {cart_items.count()}")
-        for item in cart_items:
-            print(f"Item: {item.product.name}, Quantity: {item.quantity}")
+        cart_items = list(cart.items.with_products())
         
         # Clean up unavailable items
-        self.cleanup_unavailable_items(cart_items)
-        
-        # Refresh cart items after cleanup
-        cart_items = cart.items.select_related('product')
-        print(f"Cart items after cleanup: {cart_items.count()}")
+        removed_items = self.cleanup_unavailable_items(cart_items)
+        if removed_items:
+            cart_items = [item for item in cart_items if item not in removed_items]
         
         # Calculate cart totals
-        cart_totals = self.calculate_cart_totals(cart_items)
+        cart_totals = self.calculate_cart_totals(cart)
         
         context.update({
             'cart_items': cart_items,
             'cart_totals': cart_totals,
-            'has_items': cart_items.exists(),
+            'has_items': bool(cart_items),
         })
         
         return context
     
     def cleanup_unavailable_items(self, cart_items):
         """Remove unavailable items from cart"""
-        unavailable_items = []
-        for item in cart_items:
-            if not item.product.is_available:
-                unavailable_items.append(item)
+        unavailable_items = [item for item in cart_items if not item.product.is_available]
         
         for item in unavailable_items:
             messages.warning(
                 self.request,
                 f'محصول "{item.product.name}" از سبد خرید حذف شد چون موجود نیست.'
             )
-            item.delete()
-    
-    def calculate_cart_totals(self, cart_items):
-        """Calculate cart financial totals"""
-        subtotal = Decimal('0')
-        total_discount = Decimal('0')
-        total_items = 0
         
-        for item in cart_items:
-            item_subtotal = item.product.unit_price * item.quantity
-            item_discount = Decimal('0')
-            
-            # Calculate discount if product has discount
-            if item.product.has_discount:
-                item_effective_price = item.product.effective_unit_price
-                item_discount = (item.product.unit_price - item_effective_price) * item.quantity
-            
-            subtotal += item_subtotal
-            total_discount += item_discount
-            total_items += item.quantity
-        
-        # Calculate shipping
-        shipping_cost = Decimal('25000') if subtotal < Decimal('500000') else Decimal('0')
-        final_total = subtotal - total_discount + shipping_cost
+        if unavailable_items:
+            CartItem.objects.filter(id__in=[item.id for item in unavailable_items]).delete()
         
-        return {
-            'subtotal': subtotal,
-            'discount_amount': total_discount,
-            'shipping_cost': shipping_cost,
-            'total_amount': final_total,
-            'total_items': total_items,
-            'has_discount': total_discount > 0,
-        }
+        return unavailable_items
+    
+    def calculate_cart_totals(self, cart):
+        """Calculate cart financial totals"""
+        return cart.get_totals()
 
 class UpdateCartItemView(LoginRequiredMixin, View):
     """Update quantity of cart item"""
     
     def post(self, request, item_id):
         cart_item = get_object_or_404(
-            CartItem,
-            id=item_id,
-            cart__user=request.user
+            CartItem.objects.for_user(request.user).with_products(),
+            id=item_id
         )
         
         new_quantity = int(request.POST.get('quantity', 1))
@@ -202,9 +218,8 @@ class RemoveCartItemView(LoginRequiredMixin, View):
     
     def post(self, request, item_id):
         cart_item = get_object_or_404(
-            CartItem,
-            id=item_id,
-            cart__user=request.user
+            CartItem.objects.for_user(request.user).with_products(),
+            id=item_id
         )
         
         product_name = cart_item.product.name
@@ -221,10 +236,10 @@ class ClearCartView(LoginRequiredMixin, View):
     """Clear all items from user's cart"""
     
     def post(self, request):
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        cart, created = Cart.objects.get_or_create_for_user(request.user)
         
-        if cart.items.exists():
-            items_count = cart.items.count()
+        items_count = cart.items.count()
+        if items_count:
             cart.clear()  # Uses the clear() method we defined in the Cart model
             
             messages.success(
@@ -242,15 +257,16 @@ class CheckoutView(LoginRequiredMixin, View):
     
     def get(self, request):
         """Show checkout form"""
-        cart = get_object_or_404(Cart, user=request.user)
+        cart = get_object_or_404(Cart.objects.for_user(request.user))
+        cart_items = list(cart.items.with_products())
         
-        if cart.is_empty:
+        if not cart_items:
             messages.error(request, 'سبد خرید شما خالی است.')
             return redirect('orders:cart_detail')
         
         # Validate all cart items are still available
         unavailable_items = []
-        for item in cart.items.all():
+        for item in cart_items:
             if not item.product.is_available or item.quantity > item.product.quantity:
                 unavailable_items.append(item)
         
@@ -260,25 +276,26 @@ class CheckoutView(LoginRequiredMixin, View):
                     request,
                     f'محصول "{item.product.name}" دیگر موجود نیست و از سبد خرید حذف شد.'
                 )
-                item.delete()
+            CartItem.objects.filter(id__in=[item.id for item in unavailable_items]).delete()
             return redirect('orders:cart_detail')
         
         # Calculate cart totals for display
         cart_totals = self.calculate_checkout_totals(cart)
         
+        addresses = list(request.user.get_active_addresses())
         context = {
             'cart': cart,
-            'cart_items': cart.items.select_related('product'),
+            'cart_items': cart_items,
             'cart_totals': cart_totals,
-            'user_addresses': request.user.addresses.filter(is_active=True),
-            'default_address': request.user.get_default_address(),
+            'user_addresses': addresses,
+            'default_address': next((address for address in addresses if address.is_default), None),
         }
         
         return render(request, 'orders/checkout.html', context)
     
     def post(self, request):
         """Process order creation from cart"""
-        cart = get_object_or_404(Cart, user=request.user)
+        cart = get_object_or_404(Cart.objects.for_user(request.user).select_related('user'))
         
         if cart.is_empty:
             messages.error(request, 'سبد خرید شما خالی است.')
@@ -306,62 +323,19 @@ class CheckoutView(LoginRequiredMixin, View):
             return redirect('orders:checkout')
         
         try:
-            with transaction.atomic():
-                # Calculate totals
-                cart_totals = self.calculate_checkout_totals(cart)
-                
-                # Create order
-                order = Order.objects.create(
-                    user=request.user,
-                    cart=cart,
-                    subtotal=cart_totals['subtotal'],
-                    discount_amount=cart_totals['discount_amount'],
-                    shipping_cost=cart_totals['shipping_cost'],
-                    total_amount=cart_totals['total_amount'],
-                    shipping_address=shipping_address,
-                    customer_notes=customer_notes,
-                    status='pending',
-                    payment_status='pending'
-                )
-                
-                # Create order items from cart items
-                for cart_item in cart.items.all():
-                    # Final stock validation
-                    if cart_item.quantity > cart_item.product.quantity:
-                        raise ValueError(f'موجودی {cart_item.product.name} کافی نیست.')
-                    
-                    OrderItem.objects.create(
-                        order=order,
-                        product=cart_item.product,
-                        product_name=cart_item.product.name,
-                        product_sku=cart_item.product.sku,
-                        unit_price=cart_item.product.unit_price,
-                        quantity=cart_item.quantity,
-                        discount_amount=cart_item.discount_amount,
-                    )
-                    
-                    # Update product inventory
-                    product = cart_item.product
-                    product.quantity -= cart_item.quantity
-                    product.save()
-                
-                # Create status history
-                OrderStatusHistory.objects.create(
-                    order=order,
-                    new_status='pending',
-                    changed_by=request.user,
-                    notes='سفارش ایجاد شد'
-                )
-                
-                # Clear cart
-                cart.clear()
-                
-                messages.success(
-                    request,
-                    f'سفارش شما با شماره {order.order_number} ثبت شد.'
-                )
-                
-                return redirect('orders:order_detail', order_number=order.order_number)
+            order = OrderPlacementService.place_order(
+                cart,
+                shipping_address=shipping_address,
+                customer_notes=customer_notes,
+                changed_by=request.user,
+            )
+            
+            messages.success(
+                request,
+                f'سفارش شما با شماره {order.order_number} ثبت شد.'
+            )
+            
+            return redirect('orders:order_detail', order_number=order.order_number)
                 
         except ValueError as e:
             messages.error(request, str(e))
@@ -372,15 +346,168 @@ class CheckoutView(LoginRequiredMixin, View):
     
     def calculate_checkout_totals(self, cart):
         """Calculate totals for checkout display"""
-        subtotal = cart.subtotal_price
-        discount_amount = cart.get_total_discount()
-        shipping_cost = Decimal('25000') if subtotal < Decimal('500000') else Decimal('0')
-        total_amount = subtotal + shipping_cost
-        
+        return cart.get_totals()
+
+
+class OrderDetailView(LoginRequiredMixin, DetailView):
+    """Display a placed order to its owner"""
+    
+    model = Order
+    template_name = 'orders/order_detail.html'
+    context_object_name = 'order'
+    slug_field = 'order_number'
+    slug_url_kwarg = 'order_number'
+    
+    def get_queryset(self):
+        # Order lines are snapshots, so products need not be loaded
+        return Order.objects.for_user(self.request.user).prefetch_related('items')
+
+
+# Cart JSON API (header mini-cart)
+
+class CartAPIMixin(LoginRequiredMixin):
+    """Shared helpers for the JSON cart endpoints"""
+    
+    def handle_no_permission(self):
+        return JsonResponse({'success': False, 'message': 'لطفاً ابتدا وارد شوید.'}, status=401)
+    
+    def get_quantity(self, request, default=1):
+        """Read quantity from form data or a JSON body"""
+        value = request.POST.get('quantity')
+        if value is None and request.content_type == 'application/json':
+            try:
+                value = json.loads(request.body or '{}').get('quantity')
+            except (ValueError, AttributeError):
+                value = None
+        try:
+            return int(value if value is not None else default)
+        except (TypeError, ValueError):
+            return None
+    
+    def error_response(self, message, status=400):
+        return JsonResponse({'success': False, 'message': message}, status=status)
+    
+    def summary_payload(self):
+        """Build the mini-cart payload with a single query"""
+        items = CartItem.objects.for_user(self.request.user)
+        return self.build_summary(*CartPricingService.get_lines(items))
+    
+    def build_summary(self, lines, totals):
         return {
-            'subtotal': subtotal,
-            'discount_amount': discount_amount,
-            'shipping_cost': shipping_cost,
-            'total_amount': total_amount,
-            'total_items': cart.total_items,
+            'success': True,
+            'has_items': totals.has_items,
+            'total_items': totals.total_items,
+            'items': [
+                {
+                    'id': line['id'],
+                    'product_id': line['product_id'],
+                    'product_name': line['product__name'],
+                    'product_url': reverse('products:product_detail', args=[line['product__slug']]),
+                    'product_image': thumbnail_url(line['product__image'], 'mini') if line['product__image'] else None,
+                    'quantity': line['quantity'],
+                    'unit_price': float(line['net_cents'] / 100 / max(line['quantity'], 1)),
+                    'line_total': float(line['net_cents'] / 100),
+                    'has_discount': line['net_cents'] < line['gross_cents'],
+                }
+                for line in lines
+            ],
+            'totals': {
+                'subtotal': float(totals.subtotal),
+                'discount_amount': float(totals.discount_amount),
+                'shipping_cost': float(totals.shipping_cost),
+                'total_amount': float(totals.total_amount),
+            },
         }
+    
+    def summary_response(self, message=None):
+        payload = self.summary_payload()
+        if message:
+            payload['message'] = message
+        return JsonResponse(payload)
+
+
+class CartSummaryAPIView(CartAPIMixin, View):
+    """Cart summary for the header dropdown, with ETag revalidation"""
+    
+    def get(self, request):
+        return self.etag_response(self.summary_payload())
+    
+    def etag_response(self, payload):
+        request = self.request
+        body = json.dumps(payload, cls=DjangoJSONEncoder).encode()
+        etag = quote_etag(hashlib.md5(body).hexdigest())
+        
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class AsyncCartSummaryAPIView(AsyncViewMixin, CartSummaryAPIView):
+    """``CartSummaryAPIView`` on the async ORM, for ASGI"""
+    
+    async def get(self, request):
+        items = CartItem.objects.for_user(request.user)
+        lines, totals = await CartPricingService.aget_lines(items)
+        return self.etag_response(self.build_summary(lines, totals))
+
+
+class CartAddAPIView(CartAPIMixin, View):
+    """Add product to cart and return the updated summary"""
+    
+    def post(self, request, product_id):
+        product = Product.objects.filter(id=product_id, is_active=True).first()
+        if product is None or not product.is_available:
+            return self.error_response('محصول در حال حاضر موجود نیست.')
+        
+        quantity = self.get_quantity(request)
+        if quantity is None or quantity < 1:
+            return self.error_response('تعداد محصول باید حداقل 1 باشد.')
+        
+        cart, created = Cart.objects.get_or_create_for_user(request.user)
+        cart_item, item_created = CartItem.objects.get_or_create(
+            cart=cart,
+            product=product,
+            defaults={'quantity': min(quantity, product.quantity)}
+        )
+        cart_item.product = product
+        if not item_created:
+            cart_item.quantity = min(cart_item.quantity + quantity, product.quantity)
+            cart_item.save()
+        
+        return self.summary_response(f'"{product.name}" به سبد خرید اضافه شد.')
+
+
+class CartItemUpdateAPIView(CartAPIMixin, View):
+    """Set quantity of a cart item and return the updated summary"""
+    
+    def post(self, request, item_id):
+        cart_item = CartItem.objects.for_user(request.user).with_products().filter(id=item_id).first()
+        if cart_item is None:
+            return self.error_response('آیتم سبد خرید یافت نشد.', status=404)
+        
+        quantity = self.get_quantity(request, default=None)
+        if quantity is None or quantity < 1:
+            return self.error_response('تعداد محصول باید حداقل 1 باشد.')
+        if quantity > cart_item.product.quantity:
+            return self.error_response(
+                f'تنها {cart_item.product.quantity} عدد از "{cart_item.product.name}" موجود است.'
+            )
+        
+        cart_item.quantity = quantity
+        cart_item.save()
+        
+        return self.summary_response()
+
+
+class CartItemRemoveAPIView(CartAPIMixin, View):
+    """Remove a cart item and return the updated summary"""
+    
+    def post(self, request, item_id):
+        deleted, _ = CartItem.objects.for_user(request.user).filter(id=item_id).delete()
+        if not deleted:
+            return self.error_response('آیتم سبد خرید یافت نشد.', status=404)
+        
+        return self.summary_response()
@@ -1,6 +1,28 @@
 from django.contrib import admin
-from .models import Category, Product, StockMovement
+from .models import Category, Product, ProductBarcode, StockMovement
 
 admin.site.register(Category)
 admin.site.register(Product)
-admin.site.register(StockMovement)
+admin.site.register(ProductBarcode)
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """The ledger is append-only: movements can be added but not edited"""
+    list_display = ('product', 'movement_type', 'quantity', 'before_quantity', 'after_quantity', 'created_at')
+    list_filter = ('movement_type',)
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return ()
+        return [field.name for field in self.model._meta.fields]
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+            obj.save()
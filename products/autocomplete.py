@@ -0,0 +1,177 @@
+# products/autocomplete.py
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+
+from .search import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Fields whose tokens are looked up by prefix
+AUTOCOMPLETE_FIELDS = ('name', 'sku', 'barcode')
+# Other fields a suggestion carries
+SUGGESTION_FIELDS = frozenset(AUTOCOMPLETE_FIELDS + ('slug', 'is_active'))
+
+Suggestion = namedtuple('Suggestion', ['id', 'name', 'sku', 'barcode', 'slug', 'is_active', 'tokens'])
+
+
+class PrefixIndex:
+    """
+    In-process typeahead index over product names, SKUs and barcodes.
+
+    Every token is kept in one sorted list of ``(token, product_id)`` pairs,
+    so the products whose tokens start with a prefix are a contiguous slice
+    found with ``bisect``. Exact tokens sort before their extensions, which
+    ranks them first. The index is loaded lazily and updated from Product
+    signals; since signals only reach the current process, it is also
+    reloaded every ``AUTOCOMPLETE_REFRESH_SECONDS`` to pick up changes made
+    by other workers. A stale index keeps answering while one background
+    thread reloads it (inline with ``AUTOCOMPLETE_REFRESH_ASYNC = False``).
+    """
+    # Entries inspected per lookup at most, bounding one-letter prefixes
+    max_scan = 2000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = []
+        self._products = {}
+        self._loaded_at = None
+        # Held by the one thread (re)loading the index
+        self._loading = threading.Lock()
+
+    @property
+    def refresh_seconds(self):
+        return getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', 300)
+
+    @property
+    def is_loaded(self):
+        return self._loaded_at is not None
+
+    def load(self, products=None):
+        """(Re)build the whole index from ``products`` (all products by default)"""
+        from .models import Product
+
+        if products is None:
+            products = Product.objects.all()
+        suggestions = {
+            row['id']: self._suggestion(row)
+            for row in products.values('id', *SUGGESTION_FIELDS).iterator(chunk_size=5000)
+        }
+        keys = sorted(
+            (token, product_id)
+            for product_id, suggestion in suggestions.items()
+            for token in suggestion.tokens
+        )
+        with self._lock:
+            self._products = suggestions
+            self._keys = keys
+            self._loaded_at = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._keys = []
+            self._products = {}
+            self._loaded_at = None
+
+    def update(self, product):
+        """Replace the entries of one saved product"""
+        if not self.is_loaded:
+            return
+        suggestion = self._suggestion({field: getattr(product, field) for field in SUGGESTION_FIELDS}, product.pk)
+        with self._lock:
+            self._discard(product.pk)
+            self._products[product.pk] = suggestion
+            for token in suggestion.tokens:
+                insort(self._keys, (token, product.pk))
+
+    def remove(self, product_id):
+        """Drop the entries of a deleted product"""
+        if not self.is_loaded:
+            return
+        with self._lock:
+            self._discard(product_id)
+
+    def lookup(self, query, limit=10, active_only=True):
+        """Suggestions whose tokens start with every term of ``query``"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+        self._ensure_fresh()
+
+        # Scan the longest (most selective) term, check the others per product
+        scanned, *others = sorted(terms, key=len, reverse=True)
+        with self._lock:
+            keys, products = self._keys, self._products
+            start = bisect_left(keys, (scanned,))
+            end = min(len(keys), start + self.max_scan)
+            results, seen = [], set()
+            for token, product_id in keys[start:end]:
+                if not token.startswith(scanned):
+                    break
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                suggestion = products[product_id]
+                if active_only and not suggestion.is_active:
+                    continue
+                if all(any(token.startswith(term) for token in suggestion.tokens) for term in others):
+                    results.append(suggestion)
+                    if len(results) == limit:
+                        break
+        return results
+
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            # Nothing to answer from yet: one thread loads, the others wait for it
+            with self._loading:
+                if not self.is_loaded:
+                    self.load()
+        elif time.monotonic() - loaded_at > self.refresh_seconds and self._loading.acquire(blocking=False):
+            if getattr(settings, 'AUTOCOMPLETE_REFRESH_ASYNC', True):
+                threading.Thread(target=self._reload, args=(True,), name='autocomplete', daemon=True).start()
+            else:
+                self._reload()
+
+    def _reload(self, background=False):
+        try:
+            self.load()
+        except Exception:
+            # The old index keeps answering; the next lookup tries again
+            logger.exception('Reloading the autocomplete index failed')
+        finally:
+            self._loading.release()
+            if background:
+                connection.close()
+
+    def _discard(self, product_id):
+        previous = self._products.pop(product_id, None)
+        if previous is None:
+            return
+        for token in previous.tokens:
+            position = bisect_left(self._keys, (token, product_id))
+            if position < len(self._keys) and self._keys[position] == (token, product_id):
+                del self._keys[position]
+
+    @staticmethod
+    def _suggestion(values, product_id=None):
+        tokens = frozenset(
+            token for field in AUTOCOMPLETE_FIELDS for token in tokenize(values[field])
+        )
+        return Suggestion(
+            id=values.get('id', product_id),
+            name=values['name'],
+            sku=values['sku'],
+            barcode=values['barcode'],
+            slug=values['slug'],
+            is_active=values['is_active'],
+            tokens=tokens,
+        )
+
+
+autocomplete_index = PrefixIndex()
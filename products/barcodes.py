@@ -0,0 +1,144 @@
+# products/barcodes.py
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .search import normalize
+
+# Columns a scan needs for price and stock
+SCAN_FIELDS = (
+    'id', 'name', 'slug', 'sku', 'barcode', 'is_active', 'quantity', 'reorder_level',
+    'unit_price', 'discount_percent', 'discount_per_unit',
+)
+
+
+def normalize_barcode(code):
+    """Scanners on a Persian keyboard layout send Persian digits"""
+    return ''.join(normalize(code).split())
+
+
+class BarcodeConflictError(ValueError):
+    """Raised when a barcode already belongs to another product"""
+
+
+def barcode_owner(code, product=None):
+    """SKU of the product other than ``product`` that ``code`` belongs to, or ``None``"""
+    from .models import ProductBarcode
+
+    code = normalize_barcode(code)
+    if not code:
+        return None
+    owners = ProductBarcode.objects.filter(code=code)
+    if product is not None and product.pk is not None:
+        owners = owners.exclude(product=product)
+    return owners.values_list('product__sku', flat=True).first()
+
+
+def check_barcode(product):
+    """Raise ``BarcodeConflictError`` if ``product.barcode`` belongs to another product"""
+    owner = barcode_owner(product.barcode, product)
+    if owner is not None:
+        raise BarcodeConflictError(f'Barcode {normalize_barcode(product.barcode)} belongs to product {owner}')
+
+
+def sync_primary_barcode(product):
+    """
+    Make the primary ProductBarcode row follow ``Product.barcode``;
+    ``Product.save`` has already called ``check_barcode``.
+    """
+    from .models import ProductBarcode
+
+    code = normalize_barcode(product.barcode)
+    ProductBarcode.objects.filter(product=product, is_primary=True).exclude(code=code).delete()
+    if code:
+        ProductBarcode.objects.update_or_create(
+            code=code, defaults={'product': product, 'is_primary': True},
+        )
+
+
+class BarcodeLookup:
+    """
+    Scanner lookups with a per-process LRU of recent scans.
+
+    A miss is one query joining through the unique ``ProductBarcode.code``
+    index; a hit costs no query at all, which is what repeated scans of the
+    same item at the counter need. Saves of the product or its barcodes
+    evict the entry through signals; other changes (stock sold through
+    checkout, edits in another worker) show up after at most
+    ``BARCODE_CACHE_TIMEOUT`` seconds. Checkout re-checks stock under row
+    locks, so a slightly old quantity on the scanner is only advisory.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'BARCODE_CACHE_SIZE', 5000)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'BARCODE_CACHE_TIMEOUT', 10)
+
+    def lookup(self, code):
+        """Return the product scanned as ``code``, or ``None``"""
+        from .models import Product
+
+        code = normalize_barcode(code)
+        if not code:
+            return None
+        product = self._get(code)
+        if product is None:
+            product = Product.objects.only(*SCAN_FIELDS).filter(barcodes__code=code).first()
+            if product is not None:
+                self._set(code, product)
+        return product
+
+    def evict(self, code):
+        with self._lock:
+            self._entries.pop(normalize_barcode(code), None)
+
+    def evict_product(self, product_id):
+        with self._lock:
+            for code in [code for code, (product, _) in self._entries.items() if product.pk == product_id]:
+                del self._entries[code]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._entries),
+        }
+
+    def _get(self, code):
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(code, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(code)
+            self.hits += 1
+            return entry[0]
+
+    def _set(self, code, product):
+        with self._lock:
+            self._entries[code] = (product, time.monotonic() + self.timeout)
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+barcode_lookup = BarcodeLookup()
@@ -0,0 +1,86 @@
+# products/cache.py
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class CatalogCache:
+    """
+    Read-through cache for catalog listings such as the homepage carousels.
+
+    Every key embeds the current catalog version. Product and Category
+    signals bump the version, so a change invalidates all listings at once
+    without deleting keys; old entries simply expire. The version starts
+    from a timestamp so a cache restart never revives stale entries.
+    """
+    version_key = 'catalog:version'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'CATALOG_CACHE_ENABLED', True)
+
+    def get_version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            self.cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    def bump_version(self):
+        try:
+            return self.cache.incr(self.version_key)
+        except ValueError:
+            # Version was evicted; a fresh timestamp is newer than any old one
+            self.cache.set(self.version_key, time.time_ns(), timeout=None)
+
+    def get_or_set(self, name, builder, timeout=None):
+        """Return the cached value for ``name``, building it on a miss"""
+        if not self.enabled:
+            return builder()
+
+        key = f'catalog:{self.get_version()}:{name}'
+        value = self.cache.get(key)
+        if value is not None:
+            self._count(hit=True)
+            return value
+
+        self._count(hit=False)
+        value = builder()
+        if timeout is None:
+            timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600)
+        self.cache.set(key, value, timeout)
+        return value
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+catalog_cache = CatalogCache()
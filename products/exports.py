@@ -0,0 +1,64 @@
+# products/exports.py
+from django.db import models
+
+from core.exports import CSVExport
+
+from .models import Product, StockMovement
+
+
+class InventoryValuationExport(CSVExport):
+    """Every product with its stock valued at cost (``quantity * cost_price``)"""
+    name = 'inventory'
+    columns = (
+        ('sku', 'sku'),
+        ('name', 'name'),
+        ('category', 'category__name'),
+        ('is_active', 'is_active'),
+        ('quantity', 'quantity'),
+        ('cost_price', 'cost_price'),
+        ('unit_price', 'unit_price'),
+        ('stock_value', 'stock_value'),
+    )
+    date_field = 'created_at'
+    status_field = 'is_active'
+    total_columns = ('quantity', 'stock_value')
+
+    @classmethod
+    def status_choices(cls):
+        return {'active': True, 'inactive': False}
+
+    def __init__(self, status=None, **kwargs):
+        super().__init__(status=self.status_choices().get(status), **kwargs)
+
+    def get_queryset(self):
+        return Product.objects.annotate(
+            stock_value=models.ExpressionWrapper(
+                models.F('quantity') * models.F('cost_price'),
+                output_field=models.DecimalField(max_digits=20, decimal_places=0),
+            )
+        ).order_by('id')
+
+
+class StockMovementExport(CSVExport):
+    """The stock ledger, oldest first"""
+    name = 'stock-movements'
+    columns = (
+        ('created_at', 'created_at'),
+        ('sku', 'product__sku'),
+        ('product', 'product__name'),
+        ('movement_type', 'movement_type'),
+        ('quantity', 'quantity'),
+        ('before_quantity', 'before_quantity'),
+        ('after_quantity', 'after_quantity'),
+        ('note', 'note'),
+        ('created_by', 'created_by__phone_number'),
+    )
+    date_field = 'created_at'
+    status_field = 'movement_type'
+
+    @classmethod
+    def status_choices(cls):
+        return dict(StockMovement.MOVEMENT_TYPES)
+
+    def get_queryset(self):
+        return StockMovement.objects.order_by('id')
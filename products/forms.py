@@ -1,11 +1,18 @@
 from django import forms
+from django.db import transaction
 from .models import Product, Category
+from .stock import StockLedger
 from django.core.exceptions import ValidationError
 
 class ProductForm(forms.ModelForm):
     """
     Comprehensive form for product creation and updates with proper validation.
+    An edit applies the change in ``quantity`` through the stock ledger.
     """
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
     
     class Meta:
         model = Product
@@ -90,6 +97,29 @@ class ProductForm(forms.ModelForm):
                 raise ValidationError('محصولی با این کد SKU قبلاً ثبت شده است')
         return sku
 
+    def save(self, commit=True):
+        """
+        On edit ``quantity`` is not written with the product: the difference
+        from the stored quantity is recorded as an adjustment, so stock sold
+        while the product was being saved is kept and the ledger stays whole.
+        """
+        if not commit or self.instance._state.adding:
+            return super().save(commit)
+        delta = self.cleaned_data['quantity'] - self.initial['quantity']
+        product = super().save(commit=False)
+        with transaction.atomic():
+            product.save(update_fields=[
+                field.name for field in Product._meta.concrete_fields
+                if not field.primary_key and field.name != 'quantity'
+            ])
+            self.save_m2m()
+            if delta:
+                movement = StockLedger.record(
+                    product, delta, 'adjustment', note='ویرایش موجودی در فرم محصول', created_by=self.user,
+                )
+                product.quantity = movement.after_quantity
+        return product
+
     def clean_unit_price(self):
         """Validate unit price"""
         unit_price = self.cleaned_data.get('unit_price')
@@ -115,3 +145,31 @@ class CategoryForm(forms.ModelForm):
     class Meta:
         model = Category
         fields = ['name', 'slug', 'description', 'parent', 'image', 'is_active']
+
+class ProductFilterForm(forms.Form):
+    """Filters of the public product list"""
+    search = forms.CharField(max_length=200, required=False)
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.filter(is_active=True).order_by('path'),
+        to_field_name='name',
+        required=False,
+    )
+    available = forms.BooleanField(required=False)
+
+
+class ProductImportForm(forms.Form):
+    """Distributor price list upload"""
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise ValidationError('فقط فایل‌های CSV و XLSX پشتیبانی می‌شوند')
+        return upload
@@ -0,0 +1,352 @@
+# products/importer.py
+import codecs
+import csv
+import zipfile
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .autocomplete import autocomplete_index
+from .barcodes import barcode_lookup, normalize_barcode
+from .cache import catalog_cache
+from .search import normalize, rebuild_index
+from .stock import StockLedger
+
+REQUIRED_COLUMNS = ('sku', 'name', 'unit_price')
+# Optional columns and the product field each one updates
+OPTIONAL_COLUMNS = {
+    'description': 'description',
+    'category': 'category',
+    'cost_price': 'cost_price',
+    'reorder_level': 'reorder_level',
+    'barcode': 'barcode',
+    'discount_percent': 'discount_percent',
+    'discount_per_unit': 'discount_per_unit',
+    'is_active': 'is_active',
+}
+# Received stock, applied through the ledger rather than copied
+QUANTITY_COLUMN = 'quantity'
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'بله', 'فعال'}
+MAX_REPORTED_ERRORS = 200
+# Bytes decoded at a time when checking a CSV's encoding
+ENCODING_CHUNK_SIZE = 64 * 1024
+
+
+class ProductImportError(ValueError):
+    """Raised when an import file cannot be read at all"""
+
+
+# Raised by the csv module and openpyxl for a file that cannot be parsed
+READ_ERRORS = (csv.Error, UnicodeDecodeError, zipfile.BadZipFile, KeyError, SyntaxError, ValueError)
+
+
+class RowError(ValueError):
+    """A single row that fails validation; the row is skipped"""
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool = False
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    stock_received: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+
+def open_rows(file, filename):
+    """
+    Return ``(columns, rows)`` for a CSV or XLSX file, where ``rows`` lazily
+    yields ``(line_number, {column: text})`` so large files stream.
+    """
+    suffix = Path(filename).suffix.lower()
+    if suffix in ('.csv', '.txt'):
+        _check_encoding(file)
+        reader = csv.reader(codecs.getreader('utf-8-sig')(file))
+    elif suffix == '.xlsx':
+        reader = _xlsx_reader(file)
+    else:
+        raise ProductImportError('فقط فایل‌های CSV و XLSX پشتیبانی می‌شوند.')
+
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ProductImportError('فایل خالی است.')
+    columns = [str(column or '').strip().lower() for column in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ProductImportError(f'ستون‌های الزامی وجود ندارند: {", ".join(missing)}')
+
+    def rows():
+        line = 1
+        try:
+            for line, values in enumerate(reader, start=2):
+                if any(values):
+                    yield line, dict(zip(columns, (_text(value) for value in values)))
+        except READ_ERRORS as error:
+            raise ProductImportError(f'خطا در خواندن فایل پس از ردیف {line}: {error}')
+
+    return columns, rows()
+
+
+def _check_encoding(file):
+    """Decode a whole CSV before importing, so a file that is not UTF-8 fails before any row is saved"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    line = 1
+    for chunk in iter(lambda: file.read(ENCODING_CHUNK_SIZE), b''):
+        pending = len(decoder.getstate()[0])
+        try:
+            decoder.decode(chunk)
+        except UnicodeDecodeError as error:
+            line += chunk[:max(error.start - pending, 0)].count(b'\n')
+            raise ProductImportError(f'فایل با کدگذاری UTF-8 ذخیره نشده است (خط {line}). آن را با قالب «CSV UTF-8» ذخیره کنید.')
+        line += chunk.count(b'\n')
+    try:
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        raise ProductImportError(f'فایل با کدگذاری UTF-8 ذخیره نشده است (خط {line}). آن را با قالب «CSV UTF-8» ذخیره کنید.')
+    file.seek(0)
+
+
+def _xlsx_reader(file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ProductImportError('برای خواندن فایل‌های XLSX بسته openpyxl لازم است.')
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except READ_ERRORS as error:
+        raise ProductImportError(f'فایل XLSX خراب است یا قابل خواندن نیست: {error}')
+    return workbook.active.iter_rows(values_only=True)
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store SKUs, barcodes and prices as floats
+        value = int(value)
+    return str(value).strip()
+
+
+class ProductImporter:
+    """
+    Streaming product upsert.
+
+    Existing SKUs, slugs, barcodes and categories are loaded once, so each
+    row is validated in memory. Valid rows are upserted ``batch_size`` at a
+    time with ``bulk_create(update_conflicts=True)`` on ``sku``; only the
+    columns present in the file are updated. The ``quantity`` column is
+    stock received and becomes ``purchase`` movements through the stock
+    ledger. Invalid rows are skipped and reported with their line number.
+    """
+
+    def __init__(self, batch_size=1000, dry_run=False, created_by=None, progress=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.created_by = created_by
+        self.progress = progress
+
+    def run(self, columns, rows, source=''):
+        from .models import Category, Product, ProductBarcode
+
+        self.columns = set(columns)
+        self.update_fields = ['name', 'unit_price', 'updated_at'] + [
+            product_field for column, product_field in OPTIONAL_COLUMNS.items() if column in self.columns
+        ]
+        self.source = source
+        self.report = ImportReport(dry_run=self.dry_run)
+
+        self.existing = {sku: (pk, slug) for sku, pk, slug in Product.objects.values_list('sku', 'id', 'slug')}
+        self.slugs = {slug for _, slug in self.existing.values()}
+        self.barcode_owners = dict(ProductBarcode.objects.values_list('code', 'product__sku'))
+        self.categories = {}
+        for pk, slug, name in Category.objects.values_list('id', 'slug', 'name'):
+            self.categories[normalize(name)] = pk
+            self.categories[slug.lower()] = pk
+        self.seen_skus = set()
+
+        batch = []
+        try:
+            for line, row in rows:
+                self.report.rows += 1
+                try:
+                    batch.append(self._clean(row))
+                except RowError as error:
+                    self.report.add_error(line, str(error))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+            self._flush(batch)
+        except ProductImportError as error:
+            if self.dry_run or not self.report.imported:
+                raise
+            raise ProductImportError(
+                f'{error} {self.report.imported} ردیف پیش از این خطا ذخیره شده است.'
+            ) from error
+        finally:
+            if not self.dry_run and self.report.imported:
+                # Bulk writes skip model signals, so refresh the derived state here
+                catalog_cache.bump_version()
+                barcode_lookup.clear()
+                autocomplete_index.clear()
+        return self.report
+
+    def _clean(self, row):
+        sku = row.get('sku', '')
+        if not sku:
+            raise RowError('SKU خالی است.')
+        if len(sku) > 50:
+            raise RowError(f'SKU {sku} بیش از ۵۰ نویسه است.')
+        if sku in self.seen_skus:
+            raise RowError(f'SKU {sku} در فایل تکراری است.')
+
+        name = row.get('name', '')
+        if not name or len(name) > 100:
+            raise RowError(f'نام محصول {sku} خالی یا بیش از ۱۰۰ نویسه است.')
+
+        cleaned = {
+            'sku': sku,
+            'name': name,
+            'description': row.get('description', ''),
+            'unit_price': self._decimal(row, 'unit_price'),
+            'cost_price': self._decimal(row, 'cost_price', default=Decimal('0')),
+            'reorder_level': self._integer(row, 'reorder_level', default=5),
+            'discount_percent': self._integer(row, 'discount_percent', default=0),
+            'discount_per_unit': self._integer(row, 'discount_per_unit', default=0),
+            'quantity': self._integer(row, QUANTITY_COLUMN, default=0),
+            'is_active': row['is_active'].lower() in TRUE_VALUES if row.get('is_active') else True,
+            'barcode': row.get('barcode', ''),
+            'category_id': None,
+        }
+        if cleaned['unit_price'] <= 0:
+            raise RowError(f'قیمت فروش {sku} باید بیشتر از صفر باشد.')
+        if cleaned['cost_price'] > cleaned['unit_price']:
+            raise RowError(f'قیمت تمام شده {sku} بیشتر از قیمت فروش است.')
+        if cleaned['discount_percent'] > 100:
+            raise RowError(f'درصد تخفیف {sku} بیش از ۱۰۰ است.')
+
+        code = normalize_barcode(cleaned['barcode'])
+        if len(cleaned['barcode']) > 50:
+            raise RowError(f'بارکد {sku} بیش از ۵۰ نویسه است.')
+        if code and self.barcode_owners.get(code, sku) != sku:
+            raise RowError(f'بارکد {code} متعلق به محصول {self.barcode_owners[code]} است.')
+
+        category = row.get('category')
+        if category:
+            cleaned['category_id'] = self.categories.get(category.lower()) or self.categories.get(normalize(category))
+            if cleaned['category_id'] is None:
+                raise RowError(f'دسته‌بندی «{category}» وجود ندارد.')
+
+        self.seen_skus.add(sku)
+        if code:
+            self.barcode_owners[code] = sku
+        return cleaned
+
+    @staticmethod
+    def _number(row, column):
+        return normalize(row.get(column, '')).replace(',', '').replace('٬', '')
+
+    def _decimal(self, row, column, default=None):
+        value = self._number(row, column)
+        if not value and default is not None:
+            return default
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            raise RowError(f'مقدار «{row.get(column, "")}» در ستون {column} عدد نیست.')
+        if number < 0 or number != number.to_integral_value():
+            raise RowError(f'مقدار ستون {column} باید عدد صحیح نامنفی باشد.')
+        return number
+
+    def _integer(self, row, column, default):
+        return int(self._decimal(row, column, default=Decimal(default)))
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        created = sum(1 for row in batch if row['sku'] not in self.existing)
+        if not self.dry_run:
+            self._write(batch)
+        self.report.created += created
+        self.report.updated += len(batch) - created
+        self.report.stock_received += sum(row['quantity'] for row in batch)
+        if self.progress:
+            self.progress(self.report)
+
+    def _write(self, batch):
+        from .models import Product, ProductBarcode, StockMovement
+
+        now = timezone.now()
+        products = []
+        for row in batch:
+            product = Product(
+                sku=row['sku'],
+                slug=self._slug(row['sku']),
+                name=row['name'],
+                description=row['description'],
+                category_id=row['category_id'],
+                unit_price=row['unit_price'],
+                cost_price=row['cost_price'],
+                reorder_level=row['reorder_level'],
+                barcode=row['barcode'],
+                discount_percent=row['discount_percent'],
+                discount_per_unit=row['discount_per_unit'],
+                is_active=row['is_active'],
+                quantity=0,
+                created_at=now,
+                updated_at=now,
+            )
+            products.append(product)
+
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                products, update_conflicts=True, unique_fields=['sku'], update_fields=self.update_fields,
+            )
+            ids = dict(Product.objects.filter(sku__in=[row['sku'] for row in batch]).values_list('sku', 'id'))
+            self.existing.update((product.sku, (ids[product.sku], product.slug)) for product in products)
+
+            if 'barcode' in self.columns:
+                ProductBarcode.objects.filter(product_id__in=ids.values(), is_primary=True).delete()
+                ProductBarcode.objects.bulk_create([
+                    ProductBarcode(product_id=ids[row['sku']], code=normalize_barcode(row['barcode']), is_primary=True)
+                    for row in batch if normalize_barcode(row['barcode'])
+                ], update_conflicts=True, unique_fields=['code'], update_fields=['product', 'is_primary'])
+
+            StockLedger.apply(
+                StockMovement(
+                    product_id=ids[row['sku']],
+                    movement_type='purchase',
+                    quantity=row['quantity'],
+                    note=f'ورود از فایل {self.source}'.strip(),
+                    created_by=self.created_by,
+                )
+                for row in batch if row['quantity']
+            )
+            rebuild_index(Product.objects.filter(id__in=ids.values()), batch_size=len(ids))
+
+    def _slug(self, sku):
+        """Existing products keep their slug; new ones get one from the SKU"""
+        if sku in self.existing:
+            return self.existing[sku][1]
+        base = slugify(sku) or 'product'
+        slug, suffix = base, 1
+        while slug in self.slugs:
+            suffix += 1
+            slug = f'{base}-{suffix}'
+        self.slugs.add(slug)
+        return slug
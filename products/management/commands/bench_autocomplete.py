@@ -0,0 +1,74 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import rolled_back, timer
+from products.autocomplete import PrefixIndex
+from products.models import Product
+
+from .bench_search import FORMS, STRENGTHS, SYLLABLES
+
+
+class Command(BaseCommand):
+    help = 'Measure typeahead lookup latency of the in-memory prefix index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        brands = [''.join(parts) for parts in itertools.product(SYLLABLES, repeat=3)]
+        count = options['products']
+
+        with rolled_back():
+            batch = []
+            for index in range(count):
+                batch.append(Product(
+                    name=f'{rng.choice(FORMS)} {rng.choice(brands)} {rng.choice(STRENGTHS)}',
+                    slug=f'bench-ac-{index}', sku=f'AC-{index:06d}', barcode=f'626{index:010d}',
+                    unit_price=100000, cost_price=50000, is_active=rng.random() > 0.1,
+                ))
+                if len(batch) == 5000:
+                    Product.objects.bulk_create(batch)
+                    batch = []
+            Product.objects.bulk_create(batch)
+
+            index = PrefixIndex()
+            with timer() as elapsed:
+                index.load()
+            self.stdout.write(f'loaded {count} products in {elapsed["seconds"]:.2f}s')
+
+            queries = [self._random_query(rng, brands, count) for _ in range(options['queries'])]
+            self._measure('lookup, active only', queries, lambda query: index.lookup(query))
+            self._measure('lookup, all products', queries, lambda query: index.lookup(query, active_only=False))
+
+            product = Product.objects.filter(sku__startswith='AC-').first()
+            self._measure('incremental update', range(1000), lambda _: index.update(product))
+
+    def _measure(self, label, queries, run):
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            run(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{label:25} p50 {statistics.median(latencies):7.3f} ms   '
+            f'p99 {p99:7.3f} ms   ({len(latencies)} runs)'
+        )
+
+    @staticmethod
+    def _random_query(rng, brands, count):
+        brand = rng.choice(brands)
+        return rng.choice([
+            brand[:rng.randint(1, 4)],  # typing a name
+            f'{rng.choice(FORMS)} {brand[:2]}',
+            f'ac-{rng.randrange(count):06d}'[:rng.randint(4, 9)],  # SKU prefix
+            f'626{rng.randrange(count):010d}'[:rng.randint(5, 13)],  # scanned barcode
+        ])
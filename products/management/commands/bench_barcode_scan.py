@@ -0,0 +1,72 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from core.benchmarks import rolled_back, timer
+from products.barcodes import BarcodeLookup
+from products.models import Product, ProductBarcode
+
+
+class Command(BaseCommand):
+    help = 'Compare barcode scan lookups: unindexed column, mapping table and scan cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50_000)
+        parser.add_argument('--scans', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = options['products']
+
+        with rolled_back():
+            self._seed(count)
+            codes = [barcode for barcode, in Product.objects.filter(sku__startswith='BB-').values_list('barcode')]
+            rng.shuffle(codes)
+            # A counter sees the same popular items over and over
+            weights = [1 / (rank + 1) for rank in range(len(codes))]
+            scans = rng.choices(codes, weights, k=options['scans'])
+
+            self._measure('Product.barcode column', scans[:200], lambda code: Product.objects.filter(barcode=code).first())
+            with override_settings(BARCODE_CACHE_SIZE=0):
+                uncached = BarcodeLookup()
+                self._measure('mapping table', scans, uncached.lookup)
+            cached = BarcodeLookup()
+            self._measure('mapping table + scan cache', scans, cached.lookup)
+            self.stdout.write(f'scan cache hit rate {cached.stats()["hit_rate"]:.1%}')
+
+    def _measure(self, label, scans, lookup):
+        latencies = []
+        with timer() as elapsed:
+            for code in scans:
+                started = time.perf_counter()
+                lookup(code)
+                latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{label:28} p50 {statistics.median(latencies):7.3f} ms   p99 {p99:7.3f} ms   '
+            f'{len(scans) / elapsed["seconds"]:8.0f} scans/s   ({len(scans)} scans)'
+        )
+
+    @staticmethod
+    def _seed(count):
+        batch = []
+        for index in range(count):
+            batch.append(Product(
+                name=f'bench barcode {index}', slug=f'bench-barcode-{index}', sku=f'BB-{index:06d}',
+                barcode=f'626{index:010d}', unit_price=100000, cost_price=50000, quantity=10,
+            ))
+            if len(batch) == 5000:
+                ProductBarcode.objects.bulk_create(
+                    ProductBarcode(product=product, code=product.barcode, is_primary=True)
+                    for product in Product.objects.bulk_create(batch)
+                )
+                batch = []
+        ProductBarcode.objects.bulk_create(
+            ProductBarcode(product=product, code=product.barcode, is_primary=True)
+            for product in Product.objects.bulk_create(batch)
+        )
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from core.benchmarks import rolled_back, timer
+from products.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = 'Compare parent-walking with materialized paths for breadcrumbs and subtree listings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depth', type=int, default=5, help='Levels in the tree')
+        parser.add_argument('--nodes', type=int, default=2000, help='Categories to create')
+        parser.add_argument('--repeat', type=int, default=200, help='Lookups per measurement')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            leaves, root = self._seed(options['depth'], options['nodes'])
+            leaves = list(Category.objects.filter(id__in=[leaf.id for leaf in leaves]))
+            root.refresh_from_db()
+            repeat = options['repeat']
+
+            self._measure('breadcrumbs (parent walk)', repeat, lambda i: self._walk(leaves[i % len(leaves)]))
+            with override_settings(CATALOG_CACHE_ENABLED=False):
+                self._measure(
+                    'breadcrumbs (path, uncached)', repeat,
+                    lambda i: Product.objects.get_category_breadcrumbs(leaves[i % len(leaves)]),
+                )
+            for leaf in leaves:
+                Product.objects.get_category_breadcrumbs(leaf)
+            self._measure(
+                'breadcrumbs (path, cached)', repeat,
+                lambda i: Product.objects.get_category_breadcrumbs(leaves[i % len(leaves)]),
+            )
+            self._measure('subtree (recursive ids)', repeat // 10 or 1, lambda i: self._recursive_subtree(root))
+            self._measure('subtree (path range)', repeat // 10 or 1, lambda i: Product.objects.in_category(root).count())
+
+    def _measure(self, label, repeat, func):
+        with CaptureQueriesContext(connection) as queries, timer() as elapsed:
+            for index in range(repeat):
+                func(index)
+        self.stdout.write(
+            f"{label:30} {elapsed['seconds'] * 1000 / repeat:8.3f} ms/op, "
+            f"{len(queries) / repeat:6.1f} queries/op"
+        )
+
+    @staticmethod
+    def _walk(category):
+        """Breadcrumbs as they were built before paths existed"""
+        breadcrumbs = []
+        current = Category.objects.get(pk=category.pk)
+        while current:
+            breadcrumbs.insert(0, current)
+            current = current.parent
+        return breadcrumbs
+
+    @staticmethod
+    def _recursive_subtree(root):
+        ids, frontier = [root.pk], [root.pk]
+        while frontier:
+            frontier = list(Category.objects.filter(parent_id__in=frontier).values_list('id', flat=True))
+            ids.extend(frontier)
+        return Product.objects.filter(category_id__in=ids).count()
+
+    def _seed(self, depth, nodes):
+        per_level = max(nodes // depth, 1)
+        parents, created = [None], 0
+        for level in range(depth):
+            level_nodes = []
+            for index in range(per_level):
+                parent = parents[index % len(parents)]
+                level_nodes.append(Category.objects.create(
+                    name=f'bench-tree-{level}-{index}', slug=f'bench-tree-{level}-{index}', parent=parent,
+                ))
+                created += 1
+            parents = level_nodes
+        Product.objects.bulk_create([
+            Product(
+                name=f'bench-{index}', slug=f'bench-tree-{index}', sku=f'BENCH-TREE-{index}',
+                category=parents[index % len(parents)], unit_price=100000, cost_price=50000,
+            )
+            for index in range(created)
+        ])
+        root = Category.objects.filter(parent=None, name__startswith='bench-tree-0-').first()
+        return parents, root
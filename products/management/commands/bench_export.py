@@ -0,0 +1,42 @@
+import io
+import random
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import rolled_back, timer
+from products.exports import InventoryValuationExport
+from products.importer import ProductImporter, open_rows
+
+from .bench_product_import import Command as ImportBench
+
+
+class NullWriter:
+    def write(self, value):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Show that streaming the inventory export keeps peak memory flat as the catalog grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 50_000])
+
+    def handle(self, *args, **options):
+        for count in options['rows']:
+            with rolled_back():
+                data = ImportBench._price_list(random.Random(count), count)
+                columns, rows = open_rows(io.BytesIO(data), 'bench.csv')
+                ProductImporter().run(columns, rows, source='bench.csv')
+                del data
+
+                self._measure(f'{count} products, streamed', lambda: InventoryValuationExport().write_to(NullWriter()))
+                self._measure(f'{count} products, list()', lambda: list(InventoryValuationExport().get_queryset()))
+
+    def _measure(self, label, func):
+        tracemalloc.start()
+        with timer() as elapsed:
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(f'{label:30} {elapsed["seconds"]:7.2f}s  peak {peak / 2 ** 20:7.1f} MB')
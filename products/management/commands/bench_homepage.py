@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from core.benchmarks import rolled_back, timer
+from products.cache import catalog_cache
+from products.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = 'Compare homepage throughput with the catalog cache on and off'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per run')
+        parser.add_argument('--seed', type=int, default=100, help='Products to create before measuring')
+
+    def handle(self, *args, **options):
+        with rolled_back(), override_settings(ALLOWED_HOSTS=['*']):
+            self._seed(options['seed'])
+            client = Client()
+            for enabled in (False, True):
+                with override_settings(CATALOG_CACHE_ENABLED=enabled):
+                    self._run(client, options['requests'], enabled)
+
+    def _run(self, client, requests, enabled):
+        catalog_cache.reset_stats()
+        client.get('/')  # warm templates (and the cache, when enabled)
+        with CaptureQueriesContext(connection) as queries, timer() as elapsed:
+            for _ in range(requests):
+                client.get('/')
+
+        stats = catalog_cache.stats()
+        self.stdout.write(
+            f"cache {'on ' if enabled else 'off'}: {requests / elapsed['seconds']:8.1f} req/s, "
+            f"{len(queries) / requests:5.1f} queries/request, "
+            f"hits={stats['hits']} misses={stats['misses']}"
+        )
+
+    def _seed(self, count):
+        category = Category.objects.create(name='bench-home', slug='bench-home')
+        Product.objects.bulk_create([
+            Product(
+                name=f'bench-{index}', slug=f'bench-home-{index}', sku=f'BENCH-HOME-{index}',
+                category=category, unit_price=100000, cost_price=50000, quantity=10,
+                recommended=index % 3 == 0, discount_percent=10 if index % 2 else 0,
+            )
+            for index in range(count)
+        ])
@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+
+from core.benchmarks import rolled_back
+from core.pagination import KeysetPaginator
+from products.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = 'Compare OFFSET and keyset pagination on page 1 and a deep page of the product list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--per-page', type=int, default=20)
+        parser.add_argument('--page', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        per_page, deep = options['per_page'], options['page']
+        with rolled_back():
+            self._seed(options['products'])
+            queryset = Product.objects.filter(is_active=True).order_by('name', 'id')
+            paginator = KeysetPaginator(queryset, per_page, ordering=('name', 'id'))
+
+            # Walk to the deep page once; a user following "next" links holds its cursor
+            cursor = None
+            for _ in range(deep - 1):
+                cursor = paginator.page(cursor).next_cursor
+
+            for number, keyset_cursor in ((1, None), (deep, cursor)):
+                self._measure(f'offset, page {number}', options['repeat'], lambda: list(
+                    Paginator(queryset, per_page).page(number).object_list
+                ))
+                self._measure(f'keyset, page {number}', options['repeat'], lambda: list(
+                    paginator.page(keyset_cursor).object_list
+                ))
+
+    def _measure(self, label, repeat, run):
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            latencies.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(f'{label:20} median {statistics.median(latencies):8.2f} ms   max {max(latencies):8.2f} ms')
+
+    @staticmethod
+    def _seed(count):
+        category = Category.objects.create(name='bench-pagination', slug='bench-pagination')
+        batch = []
+        for index in range(count):
+            batch.append(Product(
+                # Few distinct names, so the id tiebreaker is exercised
+                name=f'کالا {index % 997:03d}', slug=f'bench-page-{index}', sku=f'BP-{index:06d}',
+                category=category, unit_price=100000, cost_price=50000, quantity=5,
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
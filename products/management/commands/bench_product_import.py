@@ -0,0 +1,90 @@
+import csv
+import io
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.benchmarks import rolled_back, timer
+from products.forms import ProductForm
+from products.importer import ProductImporter, open_rows
+from products.models import Category
+
+from .bench_search import FORMS, STRENGTHS
+
+
+class Command(BaseCommand):
+    help = 'Measure the bulk product import against saving rows one by one through ProductForm'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--form-rows', type=int, default=500, help='Rows for the per-row baseline')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        data = self._price_list(rng, options['rows'])
+        self.stdout.write(f'generated {options["rows"]} rows ({len(data) / 1e6:.1f} MB)')
+
+        with rolled_back():
+            self._measure('ProductForm, one by one', options['form_rows'], lambda: self._form_import(rng, options['form_rows']))
+
+        with rolled_back():
+            importer = ProductImporter(batch_size=options['batch_size'], dry_run=True)
+            self._measure('dry run (validate only)', options['rows'], lambda: self._run(importer, data))
+            importer = ProductImporter(batch_size=options['batch_size'])
+            self._measure('import, new products', options['rows'], lambda: self._run(importer, data))
+            importer = ProductImporter(batch_size=options['batch_size'])
+            self._measure('import, price update', options['rows'], lambda: self._run(importer, data))
+
+    def _measure(self, label, rows, func):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count), timer() as elapsed:
+            func()
+        self.stdout.write(
+            f'{label:28} {elapsed["seconds"]:7.2f}s  {rows / elapsed["seconds"]:8.0f} rows/s  '
+            f'{queries:7} queries'
+        )
+
+    @staticmethod
+    def _run(importer, data):
+        columns, rows = open_rows(io.BytesIO(data), 'bench.csv')
+        report = importer.run(columns, rows, source='bench.csv')
+        assert not report.skipped, report.errors[:5]
+
+    @staticmethod
+    def _price_list(rng, count):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['sku', 'name', 'unit_price', 'cost_price', 'quantity', 'barcode', 'description'])
+        for index in range(count):
+            cost = rng.randrange(10_000, 2_000_000, 1000)
+            writer.writerow([
+                f'IMP-{index:06d}',
+                f'{rng.choice(FORMS)} وارداتی {index} {rng.choice(STRENGTHS)}',
+                cost + rng.randrange(0, cost, 1000),
+                cost,
+                rng.randint(0, 50),
+                f'627{index:010d}',
+                'فهرست قیمت توزیع‌کننده',
+            ])
+        return output.getvalue().encode()
+
+    @staticmethod
+    def _form_import(rng, count):
+        category = Category.objects.create(name='bench-import', slug='bench-import')
+        for index in range(count):
+            form = ProductForm(data={
+                'name': f'{rng.choice(FORMS)} فرم {index}', 'slug': f'form-{index}', 'sku': f'FORM-{index:06d}',
+                'category': category.pk, 'unit_price': 20000, 'cost_price': 10000, 'quantity': 5, 'reorder_level': 5,
+                'discount_percent': 0, 'discount_per_unit': 0, 'barcode': f'628{index:010d}', 'is_active': True,
+            })
+            assert form.is_valid(), form.errors
+            form.save()
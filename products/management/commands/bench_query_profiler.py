@@ -0,0 +1,61 @@
+import statistics
+import tempfile
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.benchmarks import rolled_back, timer
+from orders.models import Cart, CartItem
+from products.models import Product
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Measure the request overhead of the query profiler middleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per URL and mode')
+
+    def handle(self, *args, **options):
+        with rolled_back(), tempfile.TemporaryDirectory() as directory, override_settings(ALLOWED_HOSTS=['testserver']):
+            urls = self._seed()
+            clients = {enabled: self._client(enabled, directory) for enabled in (False, True)}
+            self.stdout.write(f'{"url":28} {"off ms":>8} {"on ms":>8} {"overhead":>9}')
+            for url in urls:
+                latencies = {False: [], True: []}
+                # Alternate the two stacks request by request so drift hits both alike
+                for _ in range(options['requests']):
+                    for enabled, client in clients.items():
+                        with timer() as elapsed:
+                            client.get(url)
+                        latencies[enabled].append(elapsed['seconds'])
+                off, on = statistics.median(latencies[False]), statistics.median(latencies[True])
+                self.stdout.write(f'{url:28} {off * 1000:8.2f} {on * 1000:8.2f} {(on / off - 1) * 100:8.1f}%')
+
+    def _client(self, enabled, directory):
+        """A logged-in client whose middleware stack was built with the profiler on or off"""
+        with override_settings(QUERY_PROFILER_ENABLED=enabled, QUERY_PROFILER_LOG=f'{directory}/queries.log'):
+            client = Client()
+            client.force_login(self.user)
+            client.get(reverse('products:home'))
+        return client
+
+    def _seed(self):
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'محصول پروفایل {index}', slug=f'bench-profiler-{index}', sku=f'BP-{index}',
+                unit_price=Decimal('10000'), cost_price=Decimal('6000'), quantity=100,
+            )
+            for index in range(30)
+        ])
+        self.user = User.objects.create(phone_number='09390000000')
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=1) for product in products[:10]])
+        return [
+            reverse('products:product_list'),
+            reverse('products:product_detail', args=[products[0].slug]),
+            reverse('orders:cart_api_summary'),
+            reverse('orders:cart_detail'),
+        ]
@@ -0,0 +1,70 @@
+import datetime
+import io
+import random
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.benchmarks import rolled_back, timer
+from orders.models import DailyProductSales
+from products.models import Category, Product
+from products.reorder import ReorderPlanner
+
+
+class Command(BaseCommand):
+    help = 'Time the low-stock query and the reorder report over a generated catalog and sales history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--low-stock', type=float, default=0.05, help='Share of products at or below reorder level')
+        parser.add_argument('--sellers', type=int, default=1000, help='Products with a sale every day')
+        parser.add_argument('--days', type=int, default=730, help='Days of sales history')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with rolled_back():
+            with timer() as elapsed:
+                self._seed(rng, options)
+            self.stdout.write(f'{options["products"]} products and {options["days"]} days of sales in {elapsed["seconds"]:.1f}s')
+
+            with timer() as elapsed:
+                python_side = sum(1 for product in Product.objects.all() if product.low_stock)
+            self.stdout.write(f'low stock via the property:  {elapsed["seconds"] * 1000:8.1f}ms ({python_side} products)')
+            with timer() as elapsed:
+                sql_side = Product.objects.low_stock().count()
+            self.stdout.write(f'low stock via the index:     {elapsed["seconds"] * 1000:8.1f}ms ({sql_side} products)')
+
+            with timer() as elapsed:
+                rows = ReorderPlanner().write_report(io.StringIO())
+            self.stdout.write(f'reorder report:              {elapsed["seconds"] * 1000:8.1f}ms ({rows} rows)')
+
+    @staticmethod
+    def _seed(rng, options):
+        category = Category.objects.create(name='bench-reorder', slug='bench-reorder')
+        batch = []
+        for index in range(options['products']):
+            low = rng.random() < options['low_stock']
+            batch.append(Product(
+                name=f'کالا {index}', slug=f'bench-reorder-{index}', sku=f'BR-{index:06d}', category=category,
+                unit_price=100000, cost_price=50000, reorder_level=10,
+                quantity=rng.randint(0, 10) if low else rng.randint(11, 500),
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+
+        product_ids = list(Product.objects.filter(category=category).values_list('id', flat=True))
+        sellers = rng.sample(product_ids, min(options['sellers'], len(product_ids)))
+        today = timezone.localdate()
+        batch = []
+        for offset in range(options['days']):
+            date = today - datetime.timedelta(days=offset)
+            for product_id in sellers:
+                quantity = rng.randint(1, 5)
+                batch.append(DailyProductSales(date=date, product_id=product_id, quantity=quantity, revenue=quantity * 100000))
+            if len(batch) >= 20000:
+                DailyProductSales.objects.bulk_create(batch)
+                batch = []
+        DailyProductSales.objects.bulk_create(batch)
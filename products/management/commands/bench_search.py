@@ -0,0 +1,95 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.benchmarks import rolled_back, timer
+from products.models import Category, Product
+from products.search import ProductSearch, rebuild_index
+
+FORMS = ['قرص', 'شربت', 'کپسول', 'پماد', 'قطره', 'کرم', 'ژل', 'اسپری', 'شامپو', 'محلول', 'پودر', 'لوسیون']
+SYLLABLES = ['آ', 'ما', 'نو', 'ری', 'سا', 'تک', 'لی', 'پا', 'زی', 'کو', 'فر', 'دی', 'مه', 'رو', 'بی', 'سن']
+STRENGTHS = ['۵', '۱۰', '۲۵', '۵۰', '۱۰۰', '۲۵۰', '۵۰۰', '۱۰۰۰']
+
+
+class Command(BaseCommand):
+    help = 'Measure product search latency over a generated catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        brands = [''.join(parts) for parts in itertools.product(SYLLABLES, repeat=3)]
+        rng.shuffle(brands)
+        vocabulary = [f'{brand}ی' for brand in brands[:600]]
+
+        with rolled_back():
+            categories = self._seed(rng, options['products'], brands, vocabulary)
+            with timer() as elapsed:
+                rebuild_index()
+            self.stdout.write(f"indexed {options['products']} products in {elapsed['seconds']:.1f}s")
+
+            queries = [self._random_query(rng, brands) for _ in range(options['queries'])]
+            self._measure('search, first page', queries, lambda query: ProductSearch(query)[:20])
+            self._measure('search + category + in stock', queries, lambda query: ProductSearch(
+                query, category=rng.choice(categories), available_only=True,
+            )[:20])
+            self._measure('icontains, first page', queries[:30], lambda query: list(
+                Product.objects.filter(Q(name__icontains=query) | Q(description__icontains=query))
+                .order_by('name')[:20]
+            ))
+
+    def _measure(self, label, queries, run):
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            run(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{label:30} p50 {statistics.median(latencies):7.2f} ms   '
+            f'p99 {p99:7.2f} ms   ({len(latencies)} queries)'
+        )
+
+    @staticmethod
+    def _random_query(rng, brands):
+        brand = rng.choice(brands)
+        words = rng.choice([
+            [brand],
+            [rng.choice(FORMS), brand],
+            [rng.choice(FORMS), brand, rng.choice(STRENGTHS)],
+            [brand[:rng.randint(2, 4)]],  # half typed
+            [rng.choice(FORMS)],
+        ])
+        # Users type Arabic or Persian ye/kaf interchangeably
+        return ' '.join(words).replace('ی', rng.choice('یي')).replace('ک', rng.choice('کك'))
+
+    @staticmethod
+    def _seed(rng, count, brands, vocabulary):
+        categories = Category.objects.bulk_create([
+            Category(name=f'bench-search-{index}', slug=f'bench-search-{index}')
+            for index in range(20)
+        ])
+        # Zipf-like: a few description words are very common, most are rare
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        batch = []
+        for index in range(count):
+            batch.append(Product(
+                name=f'{rng.choice(FORMS)} {rng.choice(brands)} {rng.choice(STRENGTHS)}',
+                slug=f'bench-search-{index}', sku=f'BS-{index:06d}', barcode=f'626{index:010d}',
+                description=' '.join(rng.choices(vocabulary, weights, k=15)),
+                category=categories[index % len(categories)],
+                unit_price=100000, cost_price=50000, quantity=rng.randint(0, 20),
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        return categories
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import ExportFilterForm, get_export, registry
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV export (orders, order-items, inventory, stock-movements) to a file or stdout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Export name')
+        parser.add_argument('-o', '--output', help='File to write (stdout by default)')
+        parser.add_argument('--from', dest='date_from', help='First day, YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Last day, YYYY-MM-DD (inclusive)')
+        parser.add_argument('--status', help='Status / type to filter on')
+
+    def handle(self, *args, **options):
+        export_class = get_export(options['name'])
+        if export_class is None:
+            raise CommandError(f'Unknown export {options["name"]!r}; choose from {", ".join(sorted(registry))}')
+
+        form = ExportFilterForm(
+            {key: options[key] or '' for key in ('date_from', 'date_to', 'status')},
+            export_class=export_class,
+        )
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        export = export_class(**form.cleaned_data)
+
+        if not options['output']:
+            self.stdout.ending = ''
+            export.write_to(self.stdout)
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as file:
+            count = export.write_to(file)
+        self.stderr.write(self.style.SUCCESS(f'{count} rows written to {options["output"]}'))
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import ProductImportError, ProductImporter, open_rows
+
+
+class Command(BaseCommand):
+    help = 'Upsert products from a CSV or XLSX price list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report without saving')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        importer = ProductImporter(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            progress=lambda report: self.stdout.write(
+                f'{report.rows} rows read, {report.imported} valid, {report.skipped} skipped', ending='\r',
+            ),
+        )
+        try:
+            with path.open('rb') as file:
+                columns, rows = open_rows(file, path.name)
+                report = importer.run(columns, rows, source=path.name)
+        except (OSError, ProductImportError) as error:
+            raise CommandError(str(error))
+
+        self.stdout.write('')
+        for line, message in report.errors:
+            self.stdout.write(self.style.WARNING(f'line {line}: {message}'))
+        summary = (
+            f'{report.rows} rows: {report.created} new, {report.updated} updated, '
+            f'{report.skipped} skipped, {report.stock_received} units received'
+        )
+        if report.dry_run:
+            summary = f'Dry run, nothing saved. {summary}'
+        self.stdout.write(self.style.SUCCESS(summary))
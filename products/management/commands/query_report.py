@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from core.profiling import log_path, read_profiles, summarize
+
+SORT_KEYS = {
+    'db': lambda profile: profile.db_ms,
+    'queries': lambda profile: profile.avg_queries,
+    'repeated': lambda profile: profile.repeated,
+}
+
+
+class Command(BaseCommand):
+    help = 'Print the views and repeated queries the query profiler logged the most database work for'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='Profiler log to read (QUERY_PROFILER_LOG by default)')
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='db', help='Rank views by total db time, '
+                            'average queries per request or repeated queries')
+
+    def handle(self, *args, **options):
+        path = options['log'] or log_path()
+        views, duplicates = summarize(read_profiles(path))
+        if not views:
+            self.stdout.write(f'No requests logged in {path}')
+            return
+
+        self.stdout.write(f'{sum(profile.requests for profile in views.values())} requests in {path}\n')
+        self.stdout.write(
+            f'{"view":45} {"requests":>8} {"avg q":>7} {"p95 q":>7} {"max q":>7} {"avg db ms":>10} '
+            f'{"total db ms":>12} {"repeated":>9}'
+        )
+        ranked = sorted(views.values(), key=SORT_KEYS[options['sort']], reverse=True)
+        for profile in ranked[:options['top']]:
+            self.stdout.write(
+                f'{profile.view[:45]:45} {profile.requests:8} {profile.avg_queries:7.1f} {profile.p95_queries:7.1f} '
+                f'{profile.max_queries:7} {profile.avg_db_ms:10.2f} {profile.db_ms:12.1f} {profile.repeated:9}'
+            )
+
+        if duplicates:
+            self.stdout.write('\nMost repeated queries (likely N+1s):')
+            top = sorted(duplicates.items(), key=lambda item: item[1], reverse=True)[:options['top']]
+            for (view, key), count in top:
+                self.stdout.write(f'{count:8}  {view}\n          {key[:300]}')
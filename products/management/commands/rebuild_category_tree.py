@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.cache import catalog_cache
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized path and depth of every category'
+
+    def handle(self, *args, **options):
+        children = {}
+        for pk, parent_id in Category.objects.values_list('id', 'parent_id'):
+            children.setdefault(parent_id, []).append(pk)
+
+        categories = []
+        stack = [(pk, '', 0) for pk in children.get(None, [])]
+        while stack:
+            pk, parent_path, depth = stack.pop()
+            path = f'{parent_path}{pk:0{Category.PATH_SEGMENT_WIDTH}d}{Category.PATH_SEPARATOR}'
+            categories.append(Category(id=pk, path=path, depth=depth))
+            stack.extend((child, path, depth + 1) for child in children.get(pk, []))
+
+        with transaction.atomic():
+            Category.objects.bulk_update(categories, ['path', 'depth'], batch_size=500)
+        catalog_cache.bump_version()
+
+        unreachable = sum(len(ids) for ids in children.values()) - len(categories)
+        self.stdout.write(self.style.SUCCESS(f'{len(categories)} categories rebuilt'))
+        if unreachable:
+            self.stdout.write(self.style.WARNING(f'{unreachable} categories are part of a parent cycle'))
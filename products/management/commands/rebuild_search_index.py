@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--ids', type=int, nargs='*', help='Only reindex these product ids')
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['ids']:
+            products = products.filter(id__in=options['ids'])
+
+        indexed = rebuild_index(
+            products,
+            batch_size=options['batch_size'],
+            progress=lambda count: self.stdout.write(f'{count} products indexed', ending='\r'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'{indexed} products indexed'))
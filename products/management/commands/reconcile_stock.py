@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.stock import StockLedger
+
+
+class Command(BaseCommand):
+    help = 'Check every product quantity against the sum of its stock movements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Record adjustments for the differences')
+        parser.add_argument('--limit', type=int, default=50, help='Mismatches to list')
+
+    def handle(self, *args, **options):
+        mismatches = StockLedger.discrepancies().only('id', 'sku', 'name', 'quantity')
+        count = mismatches.count()
+        if not count:
+            self.stdout.write(self.style.SUCCESS('Stock ledger matches every product'))
+            return
+
+        for product in mismatches[:options['limit']]:
+            self.stdout.write(
+                f'{product.sku:20} quantity {product.quantity:8} ledger {product.ledger_quantity:8} '
+                f'({product.quantity - product.ledger_quantity:+d})'
+            )
+        if count > options['limit']:
+            self.stdout.write(f'... and {count - options["limit"]} more')
+
+        if not options['fix']:
+            raise CommandError(f'{count} products differ from the stock ledger')
+        movements = StockLedger.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'{len(movements)} adjustments recorded'))
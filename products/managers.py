@@ -11,6 +11,10 @@ class ProductManager(models.Manager):
         """Get active products with stock."""
         return self.filter(is_active=True, quantity__gt=0)
     
+    def low_stock(self):
+        """Get products at or below their reorder level (served by a partial index)."""
+        return self.filter(quantity__lte=models.F('reorder_level'))
+    
     def recommended(self):
         """Get recommended active products."""
         return self.filter(recommended=True, is_active=True)
@@ -39,11 +43,24 @@ class ProductManager(models.Manager):
             quantity__gt=0
         )[:limit]
     
+    def search(self, query, **filters):
+        """Get products matching ``query``, best matches first."""
+        from .search import ProductSearch
+        return ProductSearch(query, **filters)
+    
+    def in_category(self, category):
+        """Get products in a category and all of its descendants."""
+        return self.filter(category.subtree_q(category.path, prefix='category__'))
+    
     def get_category_breadcrumbs(self, category):
-        """Generate category breadcrumbs."""
-        breadcrumbs = []
-        current = category
-        while current:
-            breadcrumbs.insert(0, current)
-            current = current.parent
-        return breadcrumbs
+        """Generate category breadcrumbs from the materialized path."""
+        if category is None:
+            return []
+        
+        def build():
+            ancestor_ids = category.ancestor_ids[:-1]
+            ancestors = category._meta.model.objects.in_bulk(ancestor_ids)
+            return [ancestors[pk] for pk in ancestor_ids if pk in ancestors] + [category]
+        
+        from .cache import catalog_cache
+        return catalog_cache.get_or_set(f'breadcrumbs:{category.path}', build)
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:58
+
+from django.db import migrations, models
+
+
+def populate_category_paths(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    children = {}
+    for pk, parent_id in Category.objects.values_list('id', 'parent_id'):
+        children.setdefault(parent_id, []).append(pk)
+
+    # Walk down from the roots so parents are known before their children
+    updated = []
+    queue = [(pk, '', 0) for pk in children.get(None, [])]
+    while queue:
+        pk, parent_path, depth = queue.pop()
+        path = f'{parent_path}{pk:010d}/'
+        updated.append(Category(id=pk, path=path, depth=depth))
+        queue.extend((child, path, depth + 1) for child in children.get(pk, []))
+    Category.objects.bulk_update(updated, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_product_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_category_paths, migrations.RunPython.noop),
+    ]
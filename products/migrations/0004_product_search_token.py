@@ -0,0 +1,69 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:01
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of products.search as of this migration, so later changes
+# to the tokenizer do not change what this migration writes
+CHARACTER_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    '\u200c': None, '\u200d': None, '\u0640': None,
+})
+DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+TOKEN_PATTERN = re.compile(r'\w+')
+MAX_TOKEN_LENGTH = 64
+FIELD_WEIGHTS = {'name': 10, 'sku': 8, 'barcode': 8, 'description': 1}
+
+
+def tokenize(text):
+    text = DIACRITICS.sub('', str(text or '')).translate(CHARACTER_MAP).lower()
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_PATTERN.findall(text)]
+
+
+def build_tokens(product):
+    weights = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in set(tokenize(getattr(product, field))):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def index_existing_products(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductSearchToken = apps.get_model('products', 'ProductSearchToken')
+    ProductSearchToken.objects.bulk_create([
+        ProductSearchToken(product_id=product.id, token=token, weight=weight)
+        for product in Product.objects.only('name', 'sku', 'barcode', 'description').iterator()
+        for token, weight in build_tokens(product).items()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_category_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'product', 'weight'], name='search_token_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:31
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of products.barcodes.normalize_barcode as of this migration
+CHARACTER_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    '\u200c': None, '\u200d': None, '\u0640': None,
+})
+DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+
+
+def normalize_barcode(code):
+    text = DIACRITICS.sub('', str(code or '')).translate(CHARACTER_MAP).lower()
+    return ''.join(text.split())
+
+
+def copy_product_barcodes(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductBarcode = apps.get_model('products', 'ProductBarcode')
+    # Barcodes were not unique; the oldest product keeps a shared one
+    rows = {}
+    for pk, barcode in Product.objects.exclude(barcode='').order_by('-id').values_list('id', 'barcode').iterator():
+        code = normalize_barcode(barcode)
+        if code:
+            rows[code] = pk
+    ProductBarcode.objects.bulk_create([
+        ProductBarcode(code=code, product_id=pk, is_primary=True) for code, pk in rows.items()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_search_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductBarcode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50, unique=True)),
+                ('is_primary', models.BooleanField(default=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='barcodes', to='products.product')),
+            ],
+        ),
+        migrations.RunPython(copy_product_barcodes, migrations.RunPython.noop),
+    ]
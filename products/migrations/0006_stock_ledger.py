@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def open_ledger_balances(apps, schema_editor):
+    """Record an adjustment so every product's ledger sums to its quantity"""
+    Product = apps.get_model('products', 'Product')
+    StockMovement = apps.get_model('products', 'StockMovement')
+    ledger = dict(
+        StockMovement.objects.values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+    )
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=pk,
+            movement_type='adjustment',
+            quantity=quantity - ledger.get(pk, 0),
+            before_quantity=ledger.get(pk, 0),
+            after_quantity=quantity,
+            note='موجودی اولیه',
+        )
+        for pk, quantity in Product.objects.values_list('id', 'quantity').iterator()
+        if quantity != ledger.get(pk, 0)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_barcode'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'created_at'], name='stock_movement_product_idx'),
+        ),
+        migrations.RunPython(open_ledger_balances, migrations.RunPython.noop),
+    ]
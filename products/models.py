@@ -1,6 +1,8 @@
 # product/models.py
-from django.db import models
+from django.db import models, transaction
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Concat, Substr
 from .managers import ProductManager
 
 class Category(models.Model):
@@ -13,10 +15,68 @@ class Category(models.Model):
     )
     image = models.ImageField(upload_to='category_images/', null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    # Materialized path of zero-padded ancestor ids, e.g. "0000000001/0000000007/"
+    path = models.CharField(max_length=255, blank=True, default='', db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    PATH_SEGMENT_WIDTH = 10
+    PATH_SEPARATOR = '/'
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        parent_path, parent_depth = self._get_parent_path()
+        if self.path and parent_path.startswith(self.path):
+            raise ValueError('دسته‌بندی نمی‌تواند زیرمجموعه خودش باشد.')
+
+        super().save(*args, **kwargs)
+
+        old_path, old_depth = self.path, self.depth
+        new_path = f'{parent_path}{self.pk:0{self.PATH_SEGMENT_WIDTH}d}{self.PATH_SEPARATOR}'
+        new_depth = parent_depth + 1 if self.parent_id else 0
+        if new_path == old_path:
+            return
+
+        Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+        if old_path:
+            # Move the whole subtree with one UPDATE
+            Category.objects.filter(self.subtree_q(old_path)).exclude(pk=self.pk).update(
+                path=Concat(models.Value(new_path), Substr('path', len(old_path) + 1)),
+                depth=models.F('depth') + (new_depth - old_depth),
+            )
+        self.path, self.depth = new_path, new_depth
+
+    def clean(self):
+        parent_path, _ = self._get_parent_path()
+        if self.path and parent_path.startswith(self.path):
+            raise ValidationError({'parent': 'دسته‌بندی نمی‌تواند زیرمجموعه خودش باشد.'})
+
+    def _get_parent_path(self):
+        if not self.parent_id:
+            return '', -1
+        return Category.objects.filter(pk=self.parent_id).values_list('path', 'depth').get()
+
+    @classmethod
+    def subtree_q(cls, path, prefix=''):
+        """
+        Q object matching ``path`` and all of its descendants as an index range
+        (``path <= x < path'``), which every database can serve from the index.
+        """
+        upper = path[:-1] + chr(ord(cls.PATH_SEPARATOR) + 1)
+        return models.Q(**{f'{prefix}path__gte': path, f'{prefix}path__lt': upper})
+
+    @property
+    def ancestor_ids(self):
+        """Ids from the root down to this category, read from the path"""
+        return [int(segment) for segment in self.path.split(self.PATH_SEPARATOR) if segment]
+
+    def get_descendants(self, include_self=True):
+        queryset = Category.objects.filter(self.subtree_q(self.path))
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
 class Product(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
@@ -58,6 +118,17 @@ class Product(models.Model):
 
     objects = ProductManager()
 
+    class Meta:
+        indexes = [
+            # Serves the storefront listing and its keyset pages
+            models.Index(fields=['name', 'id'], name='product_active_name_idx', condition=models.Q(is_active=True)),
+            # Only the few products at or below their reorder level, for ProductManager.low_stock()
+            models.Index(
+                fields=['id'], name='product_low_stock_idx',
+                condition=models.Q(quantity__lte=models.F('reorder_level')),
+            ),
+        ]
+
     @property
     def effective_unit_price(self):
         """Calculate discounted price with proper decimal handling."""
@@ -74,6 +145,26 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Saved in one transaction with the post_save receivers (barcode
+        mapping, opening ledger entry), so a barcode conflict writes nothing.
+        """
+        from .barcodes import check_barcode
+
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            if update_fields is None or 'barcode' in update_fields:
+                check_barcode(self)
+            super().save(*args, **kwargs)
+
+    def clean(self):
+        from .barcodes import barcode_owner
+
+        owner = barcode_owner(self.barcode, self)
+        if owner is not None:
+            raise ValidationError({'barcode': f'این بارکد متعلق به محصول {owner} است.'})
+
     @property
     def low_stock(self):
         return self.quantity <= self.reorder_level
@@ -98,6 +189,34 @@ class Product(models.Model):
             return {'status': 'in_stock', 'message': 'موجود'}
 
 
+class ProductSearchToken(models.Model):
+    """Inverted index entry: one normalized token of a product with its weight"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'product', 'weight'], name='search_token_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.token} → {self.product_id}'
+
+
+class ProductBarcode(models.Model):
+    """
+    Barcode -> product mapping used by scanner lookups. The primary row
+    mirrors ``Product.barcode``; extra rows cover alternate packagings.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='barcodes')
+    code = models.CharField(max_length=50, unique=True)
+    is_primary = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f'{self.code} → {self.product_id}'
+
+
 class StockMovement(models.Model):
     MOVEMENT_TYPES = [
         ('purchase', 'Purchase'),
@@ -115,10 +234,17 @@ class StockMovement(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='stock_movement_product_idx'),
+        ]
+
     def save(self, *args, **kwargs):
-        self.before_quantity = self.product.quantity
-        self.after_quantity = self.before_quantity + self.quantity
-        super().save(*args, **kwargs)
-        # update product quantity
-        self.product.quantity = self.after_quantity
-        self.product.save()
+        """Movements are append-only; a new one is applied through the ledger"""
+        if not self._state.adding:
+            raise ValueError('Stock movements cannot be changed once recorded.')
+        from .stock import StockLedger
+        StockLedger.apply([self])
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Stock movements cannot be deleted; record a correcting movement instead.')
@@ -0,0 +1,196 @@
+# products/search.py
+import re
+
+from django.conf import settings
+from django.db import models, transaction
+
+
+# Persian/Arabic variants folded to a single form
+CHARACTER_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+    # Persian and Arabic-Indic digits
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    # Zero-width non-joiner / joiner and tatweel join the word parts
+    '\u200c': None, '\u200d': None, '\u0640': None,
+})
+DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+TOKEN_PATTERN = re.compile(r'\w+')
+
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+# Weight of a token per field it appears in
+FIELD_WEIGHTS = {
+    'name': 10,
+    'sku': 8,
+    'barcode': 8,
+    'description': 1,
+}
+INDEXED_FIELDS = frozenset(FIELD_WEIGHTS)
+
+
+def normalize(text):
+    """Fold Persian/Arabic character variants, digits and case"""
+    text = DIACRITICS.sub('', str(text or ''))
+    return text.translate(CHARACTER_MAP).lower()
+
+
+def tokenize(text):
+    """Split text into normalized tokens, keeping their order"""
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_PATTERN.findall(normalize(text))]
+
+
+def build_tokens(product):
+    """Return ``{token: weight}`` for a product's indexed fields"""
+    weights = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in set(tokenize(getattr(product, field))):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def index_product(product):
+    """Replace the index entries of one product"""
+    from .models import ProductSearchToken
+
+    with transaction.atomic():
+        ProductSearchToken.objects.filter(product=product).delete()
+        ProductSearchToken.objects.bulk_create([
+            ProductSearchToken(product=product, token=token, weight=weight)
+            for token, weight in build_tokens(product).items()
+        ])
+
+
+def rebuild_index(products=None, batch_size=2000, progress=None):
+    """
+    Rebuild index entries for ``products`` (all products by default) in
+    batches. Returns the number of products indexed.
+    """
+    from .models import Product, ProductSearchToken
+
+    if products is None:
+        products = Product.objects.all()
+    products = products.only('id', *INDEXED_FIELDS).order_by('id')
+
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = list(products.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return indexed
+        with transaction.atomic():
+            ProductSearchToken.objects.filter(product__in=[product.id for product in batch]).delete()
+            ProductSearchToken.objects.bulk_create([
+                ProductSearchToken(product_id=product.id, token=token, weight=weight)
+                for product in batch
+                for token, weight in build_tokens(product).items()
+            ], batch_size=5000)
+        indexed += len(batch)
+        last_id = batch[-1].id
+        if progress:
+            progress(indexed)
+
+
+class ProductSearch:
+    """
+    Ranked search results for a query.
+
+    Postings of the query terms are grouped per product on the
+    ``(token, product, weight)`` index alone; a product must match every
+    term. Only the last term also matches as a prefix, so results appear
+    while the user is typing, ranked below exact matches. The best
+    ``SEARCH_MAX_RESULTS`` ids are fetched once and products are loaded per
+    page, so the object can be handed to ``Paginator`` / ``ListView`` like a
+    queryset. ``count()`` stops at that cap; ``truncated`` tells the pages
+    that more products matched.
+    """
+
+    def __init__(self, query, category=None, available_only=False, active_only=True):
+        from .models import Product
+
+        self.model = Product
+        self.query = query
+        self.terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        self.filters = models.Q()
+        if category is not None:
+            self.filters &= category.subtree_q(category.path, prefix='product__category__')
+        if available_only:
+            self.filters &= models.Q(product__is_active=True, product__quantity__gt=0)
+        elif active_only:
+            self.filters &= models.Q(product__is_active=True)
+        self._ranked = None
+        self._truncated = False
+
+    @property
+    def max_results(self):
+        return getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+
+    @property
+    def truncated(self):
+        """Whether more than ``max_results`` products matched"""
+        self.ranked_ids()
+        return self._truncated
+
+    def ranked_ids(self):
+        """List of ``(product_id, rank)``, best first"""
+        if self._ranked is None:
+            # One extra row tells whether the cap cut the results off
+            ranked = list(self._postings()[:self.max_results + 1]) if self.terms else []
+            self._truncated = len(ranked) > self.max_results
+            self._ranked = ranked[:self.max_results]
+        return self._ranked
+
+    def _postings(self):
+        from .models import ProductSearchToken
+
+        last_term = self.terms[-1]
+        exact = models.Q(token__in=self.terms)
+        prefix = models.Q(token__gt=last_term, token__lt=last_term + '\uffff')
+
+        # Label every matched token with the query term it satisfies
+        matched_term = models.Case(
+            *(models.When(token=term, then=models.Value(index))
+              for index, term in enumerate(self.terms)),
+            default=models.Value(len(self.terms) - 1),
+        )
+        rank = models.Case(
+            models.When(exact, then=models.F('weight') * 2),
+            default=models.F('weight'),
+            output_field=models.IntegerField(),
+        )
+        return (
+            ProductSearchToken.objects.filter(exact | prefix)
+            .filter(self.filters)
+            .values('product_id')
+            .annotate(matched_terms=models.Count(matched_term, distinct=True), rank=models.Sum(rank))
+            .filter(matched_terms=len(self.terms))
+            .order_by('-rank', 'product_id')
+            .values_list('product_id', 'rank')
+        )
+
+    def count(self):
+        return len(self.ranked_ids())
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        page = self.ranked_ids()[index]
+        products = self.model.objects.select_related('category').in_bulk([pk for pk, _ in page])
+        results = []
+        for pk, rank in page:
+            if pk in products:
+                products[pk].search_rank = rank
+                results.append(products[pk])
+        return results
@@ -0,0 +1,106 @@
+# products/signals.py
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import SUGGESTION_FIELDS, autocomplete_index
+from .barcodes import barcode_lookup, sync_primary_barcode
+from .cache import catalog_cache
+from .search import INDEXED_FIELDS, index_product
+from .stock import StockLedger
+from .thumbnails import has_derivatives, thumbnail_worker
+from .models import Category, Product, ProductBarcode
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    """
+    Any catalog change makes every cached listing stale, once committed:
+    a listing rebuilt before then would cache the old rows under the new version
+    """
+    transaction.on_commit(catalog_cache.bump_version)
+
+
+@receiver(post_delete, sender=Category)
+def detach_category_subtree(sender, instance, **kwargs):
+    """
+    Children of a deleted category become roots (``parent`` is SET_NULL),
+    so strip the deleted prefix from every descendant path.
+    """
+    if not instance.path:
+        return
+    Category.objects.filter(Category.subtree_q(instance.path)).update(
+        path=Substr('path', len(instance.path) + 1),
+        depth=F('depth') - (instance.depth + 1),
+    )
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Refresh search tokens unless the save only touched unindexed fields"""
+    if raw or (update_fields is not None and not INDEXED_FIELDS & set(update_fields)):
+        return
+    index_product(instance)
+
+
+@receiver(post_save, sender=Product)
+def update_autocomplete_index(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Refresh typeahead entries once the save is committed"""
+    if raw or (update_fields is not None and not SUGGESTION_FIELDS & set(update_fields)):
+        return
+    transaction.on_commit(lambda: autocomplete_index.update(instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: autocomplete_index.remove(product_id))
+
+
+@receiver(post_save, sender=Product)
+def sync_product_barcode(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and 'barcode' not in update_fields):
+        return
+    sync_primary_barcode(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def evict_scanned_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    product_id = instance.pk
+    transaction.on_commit(lambda: barcode_lookup.evict_product(product_id))
+
+
+@receiver(post_save, sender=ProductBarcode)
+@receiver(post_delete, sender=ProductBarcode)
+def evict_scanned_barcode(sender, instance, **kwargs):
+    """Forget the cached product of a remapped code once committed"""
+    code = instance.code
+    transaction.on_commit(lambda: barcode_lookup.evict(code))
+
+
+@receiver(post_save, sender=Product)
+def open_stock_ledger(sender, instance, created=False, raw=False, **kwargs):
+    """A new product's starting quantity is the first ledger entry"""
+    if created and not raw:
+        StockLedger.open_balance(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+def queue_thumbnails(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Make the image derivatives in the background once a new upload is committed"""
+    if raw or not instance.image or (update_fields is not None and 'image' not in update_fields):
+        return
+    name = instance.image.name
+    if name == instance._meta.get_field('image').default:
+        return
+    if not has_derivatives(name):
+        transaction.on_commit(lambda: thumbnail_worker.submit(name))
@@ -0,0 +1,46 @@
+# products/statistics.py
+from django.db import models
+
+from .cache import catalog_cache
+
+
+class CatalogStatistics:
+    """
+    Counters for the admin product and category lists.
+
+    Each model's counters are one conditional-aggregate query, cached
+    through ``catalog_cache``: the Product and Category signals (and bulk
+    stock movements and imports) bump its version, so any catalog change
+    invalidates them.
+    """
+
+    @classmethod
+    def products(cls):
+        return catalog_cache.get_or_set('stats:products', cls.compute_products)
+
+    @classmethod
+    def categories(cls):
+        return catalog_cache.get_or_set('stats:categories', cls.compute_categories)
+
+    @staticmethod
+    def compute_products():
+        from .models import Product
+
+        return Product.objects.aggregate(
+            total_products=models.Count('id'),
+            active_products=models.Count('id', filter=models.Q(is_active=True)),
+            inactive_products=models.Count('id', filter=models.Q(is_active=False)),
+            recommended_products_count=models.Count('id', filter=models.Q(recommended=True)),
+            low_stock_products=models.Count('id', filter=models.Q(quantity__lte=models.F('reorder_level'))),
+        )
+
+    @staticmethod
+    def compute_categories():
+        from .models import Category, Product
+
+        has_products = models.Exists(Product.objects.filter(category=models.OuterRef('pk')))
+        return Category.objects.aggregate(
+            total_categories=models.Count('id'),
+            active_categories=models.Count('id', filter=models.Q(is_active=True)),
+            empty_categories=models.Count('id', filter=~models.Q(has_products)),
+        )
@@ -0,0 +1,184 @@
+# products/stock.py
+from collections import defaultdict
+
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce
+
+from .cache import catalog_cache
+
+# Products per UPDATE; keeps statements under SQLite's variable limit
+CHUNK_SIZE = 400
+
+
+class InsufficientStockError(ValueError):
+    """Raised when a movement would take product stock below zero"""
+
+
+class StockLedger:
+    """
+    Append-only stock ledger.
+
+    Quantities only change through ``quantity = quantity + delta`` updates,
+    never by saving the product, so concurrent movements cannot overwrite
+    each other. Product rows are locked in id order (the UPDATE itself takes
+    the lock on SQLite), and the quantities read back inside the same
+    transaction give each movement its exact ``before``/``after`` snapshot.
+    Decreases are conditional, and if any product would go negative the
+    whole batch is rolled back. The catalog cache is only invalidated when
+    a product runs out, comes back in stock or crosses its reorder level,
+    so ordinary sales keep the cached listings.
+    """
+
+    @classmethod
+    def record(cls, product, quantity, movement_type, note='', created_by=None):
+        """Apply a single movement and return it"""
+        from .models import StockMovement
+
+        movement = StockMovement(
+            product=product,
+            movement_type=movement_type,
+            quantity=quantity,
+            note=note,
+            created_by=created_by,
+        )
+        cls.apply([movement])
+        return movement
+
+    @classmethod
+    def apply(cls, movements):
+        """
+        Apply unsaved movements with one UPDATE and one SELECT per chunk of
+        products plus a bulk insert, and return them saved. Several
+        movements of one product are chained in the given order.
+        """
+        from .models import Product, StockMovement
+
+        movements = list(movements)
+        deltas = defaultdict(int)
+        for movement in movements:
+            deltas[movement.product_id] += movement.quantity
+        product_ids = sorted(deltas)
+        if not product_ids:
+            return movements
+
+        with transaction.atomic():
+            if connection.features.has_select_for_update:
+                list(
+                    Product.objects.select_for_update()
+                    .filter(id__in=product_ids)
+                    .order_by('id')
+                    .values_list('id', flat=True)
+                )
+
+            quantities, reorder_levels = {}, {}
+            for start in range(0, len(product_ids), CHUNK_SIZE):
+                chunk = product_ids[start:start + CHUNK_SIZE]
+                cls._update_chunk(chunk, deltas)
+                for product_id, quantity, reorder_level in (
+                    Product.objects.filter(id__in=chunk).values_list('id', 'quantity', 'reorder_level')
+                ):
+                    quantities[product_id], reorder_levels[product_id] = quantity, reorder_level
+
+            # Walk forward from the quantity each product had before the batch
+            running = {product_id: quantities[product_id] - deltas[product_id] for product_id in product_ids}
+            for movement in movements:
+                movement.before_quantity = running[movement.product_id]
+                movement.after_quantity = movement.before_quantity + movement.quantity
+                running[movement.product_id] = movement.after_quantity
+
+            StockMovement.objects.bulk_create(movements, batch_size=1000)
+            if any(
+                cls._changes_listings(
+                    quantities[product_id] - deltas[product_id], quantities[product_id], reorder_levels[product_id],
+                )
+                for product_id in product_ids
+            ):
+                transaction.on_commit(catalog_cache.bump_version)
+
+        return movements
+
+    @staticmethod
+    def _changes_listings(before, after, reorder_level):
+        """Whether a quantity change moves the product in or out of stock or low stock"""
+        return (before > 0) != (after > 0) or (before <= reorder_level) != (after <= reorder_level)
+
+    @classmethod
+    def open_balance(cls, product, note='موجودی اولیه'):
+        """Record the starting quantity of a new product without touching it"""
+        from .models import StockMovement
+
+        if not product.quantity:
+            return None
+        return StockMovement.objects.bulk_create([StockMovement(
+            product=product,
+            movement_type='adjustment',
+            quantity=product.quantity,
+            before_quantity=0,
+            after_quantity=product.quantity,
+            note=note,
+        )])[0]
+
+    @staticmethod
+    def discrepancies():
+        """Products whose quantity differs from the sum of their movements, with ``ledger_quantity``"""
+        from .models import Product, StockMovement
+
+        ledger_quantity = (
+            StockMovement.objects.filter(product=models.OuterRef('pk'))
+            .order_by()
+            .values('product')
+            .annotate(total=models.Sum('quantity'))
+            .values('total')
+        )
+        return (
+            Product.objects.annotate(
+                ledger_quantity=Coalesce(models.Subquery(ledger_quantity), 0, output_field=models.IntegerField())
+            )
+            .exclude(quantity=models.F('ledger_quantity'))
+            .order_by('id')
+        )
+
+    @classmethod
+    def reconcile(cls, created_by=None):
+        """
+        Record an adjustment for every product whose ledger drifted, so the
+        ledger matches the stored quantities again. Returns the movements.
+        """
+        from .models import StockMovement
+
+        with transaction.atomic():
+            movements = [
+                StockMovement(
+                    product_id=product.id,
+                    movement_type='adjustment',
+                    quantity=product.quantity - product.ledger_quantity,
+                    before_quantity=product.ledger_quantity,
+                    after_quantity=product.quantity,
+                    note='تطبیق موجودی',
+                    created_by=created_by,
+                )
+                for product in cls.discrepancies().only('id', 'quantity').select_for_update()
+            ]
+            return StockMovement.objects.bulk_create(movements, batch_size=1000)
+
+    @staticmethod
+    def _update_chunk(product_ids, deltas):
+        from .models import Product
+
+        # One WHEN per distinct delta: a delivery of thousands of products
+        # usually has only a few dozen different quantities
+        by_delta = defaultdict(list)
+        for product_id in product_ids:
+            by_delta[deltas[product_id]].append(product_id)
+
+        has_stock = models.Q()
+        new_quantity = []
+        for delta, ids in by_delta.items():
+            has_stock |= models.Q(id__in=ids, quantity__gte=-delta) if delta < 0 else models.Q(id__in=ids)
+            new_quantity.append(models.When(id__in=ids, then=models.F('quantity') + delta))
+
+        updated = Product.objects.filter(has_stock).update(
+            quantity=models.Case(*new_quantity, output_field=models.PositiveIntegerField())
+        )
+        if updated != len(product_ids):
+            raise InsufficientStockError('موجودی برخی از محصولات کافی نیست.')
@@ -0,0 +1,28 @@
+from django import template
+
+from products.thumbnails import derivative_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail(image, size, fmt='jpg'):
+    """
+    URL of a pre-generated derivative, e.g. ``{% thumbnail product.image 'card' %}``.
+    Falls back to the original until the worker has made it.
+    """
+    if not image:
+        return ''
+    return derivative_url(image.name, size, fmt) or image.url
+
+
+@register.inclusion_tag('includes/Picture.html')
+def picture(image, size, alt='', css_class='', style=''):
+    """``<picture>`` with a WebP source and a JPEG fallback of one derivative"""
+    return {
+        'webp': derivative_url(image.name, size, 'webp') if image else None,
+        'src': thumbnail(image, size),
+        'alt': alt,
+        'css_class': css_class,
+        'style': style,
+    }
@@ -1,3 +1,898 @@
-from django.test import TestCase
+import datetime
+import io
+import posixpath
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core.pagination import InvalidCursor, KeysetPaginator
+from core.testing import use_async_views
+from orders.models import DailyProductSales
+from users.models import User
+from .autocomplete import PrefixIndex, autocomplete_index
+from .cache import CatalogCache, catalog_cache
+from .exports import InventoryValuationExport
+from .forms import ProductForm
+from .barcodes import BarcodeConflictError, barcode_lookup
+from .importer import ProductImportError, ProductImporter, open_rows
+from .models import Category, Product, ProductBarcode, StockMovement
+from .reorder import ReorderPlanner
+from .statistics import CatalogStatistics
+from .stock import InsufficientStockError, StockLedger
+from .thumbnails import (
+    ThumbnailWorker, derivative_index, derivative_name, generate, has_derivatives, thumbnail_url,
+)
+
+
+def create_category(name, parent=None):
+    return Category.objects.create(name=name, slug=name, parent=parent)
+
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        self.root = create_category('root')
+        self.child = create_category('child', parent=self.root)
+        self.leaf = create_category('leaf', parent=self.child)
+
+    def test_moving_a_category_moves_its_subtree(self):
+        other = create_category('other')
+
+        self.child.parent = other
+        self.child.save()
+
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.ancestor_ids, [other.pk, self.child.pk, self.leaf.pk])
+        self.assertEqual(self.leaf.depth, 2)
+        self.assertEqual(list(self.root.get_descendants(include_self=False)), [])
+
+    def test_category_cannot_move_under_its_descendant(self):
+        self.root.parent = self.leaf
+
+        with self.assertRaises(ValueError):
+            self.root.save()
+
+    def test_deleting_a_category_promotes_its_children(self):
+        self.root.delete()
+
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.ancestor_ids, [self.child.pk, self.leaf.pk])
+        self.assertEqual(self.leaf.depth, 1)
+
+    def test_breadcrumbs_and_subtree_products(self):
+        product = Product.objects.create(
+            name='leaf product', slug='leaf-product', sku='LEAF-1', category=self.leaf,
+            unit_price=Decimal('1000'), cost_price=Decimal('500'),
+        )
+        Product.objects.create(
+            name='outside', slug='outside', sku='OUT-1', category=create_category('other'),
+            unit_price=Decimal('1000'), cost_price=Decimal('500'),
+        )
+
+        with self.assertNumQueries(1):
+            breadcrumbs = Product.objects.get_category_breadcrumbs(self.leaf)
+        with self.assertNumQueries(0):
+            Product.objects.get_category_breadcrumbs(self.leaf)
+
+        self.assertEqual(breadcrumbs, [self.root, self.child, self.leaf])
+        self.assertEqual(list(Product.objects.in_category(self.root)), [product])
+
+
+class ProductSearchTests(TestCase):
+    def create_product(self, slug, name, **kwargs):
+        return Product.objects.create(
+            name=name, slug=slug, sku=slug.upper(), quantity=kwargs.pop('quantity', 5),
+            unit_price=Decimal('1000'), cost_price=Decimal('500'), **kwargs,
+        )
+
+    def search(self, query, **filters):
+        return [product.slug for product in Product.objects.search(query, **filters)]
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_capped_results_are_flagged(self):
+        for index in range(3):
+            self.create_product(f'drop-{index}', name=f'قطره {index}')
+
+        results = Product.objects.search('قطره')
+        self.assertEqual((results.count(), results.truncated), (2, True))
+        self.assertFalse(Product.objects.search('قطره 1').truncated)
+        response = self.client.get(reverse('products:product_list'), {'search': 'قطره'})
+        self.assertTrue(response.context['search_truncated'])
+        self.assertContains(response, 'تنها 2 نتیجه برتر')
+
+    def test_persian_and_arabic_spellings_match(self):
+        self.create_product('syrup', name='شربت سرماخوردگی کودکان ۱۰۰')
+
+        self.assertEqual(self.search('شربت سرماخوردگي'), ['syrup'])
+        self.assertEqual(self.search('كودكان 100'), ['syrup'])
+
+    def test_zero_width_non_joiner_is_ignored(self):
+        self.create_product('cream', name='کرم مرطوب‌کننده')
+
+        self.assertEqual(self.search('مرطوبکننده'), ['cream'])
+
+    def test_all_terms_must_match_and_last_term_is_a_prefix(self):
+        self.create_product('tablet', name='قرص استامینوفن')
+        self.create_product('syrup', name='شربت استامینوفن')
+
+        self.assertEqual(self.search('قرص استامی'), ['tablet'])
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.create_product('described', name='مکمل', description='ویتامین')
+        self.create_product('named', name='ویتامین')
+
+        self.assertEqual(self.search('ویتامین'), ['named', 'described'])
+
+    def test_index_follows_product_changes(self):
+        product = self.create_product('gel', name='ژل')
+
+        product.name = 'پماد'
+        product.save()
+
+        self.assertEqual(self.search('ژل'), [])
+        self.assertEqual(self.search('پماد'), ['gel'])
+
+    def test_filters_by_category_subtree_and_availability(self):
+        parent = create_category('parent')
+        self.create_product('inside', name='قطره', category=create_category('child', parent=parent))
+        self.create_product('empty', name='قطره', category=parent, quantity=0)
+        self.create_product('outside', name='قطره')
+
+        self.assertCountEqual(self.search('قطره', category=parent), ['inside', 'empty'])
+        self.assertEqual(self.search('قطره', category=parent, available_only=True), ['inside'])
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.tablet = self.create_product('tablet', 'قرص استامینوفن', sku='AC-500', barcode='6260001')
+        self.syrup = self.create_product('syrup', 'شربت استامینوفن کودکان', sku='AC-120', barcode='6260002')
+        self.old = self.create_product('old', 'قرص آسپرین', sku='ASP-100', is_active=False)
+        self.index.load()
+
+    def create_product(self, slug, name, sku, barcode='', **kwargs):
+        return Product.objects.create(
+            name=name, slug=slug, sku=sku, barcode=barcode,
+            unit_price=Decimal('1000'), cost_price=Decimal('500'), **kwargs,
+        )
+
+    def lookup(self, query, **kwargs):
+        return [suggestion.id for suggestion in self.index.lookup(query, **kwargs)]
+
+    def test_prefixes_of_name_sku_and_barcode(self):
+        self.assertCountEqual(self.lookup('استام'), [self.tablet.id, self.syrup.id])
+        self.assertEqual(self.lookup('ac-5'), [self.tablet.id])
+        self.assertEqual(self.lookup('۶۲۶۰۰۰۲'), [self.syrup.id])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.lookup('شر استا'), [self.syrup.id])
+
+    def test_inactive_products_only_on_request(self):
+        self.assertEqual(self.lookup('قرص'), [self.tablet.id])
+        self.assertCountEqual(self.lookup('قرص', active_only=False), [self.tablet.id, self.old.id])
+
+    def test_exact_tokens_rank_before_longer_ones(self):
+        longer = self.create_product('longer', 'قرصک', sku='QK-1')
+        self.index.update(longer)
+
+        self.assertEqual(self.lookup('قرص'), [self.tablet.id, longer.id])
+
+    def test_index_follows_saves_and_deletes(self):
+        autocomplete_index.load()
+        self.addCleanup(autocomplete_index.clear)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tablet.name = 'قرص ایبوپروفن'
+            self.tablet.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.syrup.delete()
+
+        self.assertEqual(autocomplete_index.lookup('استامینوفن'), [])
+        self.assertEqual([s.id for s in autocomplete_index.lookup('ایبو')], [self.tablet.id])
+
+    def test_stale_index_answers_while_one_thread_reloads(self):
+        self.index._loaded_at -= self.index.refresh_seconds + 1
+        started, release = threading.Event(), threading.Event()
+
+        def slow_load():
+            started.set()
+            release.wait(5)
+
+        with mock.patch.object(self.index, 'load', side_effect=slow_load) as load:
+            for _ in range(3):
+                self.assertCountEqual(self.lookup('استام'), [self.tablet.id, self.syrup.id])
+            self.assertTrue(started.wait(5))
+            release.set()
+            self.assertTrue(self.index._loading.acquire(timeout=5))
+            self.index._loading.release()
+
+        load.assert_called_once()
+
+    def test_endpoint_returns_suggestions(self):
+        self.addCleanup(autocomplete_index.clear)
+
+        response = self.client.get(reverse('products:product_autocomplete'), {'q': 'قرص', 'inactive': '1'})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['id'] for result in results], [self.tablet.id])
+        self.assertEqual(results[0]['url'], reverse('products:product_detail', args=['tablet']))
+
+
+class BarcodeLookupTests(TestCase):
+    def setUp(self):
+        barcode_lookup.clear()
+        self.addCleanup(barcode_lookup.clear)
+        self.product = Product.objects.create(
+            name='قرص', slug='tablet', sku='TB-1', barcode='6260001',
+            unit_price=Decimal('1000'), cost_price=Decimal('500'), quantity=7, discount_percent=10,
+        )
+
+    def test_primary_barcode_follows_product(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.barcode = '6260009'
+            self.product.save()
+
+        self.assertEqual(list(self.product.barcodes.values_list('code', flat=True)), ['6260009'])
+        self.assertIsNone(barcode_lookup.lookup('6260001'))
+        self.assertEqual(barcode_lookup.lookup('6260009'), self.product)
+
+    def test_alternate_barcodes_and_persian_digits(self):
+        ProductBarcode.objects.create(product=self.product, code='6260777')
+
+        self.assertEqual(barcode_lookup.lookup('۶۲۶۰۷۷۷'), self.product)
+        self.assertIsNone(barcode_lookup.lookup('0000000'))
+
+    def test_barcodes_of_other_products_are_rejected(self):
+        other = create_stocked_product(1)
+        other.barcode = '۶۲۶۰۰۰۱'
+
+        with self.assertRaises(ValidationError) as raised:
+            other.full_clean()
+        self.assertIn('barcode', raised.exception.message_dict)
+        self.product.clean()
+        with self.assertRaises(BarcodeConflictError):
+            other.save()
+        self.assertEqual(ProductBarcode.objects.get(code='6260001').product, self.product)
+
+    def test_a_conflicting_new_product_is_not_saved(self):
+        duplicate = Product(
+            name='کپی', slug='copy', sku='CP-1', barcode='6260001', quantity=7,
+            unit_price=Decimal('1000'), cost_price=Decimal('500'),
+        )
+
+        with self.assertRaises(BarcodeConflictError):
+            duplicate.save()
+
+        self.assertFalse(Product.objects.filter(sku='CP-1').exists())
+        self.assertFalse(StockLedger.discrepancies().exists())
+
+    def test_form_rejects_a_duplicate_barcode(self):
+        other = create_stocked_product(1)
+        data = {
+            'name': other.name, 'slug': other.slug, 'sku': other.sku, 'barcode': '6260001',
+            'unit_price': 1000, 'cost_price': 500, 'quantity': 10, 'reorder_level': 5,
+            'discount_percent': 0, 'discount_per_unit': 0, 'is_active': True,
+            'category': create_category('tablets').pk,
+        }
+
+        form = ProductForm(data, instance=other)
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('barcode', form.errors)
+        self.assertTrue(ProductForm({**data, 'barcode': '6260002'}, instance=other).is_valid())
+
+    def test_repeated_scans_are_served_from_the_cache(self):
+        barcode_lookup.lookup('6260001')
+
+        with self.assertNumQueries(0):
+            barcode_lookup.lookup('6260001')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.quantity = 3
+            self.product.save()
+
+        self.assertEqual(barcode_lookup.lookup('6260001').quantity, 3)
+        self.assertEqual(barcode_lookup.stats()['hits'], 1)
+
+    def test_endpoint_is_staff_only(self):
+        url = reverse('products:admin_product_barcode', args=['6260001'])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(User.objects.create(phone_number='09120000000', is_staff=True))
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['product']['effective_unit_price'], 900)
+        self.assertEqual(response.json()['product']['quantity'], 7)
+
+
+def create_stocked_product(index, quantity=10):
+    return Product.objects.create(
+        name=f'کالا {index}', slug=f'stock-{index}', sku=f'ST-{index}', quantity=quantity,
+        unit_price=Decimal('1000'), cost_price=Decimal('500'),
+    )
+
+
+class StockLedgerTests(TestCase):
+    def test_new_products_open_the_ledger(self):
+        product = create_stocked_product(1, quantity=7)
+
+        movement = product.movements.get()
+        self.assertEqual((movement.before_quantity, movement.after_quantity), (0, 7))
+        self.assertFalse(StockLedger.discrepancies().exists())
+
+    def test_product_form_edits_quantity_through_the_ledger(self):
+        product = create_stocked_product(1)
+        data = {
+            'name': 'نام تازه', 'slug': product.slug, 'sku': product.sku, 'barcode': '',
+            'unit_price': 1000, 'cost_price': 500, 'quantity': 15, 'reorder_level': 5,
+            'discount_percent': 0, 'discount_per_unit': 0, 'is_active': True,
+            'category': create_category('tablets').pk,
+        }
+        form = ProductForm(data, instance=Product.objects.get(pk=product.pk))
+        self.assertTrue(form.is_valid(), form.errors)
+        # Checkout sells two while the edit is being saved
+        StockLedger.record(product, -2, 'sale')
+
+        saved = form.save()
+
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.quantity, saved.quantity), ('نام تازه', 13, 13))
+        adjustment = product.movements.latest('id')
+        self.assertEqual((adjustment.movement_type, adjustment.quantity), ('adjustment', 5))
+        self.assertFalse(StockLedger.discrepancies().exists())
+
+    def test_movement_snapshots_are_chained(self):
+        product = create_stocked_product(1)
+
+        StockMovement(product=product, movement_type='purchase', quantity=5).save()
+        StockLedger.record(product, -3, 'sale')
+
+        movements = list(product.movements.order_by('id').values_list('before_quantity', 'after_quantity'))
+        self.assertEqual(movements, [(0, 10), (10, 15), (15, 12)])
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 12)
+
+    def test_bulk_delivery_uses_a_constant_number_of_queries(self):
+        products = [create_stocked_product(index) for index in range(50)]
+        delivery = [
+            StockMovement(product=product, movement_type='purchase', quantity=index + 1)
+            for index, product in enumerate(products)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            StockLedger.apply(delivery)
+
+        self.assertLessEqual(len(queries), 5)
+        self.assertEqual(Product.objects.get(pk=products[-1].pk).quantity, 60)
+        self.assertFalse(StockLedger.discrepancies().exists())
+
+    def test_overdrawn_batch_is_rolled_back(self):
+        plenty, scarce = create_stocked_product(1), create_stocked_product(2, quantity=1)
+
+        with self.assertRaises(InsufficientStockError):
+            StockLedger.apply([
+                StockMovement(product=plenty, movement_type='sale', quantity=-1),
+                StockMovement(product=scarce, movement_type='sale', quantity=-2),
+            ])
+
+        self.assertEqual(Product.objects.get(pk=plenty.pk).quantity, 10)
+        self.assertEqual(plenty.movements.count(), 1)
+
+    def test_only_availability_changes_invalidate_the_catalog(self):
+        product = create_stocked_product(1)
+        version = catalog_cache.get_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StockLedger.record(product, -2, 'sale')
+        self.assertEqual(catalog_cache.get_version(), version, 'still above the reorder level')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StockLedger.record(product, -3, 'sale')
+        self.assertNotEqual(catalog_cache.get_version(), version, 'down to the reorder level')
+
+        version = catalog_cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            StockLedger.record(product, -5, 'sale')
+        self.assertNotEqual(catalog_cache.get_version(), version, 'sold out')
+
+    def test_movements_are_append_only(self):
+        movement = StockLedger.record(create_stocked_product(1), 1, 'return')
+
+        with self.assertRaises(ValueError):
+            movement.save()
+        with self.assertRaises(ValueError):
+            movement.delete()
+
+    def test_reconcile_records_drift(self):
+        product = create_stocked_product(1)
+        Product.objects.filter(pk=product.pk).update(quantity=4)
+
+        self.assertEqual([p.ledger_quantity for p in StockLedger.discrepancies()], [10])
+        StockLedger.reconcile()
+
+        self.assertFalse(StockLedger.discrepancies().exists())
+        self.assertEqual(product.movements.latest('id').quantity, -6)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        self.catalog = CatalogCache()
+        self.catalog.cache.clear()
+
+    def test_bumping_the_version_hides_old_entries(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return len(builds)
+
+        self.assertEqual(self.catalog.get_or_set('listing', build), 1)
+        self.assertEqual(self.catalog.get_or_set('listing', build), 1)
+        self.catalog.bump_version()
+        self.assertEqual(self.catalog.get_or_set('listing', build), 2)
+
+    def test_counts_hits_and_misses(self):
+        for _ in range(3):
+            self.catalog.get_or_set('listing', lambda: 'value')
+
+        self.assertEqual(self.catalog.stats(), {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
+        self.catalog.reset_stats()
+        self.assertEqual(self.catalog.stats()['hits'], 0)
+
+    def test_evicted_version_starts_newer(self):
+        version = self.catalog.get_version()
+        self.catalog.cache.delete(self.catalog.version_key)
+
+        self.catalog.bump_version()
+
+        self.assertGreater(self.catalog.get_version(), version)
+
+    @override_settings(CATALOG_CACHE_ENABLED=False)
+    def test_disabled_cache_always_builds(self):
+        values = iter(range(2))
+
+        self.assertEqual(self.catalog.get_or_set('listing', lambda: next(values)), 0)
+        self.assertEqual(self.catalog.get_or_set('listing', lambda: next(values)), 1)
+
+
+class ConcurrentStockMovementTests(TransactionTestCase):
+    def test_parallel_movements_never_lose_updates(self):
+        product = create_stocked_product(1, quantity=100)
+        deltas = [5, -3] * 20
+        barrier = threading.Barrier(len(deltas))
+
+        def move(delta):
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        return StockLedger.record(product, delta, 'adjustment')
+                    except OperationalError:
+                        # SQLite reports lock contention instead of blocking
+                        time.sleep(random.uniform(0, 0.02))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(deltas)) as pool:
+            list(pool.map(move, deltas))
+
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 100 + sum(deltas))
+        # Movements are inserted under the row lock, so ids follow the order applied
+        snapshots = list(product.movements.order_by('id').values_list('before_quantity', 'after_quantity'))
+        for previous, current in zip(snapshots, snapshots[1:]):
+            self.assertEqual(previous[1], current[0])
+        self.assertFalse(StockLedger.discrepancies().exists())
+
+
+class ProductImportTests(TestCase):
+    def run_import(self, text, **kwargs):
+        columns, rows = open_rows(io.BytesIO(text.encode()), 'prices.csv')
+        return ProductImporter(**kwargs).run(columns, rows, source='prices.csv')
+
+    def test_creates_and_updates_products_with_ledger_entries(self):
+        create_category('drops')
+        existing = create_stocked_product(1, quantity=4)
+
+        report = self.run_import(
+            'sku,name,unit_price,cost_price,quantity,barcode,category\n'
+            'ST-1,کالا یک,"12,000",9000,6,6260100,drops\n'
+            'NEW-2,قطره,۵۰۰۰,4000,3,,\n'
+        )
+
+        self.assertEqual((report.created, report.updated, report.skipped), (1, 1, 0))
+        existing.refresh_from_db()
+        self.assertEqual((existing.name, existing.unit_price, existing.quantity), ('کالا یک', 12000, 10))
+        self.assertEqual(existing.category.slug, 'drops')
+        self.assertEqual(barcode_lookup.lookup('6260100'), existing)
+        new = Product.objects.get(sku='NEW-2')
+        self.assertEqual((new.slug, new.unit_price, new.quantity), ('new-2', 5000, 3))
+        self.assertEqual(Product.objects.search('قطره')[0], new)
+        self.assertFalse(StockLedger.discrepancies().exists())
+
+    def test_invalid_rows_are_skipped_and_reported(self):
+        report = self.run_import(
+            'sku,name,unit_price,cost_price\n'
+            'A,الف,1000,2000\n'
+            'B,ب,قیمت,0\n'
+            'C,ج,1000,500\n'
+            'C,ج,1000,500\n'
+        )
+
+        self.assertEqual([line for line, _ in report.errors], [2, 3, 5])
+        self.assertEqual(list(Product.objects.values_list('sku', flat=True)), ['C'])
+
+    def test_validation_does_not_query_per_row(self):
+        text = 'sku,name,unit_price\n' + ''.join(f'S-{index},کالا,1000\n' for index in range(200))
+
+        with CaptureQueriesContext(connection) as queries:
+            report = self.run_import(text, dry_run=True)
+
+        self.assertEqual(report.created, 200)
+        self.assertLessEqual(len(queries), 4)
+        self.assertFalse(Product.objects.exists())
+
+    def test_wrong_encoding_fails_before_any_row_is_saved(self):
+        text = 'sku,name,unit_price\nA-1,قرص,1000\nA-2,شربت,2000\n'
+
+        with self.assertRaisesMessage(ProductImportError, 'خط 2'):
+            open_rows(io.BytesIO(text.encode('cp1256')), 'prices.csv')
+        self.assertFalse(Product.objects.exists())
+
+    def test_corrupt_xlsx_is_an_import_error(self):
+        with self.assertRaises(ProductImportError):
+            open_rows(io.BytesIO(b'not a zip file'), 'prices.xlsx')
+
+    def test_read_errors_report_the_rows_already_saved(self):
+        def rows():
+            yield 2, {'sku': 'A-1', 'name': 'قرص', 'unit_price': '1000'}
+            yield 3, {'sku': 'A-2', 'name': 'شربت', 'unit_price': '2000'}
+            raise ProductImportError('خطا در خواندن فایل پس از ردیف 3')
+
+        with self.assertRaisesMessage(ProductImportError, '2 ردیف پیش از این خطا ذخیره شده است'):
+            ProductImporter(batch_size=1).run(['sku', 'name', 'unit_price'], rows())
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_admin_upload(self):
+        self.client.force_login(User.objects.create(phone_number='09120000001', is_staff=True))
+        upload = SimpleUploadedFile('prices.csv', 'sku,name,unit_price\nU-1,کالا,1000\n'.encode())
+
+        response = self.client.post(reverse('products:admin_product_import'), {'file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report'].created, 1)
+        self.assertTrue(Product.objects.filter(sku='U-1').exists())
+
+
+class InventoryExportTests(TestCase):
+    def test_valuation_rows_and_total(self):
+        create_stocked_product(1, quantity=3)
+        hidden = create_stocked_product(2, quantity=2)
+        hidden.is_active = False
+        hidden.save()
+
+        lines = list(InventoryValuationExport(status='active').stream())
+
+        self.assertEqual(lines[1].rstrip().split(','), ['ST-1', 'کالا 1', '', '1', '3', '500', '1000', '1500'])
+        self.assertEqual(lines[-1].rstrip().split(',')[-1], '1500')
+        self.assertEqual(len(list(InventoryValuationExport(status='inactive').stream())), 3)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # Repeated names make the id tiebreaker matter
+        for index in range(25):
+            Product.objects.create(
+                name=f'کالا {index % 4}', slug=f'keyset-{index}', sku=f'KS-{index}',
+                unit_price=Decimal('1000'), cost_price=Decimal('500'),
+            )
+        self.queryset = Product.objects.all()
+        self.expected = list(self.queryset.order_by('name', 'id'))
+
+    def walk(self, paginator):
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_pages_forward_without_gaps_or_duplicates(self):
+        pages = self.walk(KeysetPaginator(self.queryset, 10, ordering=('name', 'id')))
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([row for page in pages for row in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+    def test_pages_back_to_the_same_rows(self):
+        paginator = KeysetPaginator(self.queryset, 10, ordering=('-id',))
+        pages = self.walk(paginator)
+
+        second = paginator.page(pages[-1].previous_cursor)
+        first = paginator.page(second.previous_cursor)
+
+        self.assertEqual(list(second), list(pages[1]))
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_rejects_tampered_cursor(self):
+        paginator = KeysetPaginator(self.queryset, 10, ordering=('name', 'id'))
+        cursor = paginator.page().next_cursor
+
+        with self.assertRaises(InvalidCursor):
+            paginator.page(cursor[:-2] + 'xx')
+        with self.assertRaises(InvalidCursor):
+            KeysetPaginator(self.queryset, 10, ordering=('-id',)).page(cursor)
+
+    def test_counts(self):
+        self.assertIsNone(KeysetPaginator(self.queryset, 10).page().count)
+        self.assertEqual(KeysetPaginator(self.queryset, 10, count='exact').page().count, 25)
+        self.assertEqual(KeysetPaginator(self.queryset, 10, count='approximate').page().count, 25)
+
+    def test_public_list_pages_by_cursor(self):
+        response = self.client.get(reverse('products:product_list'), {'paging': 'keyset'})
+        page = response.context['page_obj']
+
+        self.assertTrue(response.context['keyset_pagination'])
+        self.assertEqual(list(page), self.expected[:20])
+
+        response = self.client.get(reverse('products:product_list'), {'cursor': page.next_cursor})
+        self.assertEqual(list(response.context['page_obj']), self.expected[20:])
+        self.assertEqual(self.client.get(reverse('products:product_list'), {'cursor': 'bogus'}).status_code, 404)
+
+    def test_search_keeps_numbered_pages(self):
+        response = self.client.get(reverse('products:product_list'), {'paging': 'keyset', 'search': 'کالا'})
+
+        self.assertFalse(response.context['keyset_pagination'])
+
+    def test_admin_lists_page_by_cursor(self):
+        self.client.force_login(User.objects.create(phone_number='09120000002', is_staff=True))
+
+        for name in ('products:admin_product_list', 'products:admin_category_list'):
+            response = self.client.get(reverse(name), {'paging': 'keyset'})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context['keyset_pagination'])
+
+
+class CatalogStatisticsTests(TestCase):
+    def setUp(self):
+        self.category = create_category('stats')
+        create_category('empty')
+        self.product = create_stocked_product(1, quantity=2)
+        self.product.category = self.category
+        self.product.recommended = True
+        self.product.save()
+        create_stocked_product(2, quantity=50)
+
+    def test_product_counters_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = CatalogStatistics.compute_products()
+
+        self.assertEqual(stats, {
+            'total_products': 2, 'active_products': 2, 'inactive_products': 0,
+            'recommended_products_count': 1, 'low_stock_products': 1,
+        })
+
+    def test_category_counters_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = CatalogStatistics.compute_categories()
+
+        self.assertEqual(stats, {'total_categories': 2, 'active_categories': 2, 'empty_categories': 1})
+
+    def test_counters_are_cached_until_the_catalog_changes(self):
+        CatalogStatistics.products()
+        with self.assertNumQueries(0):
+            CatalogStatistics.products()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.is_active = False
+            self.product.save()
+            self.assertEqual(CatalogStatistics.products()['inactive_products'], 0, 'not committed yet')
+
+        self.assertEqual(CatalogStatistics.products()['inactive_products'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            StockLedger.record(self.product, 20, 'receipt')
+        self.assertEqual(CatalogStatistics.products()['low_stock_products'], 0)
+
+    def test_admin_lists_show_cached_counters(self):
+        self.client.force_login(User.objects.create(phone_number='09120000003', is_staff=True))
+        self.client.get(reverse('products:admin_product_list'))
+
+        response = self.client.get(reverse('products:admin_product_list'))
+
+        self.assertEqual(response.context['low_stock_products'], 1)
+        self.assertEqual(response.context['inactive_products'], 0)
+        response = self.client.get(reverse('products:admin_category_list'))
+        self.assertEqual(response.context['empty_categories'], 1)
+
+
+class ReorderPlannerTests(TestCase):
+    def setUp(self):
+        self.fast = create_stocked_product(1, quantity=4)
+        self.slow = create_stocked_product(2, quantity=5)
+        create_stocked_product(3, quantity=40)
+        today = timezone.localdate()
+        for offset in range(30):
+            DailyProductSales.objects.create(
+                date=today - datetime.timedelta(days=offset), product=self.fast, quantity=3, revenue=3000,
+            )
+        # Outside the velocity window
+        DailyProductSales.objects.create(
+            date=today - datetime.timedelta(days=200), product=self.slow, quantity=90, revenue=90000,
+        )
+
+    def test_low_stock_query_matches_the_property(self):
+        self.assertEqual(
+            set(Product.objects.low_stock()),
+            {product for product in Product.objects.all() if product.low_stock},
+        )
+
+    def test_suggestions_cover_lead_time_from_sales_velocity(self):
+        suggestions = {row.sku: row for row in ReorderPlanner(days=30, lead_time_days=5, cover_days=25).suggestions()}
+
+        self.assertEqual(set(suggestions), {'ST-1', 'ST-2'})
+        # 3 a day for 30 days, on top of the reorder level of 5
+        self.assertEqual(suggestions['ST-1'].daily_velocity, 3)
+        self.assertEqual(suggestions['ST-1'].suggested_quantity, 5 + 90 - 4)
+        self.assertEqual(suggestions['ST-2'].daily_velocity, 0)
+        self.assertEqual(suggestions['ST-2'].suggested_quantity, 0)
+
+    def test_report_lists_the_most_urgent_first(self):
+        output = io.StringIO()
+
+        self.assertEqual(ReorderPlanner().write_report(output), 2)
+        lines = output.getvalue().splitlines()
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['ST-1', 'ST-2'])
+
+
+def image_upload(name, size=(1200, 900), mode='RGB'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, THUMBNAIL_ASYNC=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        derivative_index.clear()
+        self.addCleanup(derivative_index.clear)
+
+    def test_generates_every_size_and_format(self):
+        name = default_storage.save('product_images/photo.png', image_upload('photo.png', mode='RGBA'))
+
+        self.assertEqual(generate(name), 6)
+        self.assertEqual(generate(name), 0)
+        with default_storage.open(derivative_name(name, 'card', 'webp')) as file:
+            self.assertEqual(Image.open(file).size, (400, 300))
+        with default_storage.open(derivative_name(name, 'mini')) as file:
+            self.assertEqual(Image.open(file).format, 'JPEG')
+
+    def test_upload_queues_derivatives_after_commit(self):
+        product = create_stocked_product(1)
+        product.image = image_upload('upload.png')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        self.assertTrue(has_derivatives(product.image.name))
+        rendered = Template("{% load thumbnails %}{% picture product.image 'card' %}").render(
+            Context({'product': product})
+        )
+        self.assertIn(default_storage.url(derivative_name(product.image.name, 'card', 'webp')), rendered)
+
+    def test_tag_falls_back_to_the_original(self):
+        product = create_stocked_product(1)
+        product.image = default_storage.save('product_images/raw.png', image_upload('raw.png'))
+
+        rendered = Template("{% load thumbnails %}{% thumbnail product.image 'mini' %}").render(
+            Context({'product': product})
+        )
+        self.assertEqual(rendered, product.image.url)
+
+    def test_renders_do_not_ask_storage_once_derivatives_exist(self):
+        product = create_stocked_product(1)
+        product.image = default_storage.save('product_images/known.png', image_upload('known.png'))
+        generate(product.image.name)
+        template = Template("{% load thumbnails %}{% picture product.image 'card' %}")
+
+        with mock.patch('products.thumbnails.has_derivatives') as lookup:
+            for _ in range(3):
+                template.render(Context({'product': product}))
+            self.assertEqual(
+                thumbnail_url(product.image.name, 'mini'),
+                default_storage.url(derivative_name(product.image.name, 'mini')),
+            )
+        lookup.assert_not_called()
+
+    def test_missing_derivatives_are_checked_again_after_the_timeout(self):
+        cached = default_storage.save('product_images/cached.png', image_upload('cached.png'))
+        expired = default_storage.save('product_images/expired.png', image_upload('expired.png'))
+        self.assertEqual(thumbnail_url(cached, 'mini'), default_storage.url(cached))
+        with override_settings(THUMBNAIL_MISSING_TIMEOUT=0):
+            self.assertEqual(thumbnail_url(expired, 'mini'), default_storage.url(expired))
+
+        # The worker has caught up since
+        with mock.patch('products.thumbnails.has_derivatives', return_value=True):
+            self.assertEqual(thumbnail_url(cached, 'mini'), default_storage.url(cached))
+            self.assertEqual(thumbnail_url(expired, 'mini'), default_storage.url(derivative_name(expired, 'mini')))
+
+    def test_partial_derivatives_do_not_count(self):
+        name = default_storage.save('product_images/partial.png', image_upload('partial.png'))
+        default_storage.save(derivative_name(name, 'card'), io.BytesIO(b'partial'))
+
+        self.assertFalse(has_derivatives(name))
+        self.assertEqual(thumbnail_url(name, 'mini'), default_storage.url(name))
+        self.assertEqual(generate(name), 6)
+        self.assertTrue(has_derivatives(name))
+
+    def test_regenerating_overwrites_in_place(self):
+        name = default_storage.save('product_images/again.png', image_upload('again.png'))
+        generate(name)
+        generate(name, force=True)
+
+        directory = posixpath.dirname(derivative_name(name, 'card'))
+        self.assertEqual(len(default_storage.listdir(directory)[1]), 6)
+
+    def test_background_worker_and_backfill(self):
+        first = default_storage.save('product_images/a.png', image_upload('a.png'))
+        second = default_storage.save('category_images/b.png', image_upload('b.png'))
+        Product.objects.filter(pk=create_stocked_product(1).pk).update(image=first)
+        Category.objects.filter(pk=create_category('images').pk).update(image=second)
+
+        with override_settings(THUMBNAIL_ASYNC=True):
+            self.assertEqual(ThumbnailWorker().submit(first).result(), 6)
+        call_command('generate_thumbnails', workers=2, stdout=io.StringIO())
+
+        self.assertTrue(has_derivatives(second))
+
+
+class AsyncProductDetailTests(TestCase):
+    def setUp(self):
+        self.enterContext(use_async_views())
+        parent = create_category('medicine')
+        self.product = create_stocked_product(1)
+        self.product.category = create_category('painkillers', parent=parent)
+        self.product.save()
+        related = [create_stocked_product(index) for index in range(2, 5)]
+        related[0].quantity = 0
+        related[0].save()
+        self.product.related_products.set(related)
+
+    def test_renders_the_same_context_as_the_sync_view(self):
+        url = reverse('products:product_detail', args=[self.product.slug])
+        response = self.client.get(url)
+        with use_async_views(False):
+            expected = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['product'], self.product)
+        self.assertEqual(list(response.context['related_products']), list(expected.context['related_products']))
+        self.assertEqual(len(response.context['related_products']), 2)
+        self.assertEqual(
+            [category.slug for category in response.context['breadcrumbs']], ['medicine', 'painkillers'],
+        )
+        self.assertEqual(response.context['stock_status'], expected.context['stock_status'])
+
+    def test_inactive_products_are_not_found(self):
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+
+        self.assertEqual(self.client.get(reverse('products:product_detail', args=[self.product.slug])).status_code, 404)
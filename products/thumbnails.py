@@ -0,0 +1,186 @@
+# products/thumbnails.py
+import logging
+import posixpath
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Bounding box of each derivative; images are shrunk to fit, never enlarged
+SIZES = {
+    'card': (400, 400),
+    'detail': (800, 800),
+    'mini': (96, 96),
+}
+FORMATS = ('jpg', 'webp')
+QUALITY = {'jpg': 82, 'webp': 80}
+# ``generate`` writes this derivative after all the others
+LAST_DERIVATIVE = (list(SIZES)[-1], FORMATS[-1])
+
+
+def derivative_name(name, size, fmt='jpg'):
+    """Storage name of a derivative: ``product_images/a.png`` -> ``thumbnails/product_images/a.card.webp``"""
+    stem = posixpath.splitext(name)[0]
+    return f'thumbnails/{stem}.{size}.{fmt}'
+
+
+def has_derivatives(name):
+    """Whether every derivative of ``name`` is written; the one written last marks it"""
+    return default_storage.exists(derivative_name(name, *LAST_DERIVATIVE))
+
+
+def derivative_url(name, size, fmt='jpg'):
+    """URL of a derivative of ``name``, or ``None`` until the worker has made it"""
+    if not derivative_index.exists(name):
+        return None
+    return default_storage.url(derivative_name(name, size, fmt))
+
+
+def thumbnail_url(name, size, fmt='jpg'):
+    """URL of a derivative of ``name``, falling back to the original"""
+    return derivative_url(name, size, fmt) or default_storage.url(name)
+
+
+class DerivativeIndex:
+    """
+    Per-process memo of the originals that have derivatives, so pages build
+    derivative URLs without asking storage on every render. Derivatives are
+    written all together and never removed, so a hit is kept for good; a
+    miss is asked again after ``THUMBNAIL_MISSING_TIMEOUT`` seconds, when the
+    worker has usually caught up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._made = set()
+        self._missing = {}
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'THUMBNAIL_MISSING_TIMEOUT', 60)
+
+    def exists(self, name):
+        with self._lock:
+            if name in self._made:
+                return True
+            if self._missing.get(name, 0) > time.monotonic():
+                return False
+        found = has_derivatives(name)
+        with self._lock:
+            if found:
+                self._made.add(name)
+                self._missing.pop(name, None)
+            else:
+                self._missing[name] = time.monotonic() + self.timeout
+        return found
+
+    def add(self, name):
+        with self._lock:
+            self._made.add(name)
+            self._missing.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._made.clear()
+            self._missing.clear()
+
+
+derivative_index = DerivativeIndex()
+
+
+def generate(name, force=False):
+    """
+    Write every size and format of ``name`` to storage and return how many
+    files were written (0 when they already exist or the file is not an
+    image). Safe to call from worker threads and processes.
+    """
+    if not force and has_derivatives(name):
+        derivative_index.add(name)
+        return 0
+    try:
+        with default_storage.open(name, 'rb') as file:
+            source = ImageOps.exif_transpose(Image.open(file))
+            source.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as error:
+        logger.warning('Cannot make thumbnails of %s: %s', name, error)
+        return 0
+
+    written = 0
+    for size, box in SIZES.items():
+        image = source.copy()
+        image.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for fmt in FORMATS:
+            _save(image, derivative_name(name, size, fmt), fmt)
+            written += 1
+    derivative_index.add(name)
+    return written
+
+
+def _save(image, name, fmt):
+    if fmt == 'jpg' and image.mode != 'RGB':
+        # JPEG has no alpha; flatten onto white like the page background
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG' if fmt == 'jpg' else 'WEBP', quality=QUALITY[fmt], optimize=fmt == 'jpg')
+    _derivative_storage().save(name, ContentFile(buffer.getvalue()))
+
+
+def _derivative_storage():
+    """
+    The default storage, overwriting derivatives in place: saving under a
+    new name when two generators race would leave the expected name empty.
+    Remote backends such as S3 overwrite already.
+    """
+    if isinstance(default_storage, FileSystemStorage):
+        return FileSystemStorage(
+            location=default_storage.location, base_url=default_storage.base_url, allow_overwrite=True,
+        )
+    return default_storage
+
+
+class ThumbnailWorker:
+    """
+    Generates derivatives off the request thread. Uploads are queued on a
+    small thread pool (Pillow releases the GIL while resizing), so an admin
+    save returns as soon as the original is stored. With
+    ``THUMBNAIL_ASYNC = False`` derivatives are made inline.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, name):
+        if not getattr(settings, 'THUMBNAIL_ASYNC', True):
+            generate(name)
+            return None
+        return self.executor.submit(self._run, name)
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2), thread_name_prefix='thumbnails',
+                )
+            return self._executor
+
+    @staticmethod
+    def _run(name):
+        try:
+            return generate(name)
+        except Exception:
+            logger.exception('Thumbnail generation failed for %s', name)
+            raise
+
+
+thumbnail_worker = ThumbnailWorker()
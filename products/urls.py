@@ -1,5 +1,6 @@
 from django.urls import path, include
-from .views import admin_products, admin_categories, public_views
+from core.asyncviews import pick
+from .views import admin_dashboard, admin_products, admin_categories, api_views, public_views
 
 app_name = 'products'
 
@@ -8,8 +9,10 @@ admin_product_patterns = [
     path('products/', admin_products.AdminProductListView.as_view(), name='admin_product_list'),
     path('products/<int:product_id>/', admin_products.AdminProductDetailView.as_view(), name='admin_product_detail'),
     path('products/create/', admin_products.AdminProductCreateView.as_view(), name='admin_product_create'),
+    path('products/import/', admin_products.AdminProductImportView.as_view(), name='admin_product_import'),
     path('products/<int:product_id>/edit/', admin_products.AdminProductUpdateView.as_view(), name='admin_product_edit'),
     path('products/<int:product_id>/delete/', admin_products.AdminProductDeleteView.as_view(), name='admin_product_delete'),
+    path('products/barcode/<str:code>/', api_views.ProductBarcodeLookupView.as_view(), name='admin_product_barcode'),
 ]
 
 # Admin Category URLs
@@ -22,7 +25,9 @@ urlpatterns = [
     # Product CRUD
     path('', public_views.HomeView.as_view(), name='home'),
     path('products/', public_views.ProductListView.as_view(), name='product_list'),
-    path('<slug:slug>/', public_views.ProductDetailView.as_view(), name='product_detail'),
+    path('products/autocomplete/', api_views.ProductAutocompleteView.as_view(), name='product_autocomplete'),
+    path('dashboard/', admin_dashboard.AdminDashboardView.as_view(), name='admin_dashboard'),
+    path('<slug:slug>/', pick(public_views.ProductDetailView, public_views.AsyncProductDetailView).as_view(), name='product_detail'),
     
     # Admin routes - grouped under dashboard/
     path('dashboard/', include(admin_product_patterns)),
@@ -4,12 +4,14 @@ from .admin_products import (
     AdminProductDetailView, 
     AdminProductCreateView, 
     AdminProductUpdateView,
-    AdminProductDeleteView
+    AdminProductDeleteView,
+    AdminProductImportView
 )
 from .admin_categories import (
     AdminCategoryListView,
     AdminCategoryToggleView
 )
+from .admin_dashboard import AdminDashboardView
 
 # Public views  
 from .public_views import (
@@ -18,6 +20,9 @@ from .public_views import (
     ProductDetailView,
 )
 
+# JSON API views
+from .api_views import ProductAutocompleteView, ProductBarcodeLookupView
+
 # This allows: from products import views
 # Then: views.AdminProductListView.as_view()
 
@@ -28,13 +33,21 @@ __all__ = [
     'AdminProductCreateView',
     'AdminProductUpdateView',
     'AdminProductDeleteView',
+    'AdminProductImportView',
     
     # Admin Category Views
     'AdminCategoryListView',
     'AdminCategoryToggleView',
     
+    # Admin Dashboard
+    'AdminDashboardView',
+    
     # # Public Views
     'HomeView',
     'ProductListView',
     'ProductDetailView',
+    
+    # API Views
+    'ProductAutocompleteView',
+    'ProductBarcodeLookupView',
 ]
@@ -1,11 +1,15 @@
 from django.views.generic import ListView
+from products.cache import catalog_cache
 from products.models import Category
+from products.statistics import CatalogStatistics
 from mixins import AdminRequiredMixin 
+from core.pagination import KeysetPaginationMixin
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
+from django.db import transaction
 from django.db.models import Count, Q
 
-class AdminCategoryListView(AdminRequiredMixin, ListView):
+class AdminCategoryListView(AdminRequiredMixin, KeysetPaginationMixin, ListView):
     """
     Admin view for managing product categories with comprehensive functionality.
     Provides category statistics, search, and AJAX operations.
@@ -15,6 +19,7 @@ class AdminCategoryListView(AdminRequiredMixin, ListView):
     context_object_name = 'categories'
     paginate_by = 20
     ordering = ['-id']  # Show newest first
+    keyset_ordering = ('-id',)
 
     def get_queryset(self):
         """
@@ -50,13 +55,8 @@ class AdminCategoryListView(AdminRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         
         # Category statistics
+        context.update(CatalogStatistics.categories())
         context.update({
-            'total_categories': Category.objects.count(),
-            'active_categories': Category.objects.filter(is_active=True).count(),
-            'empty_categories': Category.objects.annotate(
-                product_count=Count('products')
-            ).filter(product_count=0).count(),
-            
             # Search and filter context
             'current_search': self.request.GET.get('search', ''),
             'current_status': self.request.GET.get('status', ''),
@@ -86,10 +86,12 @@ class AdminCategoryListView(AdminRequiredMixin, ListView):
             
             if action == 'activate':
                 categories.update(is_active=True)
+                transaction.on_commit(catalog_cache.bump_version)
                 message = f'{categories.count()} دسته‌بندی فعال شد'
                 
             elif action == 'deactivate':
                 categories.update(is_active=False)
+                transaction.on_commit(catalog_cache.bump_version)
                 message = f'{categories.count()} دسته‌بندی غیرفعال شد'
                 
             elif action == 'delete':
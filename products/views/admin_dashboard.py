@@ -0,0 +1,23 @@
+from django.views.generic import TemplateView
+
+from mixins import AdminRequiredMixin
+from orders.dashboard import SalesDashboard
+
+
+class AdminDashboardView(AdminRequiredMixin, TemplateView):
+    """
+    Sales and inventory overview for staff. Every widget comes from the
+    sales rollups or cached counters, so the page costs the same number of
+    queries however much order history there is.
+    """
+    template_name = 'products/admin/Dashboard.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.request.GET.get('refresh'):
+            SalesDashboard.refresh_counters()
+        context.update(SalesDashboard().build())
+        daily = context['daily_revenue'].value
+        context['today_revenue'] = daily[-1][1]
+        context['daily_peak'] = max(revenue for _, revenue, _ in daily) or 1
+        return context
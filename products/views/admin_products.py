@@ -1,38 +1,45 @@
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
 from django.urls import reverse_lazy
 from products.models import Product
-from products.forms import ProductForm
+from products.forms import ProductForm, ProductImportForm
+from products.importer import ProductImportError, ProductImporter, open_rows
+from products.statistics import CatalogStatistics
+from products.stock import InsufficientStockError
 from mixins import AdminRequiredMixin 
+from core.pagination import KeysetPaginationMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.http import JsonResponse
 
 
-class AdminProductListView(AdminRequiredMixin, ListView):
+class AdminProductListView(AdminRequiredMixin, KeysetPaginationMixin, ListView):
     model = Product
     template_name = "products/admin/ProductList.html"
     context_object_name = "products"
     paginate_by = 20  # Show 20 products per page
     ordering = ['-id']  # Show newest products first
+    keyset_ordering = ('-id',)
+
+    def get_keyset_ordering(self):
+        if self.request.GET.get('search'):
+            return None
+        return self.keyset_ordering
 
     def get_queryset(self):
         """Optimize queries with select_related for category"""
-        return Product.objects.select_related('category').all()
+        search_query = self.request.GET.get('search')
+        if search_query:
+            return Product.objects.search(search_query, active_only=False)
+        return Product.objects.select_related('category').order_by(*self.ordering)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Add product statistics
-        context['total_products'] = Product.objects.count()
-        context['active_products'] = Product.objects.filter(is_active=True).count()
-        context['recommended_products_count'] = Product.objects.filter(recommended=True).count()
-        
-        # Commented for future use
-        # context['inactive_products'] = Product.objects.filter(is_active=False).count()
-        # context['low_stock_products'] = Product.objects.filter(
-        #     quantity__lte=models.F('reorder_level')
-        # ).count()
+        # Product statistics: total, active, inactive, recommended and low stock
+        context.update(CatalogStatistics.products())
+        context['current_search'] = self.request.GET.get('search', '')
+        context['search_truncated'] = getattr(self.object_list, 'truncated', False)
         
         return context
 
@@ -128,9 +135,16 @@ class AdminProductUpdateView(AdminRequiredMixin, SuccessMessageMixin, UpdateView
         # Add any additional checks here
         return obj
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'user': self.request.user}
+
     def form_valid(self, form):
         """Add custom logic before saving updates"""
-        response = super().form_valid(form)
+        try:
+            response = super().form_valid(form)
+        except InsufficientStockError:
+            form.add_error('quantity', 'موجودی در همین فاصله فروخته شد؛ لطفاً مقدار را دوباره بررسی کنید')
+            return self.form_invalid(form)
         
         # Check for stock level warnings
         if self.object.low_stock:
@@ -186,3 +200,34 @@ class AdminProductDeleteView(AdminRequiredMixin, SuccessMessageMixin, DeleteView
         """Prevent GET requests - only allow POST/DELETE"""
         messages.error(request, "متد درخواست نامعتبر است")
         return redirect(self.success_url)
+
+
+class AdminProductImportView(AdminRequiredMixin, FormView):
+    """
+    Upsert products from a CSV/XLSX price list. The file is streamed row by
+    row; a dry run validates it and reports what would change.
+    """
+    form_class = ProductImportForm
+    template_name = 'products/admin/ProductImport.html'
+    extra_context = {
+        'page_title': 'ورود گروهی محصولات'
+    }
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        importer = ProductImporter(dry_run=form.cleaned_data['dry_run'], created_by=self.request.user)
+        try:
+            columns, rows = open_rows(upload, upload.name)
+            report = importer.run(columns, rows, source=upload.name)
+        except ProductImportError as error:
+            form.add_error('file', str(error))
+            return self.form_invalid(form)
+
+        if report.dry_run:
+            messages.info(self.request, f"بررسی فایل انجام شد؛ {report.imported} ردیف معتبر و {report.skipped} ردیف نامعتبر")
+        else:
+            messages.success(
+                self.request,
+                f"{report.created} محصول جدید اضافه و {report.updated} محصول به‌روزرسانی شد"
+            )
+        return self.render_to_response(self.get_context_data(form=form, report=report))
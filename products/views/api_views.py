@@ -0,0 +1,69 @@
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views import View
+
+from mixins import AdminRequiredMixin
+
+from ..autocomplete import autocomplete_index
+from ..barcodes import barcode_lookup
+
+
+class ProductAutocompleteView(View):
+    """Typeahead suggestions by partial product name, SKU or barcode"""
+    default_limit = 8
+    max_limit = 20
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        try:
+            limit = min(int(request.GET.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+
+        # Staff at the counter may also look up deactivated products
+        active_only = not (request.user.is_staff and request.GET.get('inactive'))
+        suggestions = autocomplete_index.lookup(query, limit=limit, active_only=active_only)
+
+        return JsonResponse({
+            'query': query,
+            'results': [
+                {
+                    'id': suggestion.id,
+                    'name': suggestion.name,
+                    'sku': suggestion.sku,
+                    'barcode': suggestion.barcode,
+                    'is_active': suggestion.is_active,
+                    'url': reverse('products:product_detail', args=[suggestion.slug]),
+                }
+                for suggestion in suggestions
+            ],
+        })
+
+
+class ProductBarcodeLookupView(AdminRequiredMixin, View):
+    """Point-of-sale scan: product, effective price and stock in one response"""
+
+    def handle_no_permission(self):
+        return JsonResponse({'success': False, 'message': 'دسترسی مجاز نیست.'}, status=403)
+
+    def get(self, request, code):
+        product = barcode_lookup.lookup(code)
+        if product is None:
+            return JsonResponse({'success': False, 'message': 'کالایی با این بارکد یافت نشد.'}, status=404)
+
+        return JsonResponse({
+            'success': True,
+            'product': {
+                'id': product.id,
+                'name': product.name,
+                'sku': product.sku,
+                'barcode': product.barcode,
+                'is_active': product.is_active,
+                'unit_price': float(product.unit_price),
+                'effective_unit_price': float(product.effective_unit_price),
+                'has_discount': product.has_discount,
+                'quantity': product.quantity,
+                'is_available': product.is_available,
+                'stock_status': product.get_stock_status(),
+            },
+        })
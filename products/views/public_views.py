@@ -1,25 +1,71 @@
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
 from django.views.generic import ListView, DetailView, TemplateView
+from core.asyncviews import AsyncViewMixin
+from core.pagination import KeysetPaginationMixin
 from products.models import Product
+from products.cache import catalog_cache
+from products.forms import ProductFilterForm
 
 class HomeView(TemplateView):
     template_name = "products/Home.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['recommended_products'] = Product.objects.recommended()[:6]
-        context['discounted_products'] = Product.objects.discounted()[:12]
+        context['recommended_products'] = catalog_cache.get_or_set(
+            'home:recommended',
+            lambda: list(Product.objects.recommended().select_related('category')[:6]),
+        )
+        context['discounted_products'] = catalog_cache.get_or_set(
+            'home:discounted',
+            lambda: list(Product.objects.discounted().select_related('category')[:12]),
+        )
 
         return context
 
-class ProductListView(ListView):
+class ProductListView(KeysetPaginationMixin, ListView):
     model = Product
     template_name = 'products/product_list.html'  # Customize this path
     context_object_name = 'products'
     paginate_by = 20  # Pagination for scalability
+    keyset_ordering = ('name', 'id')
+    
+    def get_keyset_ordering(self):
+        # Search results are ranked, so they keep numbered pages
+        if self.request.GET.get('search'):
+            return None
+        return self.keyset_ordering
     
     def get_queryset(self):
-        # You can customize ordering or filtering here
-        return Product.objects.filter(is_active=True).order_by('name')
+        queryset = Product.objects.filter(is_active=True).order_by('name', 'id')
+        self.form = ProductFilterForm(self.request.GET or None)
+        if not self.form.is_valid():
+            return queryset
+
+        filters = self.form.cleaned_data
+        if filters['search']:
+            return Product.objects.search(
+                filters['search'],
+                category=filters['category'],
+                available_only=filters['available'],
+            )
+        if filters['category']:
+            # The whole subtree is one index range on the category path
+            queryset = queryset.filter(
+                filters['category'].subtree_q(filters['category'].path, prefix='category__')
+            )
+        if filters['available']:
+            queryset = queryset.filter(quantity__gt=0)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['form'] = self.form
+        context['category'] = self.request.GET.get('category', '')
+        context['search'] = self.request.GET.get('search', '')
+        context['available'] = bool(self.request.GET.get('available'))
+        context['search_truncated'] = getattr(self.object_list, 'truncated', False)
+        return context
 
 class ProductDetailView(DetailView):
     model = Product
@@ -35,9 +81,26 @@ class ProductDetailView(DetailView):
         context = super().get_context_data(**kwargs)
         product = self.object
         
-        # Use manager methods for clean separation
-        context['related_products'] = Product.objects.get_related_products(product)
-        context['breadcrumbs'] = Product.objects.get_category_breadcrumbs(product.category)
+        # Use manager methods for clean separation (async views load them beforehand)
+        if 'related_products' not in context:
+            context['related_products'] = Product.objects.get_related_products(product)
+        if 'breadcrumbs' not in context:
+            context['breadcrumbs'] = Product.objects.get_category_breadcrumbs(product.category)
         context['stock_status'] = product.get_stock_status()
         
         return context
+
+
+class AsyncProductDetailView(AsyncViewMixin, ProductDetailView):
+    """``ProductDetailView`` on the async ORM, for ASGI"""
+    
+    async def get(self, request, *args, **kwargs):
+        self.object = await aget_object_or_404(self.get_queryset(), slug=kwargs[self.slug_url_kwarg])
+        self.extra_context = {
+            'related_products': [
+                related async for related in Product.objects.get_related_products(self.object)
+            ],
+            # Cached with the catalog, so usually no query at all
+            'breadcrumbs': await sync_to_async(Product.objects.get_category_breadcrumbs)(self.object.category),
+        }
+        return self.render_to_response(self.get_context_data(object=self.object))
@@ -1,7 +1,7 @@
 # users/admin.py
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, OTPVerification
+from .models import User, OTPVerification, SMSMessage
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -31,3 +31,11 @@ class OTPVerificationAdmin(admin.ModelAdmin):
     search_fields = ('phone_number',)
     readonly_fields = ('created_at', 'expires_at')
     ordering = ('-created_at',)
+
+@admin.register(SMSMessage)
+class SMSMessageAdmin(admin.ModelAdmin):
+    list_display = ('phone_number', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('phone_number',)
+    readonly_fields = ('created_at', 'sent_at', 'provider_message_id', 'last_error')
+    ordering = ('-created_at',)
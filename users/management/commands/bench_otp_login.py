@@ -0,0 +1,68 @@
+import contextlib
+import io
+import random
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmarks import rolled_back, timer
+from users.models import OTPVerification, User
+from users.otp import get_otp_backend
+
+
+class Command(BaseCommand):
+    help = 'Measure logins per second through the phone entry and OTP views for each OTP backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=300)
+        parser.add_argument('--history', type=int, default=200_000, help='Old OTP rows already in the table')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            with timer() as elapsed:
+                self._seed(random.Random(options['seed']), options['history'])
+            self.stdout.write(f'{options["history"]} old codes generated in {elapsed["seconds"]:.1f}s')
+
+            self._measure('database', 'users.otp.DatabaseOTPBackend', options['logins'], 0)
+            self._measure('cache', 'users.otp.CacheOTPBackend', options['logins'], 1)
+            with connection.cursor() as cursor:
+                # Rolled back with the rest of the benchmark
+                cursor.execute('DROP INDEX otp_phone_created_idx')
+            self._measure('database, no index', 'users.otp.DatabaseOTPBackend', options['logins'], 2)
+
+    def _measure(self, label, backend, logins, offset):
+        phones = [f'0935{offset}{index:06d}' for index in range(logins)]
+        User.objects.bulk_create([User(phone_number=phone) for phone in phones])
+        with override_settings(OTP_BACKEND=backend, ALLOWED_HOSTS=['testserver']), contextlib.redirect_stdout(io.StringIO()):
+            caches['default'].clear()
+            with timer() as elapsed:
+                for phone in phones:
+                    self._login(phone)
+        self.stdout.write(f'{label:20} {logins / elapsed["seconds"]:8.1f} logins/s')
+
+    @staticmethod
+    def _login(phone):
+        client = Client()
+        client.post(reverse('users:phone_entry'), {'phone_number': phone})
+        code = get_otp_backend().latest(phone).otp_code
+        response = client.post(reverse('users:otp_verification'), {'phone_number': phone, 'otp_code': code})
+        assert response.url == reverse('users:user_dashboard'), response.url
+
+    @staticmethod
+    def _seed(rng, count):
+        now = timezone.now()
+        batch = []
+        for index in range(count):
+            batch.append(OTPVerification(
+                phone_number=f'0912{rng.randrange(10 ** 7):07d}', otp_code='000000', is_used=True,
+                expires_at=now,
+            ))
+            if len(batch) == 10000:
+                OTPVerification.objects.bulk_create(batch)
+                batch = []
+        OTPVerification.objects.bulk_create(batch)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.benchmarks import rolled_back, timer
+from users.models import SMSMessage, User
+from users.sms import FakeSMSProvider, SMSDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Measure phone entry latency with the SMS sent inline and queued, then the outbox drain rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=40)
+        parser.add_argument('--delay', type=float, default=0.2, help='Simulated provider latency in seconds')
+        parser.add_argument('--concurrency', type=int, default=8, help='Provider max_concurrency for the drain')
+
+    def handle(self, *args, **options):
+        logins, delay = options['logins'], options['delay']
+        provider = 'users.sms.FakeSMSProvider'
+        with rolled_back():
+            for offset, (label, is_async) in enumerate([('inline', False), ('queued', True)]):
+                phones = [f'0936{offset}{index:06d}' for index in range(logins)]
+                User.objects.bulk_create([User(phone_number=phone) for phone in phones])
+                with override_settings(SMS_PROVIDER=provider, SMS_PROVIDER_OPTIONS={'delay': delay},
+                                       SMS_ASYNC=is_async, ALLOWED_HOSTS=['testserver']):
+                    with timer() as elapsed:
+                        for phone in phones:
+                            Client().post(reverse('users:phone_entry'), {'phone_number': phone})
+                self.stdout.write(f'{label:8} {elapsed["seconds"] / logins * 1000:8.1f} ms per phone entry')
+
+            # Inside rolled_back the commit hook never wakes the worker, so drain here
+            pending = SMSMessage.objects.filter(status='pending').count()
+            dispatcher = SMSDispatcher(FakeSMSProvider(max_concurrency=options['concurrency'], delay=delay))
+            with timer() as elapsed:
+                sent = dispatcher.dispatch_pending()
+            self.stdout.write(
+                f'drained {sent}/{pending} queued messages in {elapsed["seconds"]:.2f}s '
+                f'({sent / elapsed["seconds"]:.1f}/s at {options["concurrency"]} in flight)'
+            )
+        FakeSMSProvider.outbox.clear()
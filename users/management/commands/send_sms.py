@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from users.sms import SMSDispatcher, sms_worker
+
+
+class Command(BaseCommand):
+    help = 'Send the due messages in the SMS outbox (or keep sending with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox like the in-process worker')
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            self.stdout.write('Sending SMS from the outbox; Ctrl+C to stop')
+            sms_worker.loop()
+        sent = SMSDispatcher().dispatch_pending()
+        self.stdout.write(self.style.SUCCESS(f'{sent} messages sent'))
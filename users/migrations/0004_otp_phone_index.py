@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_phone_number'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otpverification',
+            index=models.Index(fields=['phone_number', '-created_at'], name='otp_phone_created_idx'),
+        ),
+    ]
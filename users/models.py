@@ -1,9 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 from django.utils import timezone
-from datetime import timedelta
-import random
-import string
 from .managers import UserManager, AddressManager
 from .validators import IranianPostalCodeValidator, IranianPhoneValidator, IranianNationalIdValidator
 
@@ -118,6 +115,10 @@ class OTPVerification(models.Model):
     class Meta:
         db_table = 'otp_verifications'
         ordering = ['-created_at']
+        indexes = [
+            # Rate limiting and the latest-code lookup filter on phone, newest first
+            models.Index(fields=['phone_number', '-created_at'], name='otp_phone_created_idx'),
+        ]
     
     def __str__(self):
         return f"OTP for {self.phone_number} - {self.otp_code}"
@@ -129,56 +130,25 @@ class OTPVerification(models.Model):
     @classmethod
     def can_generate_otp(cls, phone_number):
         """Check if OTP can be generated (rate limiting)"""
-        from django.conf import settings
-        
-        rate_limit_minutes = getattr(settings, 'OTP_RATE_LIMIT_MINUTES', 2)
-        cutoff_time = timezone.now() - timedelta(minutes=rate_limit_minutes)
-        
-        recent_otps = cls.objects.filter(
-            phone_number=phone_number,
-            created_at__gte=cutoff_time
-        ).count()
-        
-        max_requests = getattr(settings, 'OTP_MAX_REQUESTS_PER_PERIOD', 3)
-        return recent_otps < max_requests
+        from .otp import DatabaseOTPBackend
+        return DatabaseOTPBackend().allows(phone_number)
     
     @classmethod
     def generate_otp(cls, phone_number):
         """Generate a new OTP for the given phone number"""
-        otp, _ = cls.generate_otp_with_user_status(phone_number)
-        return otp
+        from .otp import DatabaseOTPBackend
+        return DatabaseOTPBackend().issue(phone_number)
     
     @classmethod
     def get_latest_otp(cls, phone_number):
         """Get the latest unused OTP for phone number"""
-        return cls.objects.filter(
-            phone_number=phone_number,
-            is_used=False
-        ).first()
+        from .otp import DatabaseOTPBackend
+        return DatabaseOTPBackend().latest(phone_number)
     
     def verify_otp(self, entered_otp):
         """Verify the entered OTP"""
-        from django.conf import settings
-        
-        max_attempts = getattr(settings, 'OTP_MAX_ATTEMPTS', 3)
-        
-        if self.is_used or self.is_expired:
-            return False, "کد تأیید منقضی شده یا قبلاً استفاده شده"
-        
-        if self.attempts >= max_attempts:
-            return False, "تعداد تلاش‌های مجاز تمام شده"
-        
-        self.attempts += 1
-        self.save()
-        
-        if self.otp_code == entered_otp:
-            self.is_verified = True
-            self.is_used = True
-            self.save()
-            return True, "کد تأیید با موفقیت تأیید شد"
-        
-        remaining = max_attempts - self.attempts
-        return False, f"کد تأیید اشتباه. {remaining} تلاش باقی مانده"
+        from .otp import DatabaseOTPBackend
+        return DatabaseOTPBackend().verify_record(self, entered_otp)
     
     def get_time_remaining(self):
         """Get remaining time in seconds until expiration"""
@@ -191,34 +161,40 @@ class OTPVerification(models.Model):
     @classmethod
     def generate_otp_with_user_status(cls, phone_number):
         """Generate OTP and return user existence status"""
-        from django.conf import settings
-        
-        # Check if user exists
         user_exists = User.objects.filter(phone_number=phone_number).exists()
-        
-        # Check rate limiting
-        if not cls.can_generate_otp(phone_number):
-            raise ValueError("لطفاً ۲ دقیقه صبر کنید و مجدداً تلاش کنید")
-        
-        # Invalidate previous unused OTPs
-        cls.objects.filter(
-            phone_number=phone_number,
-            is_used=False
-        ).update(is_used=True)
-        
-        # Generate new OTP
-        otp_code = ''.join(random.choices(string.digits, k=6))
-        expires_at = timezone.now() + timedelta(
-            minutes=getattr(settings, 'OTP_EXPIRE_MINUTES', 5)
-        )
-        
-        otp = cls.objects.create(
-            phone_number=phone_number,
-            otp_code=otp_code,
-            expires_at=expires_at
-        )
-        
-        return otp, user_exists
+        return cls.generate_otp(phone_number), user_exists
+
+class SMSMessage(models.Model):
+    """Outbox row for one text message; sent by ``users.sms.SMSDispatcher``"""
+    STATUS_CHOICES = [
+        ('pending', 'در صف ارسال'),
+        ('sending', 'در حال ارسال'),
+        ('sent', 'ارسال شده'),
+        ('failed', 'ناموفق'),
+    ]
+
+    phone_number = models.CharField(max_length=11)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # Due time while pending; lease expiry while sending
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True)
+    provider_message_id = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'sms_outbox'
+        ordering = ['-created_at']
+        indexes = [
+            # The dispatcher claims due messages by status and due time
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"SMS to {self.phone_number} ({self.status})"
 
 class Address(models.Model):
     ADDRESS_TYPES = [
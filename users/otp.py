@@ -0,0 +1,301 @@
+# users/otp.py
+"""
+Pluggable storage for login codes, chosen with ``OTP_BACKEND``.
+
+``DatabaseOTPBackend`` keeps codes in ``otp_verifications`` (indexed on
+phone number and creation time) and is the default. ``CacheOTPBackend``
+keeps them in a cache with a TTL, so issuing and checking a code never
+touches the database; it needs a cache shared by every worker (Redis,
+Memcached) outside development. Both allow ``OTP_MAX_REQUESTS_PER_PERIOD``
+codes per ``OTP_RATE_LIMIT_MINUTES`` and ``OTP_MAX_ATTEMPTS`` guesses per code.
+The ``a``-prefixed methods are their coroutine versions for async views.
+"""
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+
+RATE_LIMIT_MESSAGE = 'لطفاً ۲ دقیقه صبر کنید و مجدداً تلاش کنید'
+EXPIRED_MESSAGE = 'کد تأیید منقضی شده یا قبلاً استفاده شده'
+ATTEMPTS_MESSAGE = 'تعداد تلاش‌های مجاز تمام شده'
+VERIFIED_MESSAGE = 'کد تأیید با موفقیت تأیید شد'
+
+
+class OTPNotFound(Exception):
+    """No code is pending for the phone number"""
+
+
+@dataclass
+class OTP:
+    """A code held by a cache backend, shaped like ``OTPVerification``"""
+    phone_number: str
+    otp_code: str
+    expires_at: datetime
+
+    @property
+    def is_expired(self):
+        return timezone.now() > self.expires_at
+
+    def get_time_remaining(self):
+        return max(0, int((self.expires_at - timezone.now()).total_seconds()))
+
+
+class BaseOTPBackend:
+    def issue(self, phone_number):
+        """Replace any pending code with a new one; raises ``ValueError`` when rate limited"""
+        raise NotImplementedError('OTP backends must implement issue()')
+
+    def latest(self, phone_number):
+        """The pending code for ``phone_number``, or ``None``"""
+        raise NotImplementedError('OTP backends must implement latest()')
+
+    def verify(self, phone_number, otp_code):
+        """``(is_valid, message)``; raises ``OTPNotFound`` when no code is pending"""
+        raise NotImplementedError('OTP backends must implement verify()')
+
+    def time_remaining(self, phone_number):
+        otp = self.latest(phone_number)
+        return otp.get_time_remaining() if otp else 0
+
+    # Backends without native coroutines run the sync method in a thread
+
+    async def aissue(self, phone_number):
+        return await sync_to_async(self.issue)(phone_number)
+
+    async def alatest(self, phone_number):
+        return await sync_to_async(self.latest)(phone_number)
+
+    async def averify(self, phone_number, otp_code):
+        return await sync_to_async(self.verify)(phone_number, otp_code)
+
+    async def atime_remaining(self, phone_number):
+        otp = await self.alatest(phone_number)
+        return otp.get_time_remaining() if otp else 0
+
+    @property
+    def max_attempts(self):
+        return getattr(settings, 'OTP_MAX_ATTEMPTS', 3)
+
+    @property
+    def max_requests(self):
+        return getattr(settings, 'OTP_MAX_REQUESTS_PER_PERIOD', 3)
+
+    @property
+    def rate_window(self):
+        return timedelta(minutes=getattr(settings, 'OTP_RATE_LIMIT_MINUTES', 2))
+
+    @property
+    def lifetime(self):
+        return timedelta(minutes=getattr(settings, 'OTP_EXPIRE_MINUTES', 5))
+
+    @staticmethod
+    def new_code():
+        return f'{secrets.randbelow(10 ** 6):06d}'
+
+    def wrong_code_message(self, attempts):
+        return f'کد تأیید اشتباه. {self.max_attempts - attempts} تلاش باقی مانده'
+
+
+class DatabaseOTPBackend(BaseOTPBackend):
+    """Codes as ``OTPVerification`` rows; every lookup is served by the phone/date index"""
+
+    def allows(self, phone_number):
+        """Whether another code may be issued within the rate limit"""
+        return self._recent(phone_number).count() < self.max_requests
+
+    def issue(self, phone_number):
+        if not self.allows(phone_number):
+            raise ValueError(RATE_LIMIT_MESSAGE)
+        return self._replace(phone_number)
+
+    def latest(self, phone_number):
+        return self._pending(phone_number).first()
+
+    def verify(self, phone_number, otp_code):
+        record = self.latest(phone_number)
+        if record is None:
+            raise OTPNotFound(phone_number)
+        return self.verify_record(record, otp_code)
+
+    def verify_record(self, record, otp_code):
+        """
+        Count the guess and, when it matches, use the code up in a single
+        conditional UPDATE, so concurrent guesses cannot exceed the limit
+        or use one code twice.
+        """
+        refused = self._refusal(record)
+        if refused:
+            return refused
+        matches = constant_time_compare(record.otp_code, otp_code)
+        counted = self._guess(record).update(**self._guess_changes(matches))
+        return self._verified(record, matches, counted)
+
+    async def aissue(self, phone_number):
+        if await self._recent(phone_number).acount() >= self.max_requests:
+            raise ValueError(RATE_LIMIT_MESSAGE)
+        # Retiring the old code and creating the new one stay in one transaction
+        return await sync_to_async(self._replace)(phone_number)
+
+    async def alatest(self, phone_number):
+        return await self._pending(phone_number).afirst()
+
+    async def averify(self, phone_number, otp_code):
+        record = await self.alatest(phone_number)
+        if record is None:
+            raise OTPNotFound(phone_number)
+        refused = self._refusal(record)
+        if refused:
+            return refused
+        matches = constant_time_compare(record.otp_code, otp_code)
+        counted = await self._guess(record).aupdate(**self._guess_changes(matches))
+        return self._verified(record, matches, counted)
+
+    def _recent(self, phone_number):
+        from .models import OTPVerification
+
+        since = timezone.now() - self.rate_window
+        return OTPVerification.objects.filter(phone_number=phone_number, created_at__gte=since)
+
+    def _pending(self, phone_number):
+        from .models import OTPVerification
+
+        return OTPVerification.objects.filter(phone_number=phone_number, is_used=False)
+
+    def _replace(self, phone_number):
+        from .models import OTPVerification
+
+        now = timezone.now()
+        with transaction.atomic():
+            self._pending(phone_number).update(is_used=True)
+            return OTPVerification.objects.create(
+                phone_number=phone_number,
+                otp_code=self.new_code(),
+                expires_at=now + self.lifetime,
+            )
+
+    def _refusal(self, record):
+        if record.is_used or record.is_expired:
+            return False, EXPIRED_MESSAGE
+        if record.attempts >= self.max_attempts:
+            return False, ATTEMPTS_MESSAGE
+        return None
+
+    def _guess(self, record):
+        from .models import OTPVerification
+
+        return OTPVerification.objects.filter(pk=record.pk, is_used=False, attempts__lt=self.max_attempts)
+
+    @staticmethod
+    def _guess_changes(matches):
+        changes = {'attempts': models.F('attempts') + 1}
+        if matches:
+            changes.update(is_verified=True, is_used=True)
+        return changes
+
+    def _verified(self, record, matches, counted):
+        if not counted:
+            return False, ATTEMPTS_MESSAGE
+        record.attempts += 1
+        if matches:
+            record.is_verified = record.is_used = True
+            return True, VERIFIED_MESSAGE
+        return False, self.wrong_code_message(record.attempts)
+
+
+class CacheOTPBackend(BaseOTPBackend):
+    """
+    Codes in the ``OTP_CACHE_ALIAS`` cache, expiring with their TTL.
+
+    Guesses are counted with ``incr`` and a code is used up by the one
+    ``delete`` that removes it, both atomic on shared caches. Requests are
+    limited with a sliding-window counter: the current fixed window plus
+    the previous one weighted by how much of it still overlaps.
+    """
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'OTP_CACHE_ALIAS', 'default')]
+
+    def issue(self, phone_number):
+        if not self._allow(phone_number):
+            raise ValueError(RATE_LIMIT_MESSAGE)
+        otp = OTP(phone_number, self.new_code(), timezone.now() + self.lifetime)
+        timeout = self.lifetime.total_seconds()
+        self.cache.set_many({
+            self._code_key(phone_number): (otp.otp_code, otp.expires_at.timestamp()),
+            self._attempts_key(phone_number): 0,
+        }, timeout)
+        return otp
+
+    def latest(self, phone_number):
+        record = self.cache.get(self._code_key(phone_number))
+        if record is None:
+            return None
+        code, expires_at = record
+        return OTP(phone_number, code, datetime.fromtimestamp(expires_at, tz=dt_timezone.utc))
+
+    def verify(self, phone_number, otp_code):
+        code_key = self._code_key(phone_number)
+        record = self.cache.get(code_key)
+        if record is None:
+            raise OTPNotFound(phone_number)
+
+        attempts = self._incr(self._attempts_key(phone_number), self.lifetime.total_seconds())
+        if attempts > self.max_attempts:
+            return False, ATTEMPTS_MESSAGE
+        if not constant_time_compare(record[0], otp_code):
+            return False, self.wrong_code_message(attempts)
+        if not self.cache.delete(code_key):
+            # Another request used the code first
+            return False, EXPIRED_MESSAGE
+        return True, VERIFIED_MESSAGE
+
+    def _allow(self, phone_number):
+        window = self.rate_window.total_seconds()
+        now = time.time()
+        bucket = int(now // window)
+        key = f'otp:rate:{phone_number}:{bucket}'
+        current = self._incr(key, window * 2)
+        previous = self.cache.get(f'otp:rate:{phone_number}:{bucket - 1}', 0)
+        overlap = 1 - (now % window) / window
+        if previous * overlap + current > self.max_requests:
+            # Refused requests do not count towards the limit
+            self.cache.decr(key)
+            return False
+        return True
+
+    def _incr(self, key, timeout):
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.set(key, 1, timeout)
+            return 1
+
+    @staticmethod
+    def _code_key(phone_number):
+        return f'otp:code:{phone_number}'
+
+    @staticmethod
+    def _attempts_key(phone_number):
+        return f'otp:attempts:{phone_number}'
+
+
+_backends = {}
+
+
+def get_otp_backend():
+    """The configured backend, one instance per ``OTP_BACKEND`` path"""
+    path = getattr(settings, 'OTP_BACKEND', 'users.otp.DatabaseOTPBackend')
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils import timezone
+
+from core.maintenance import Purge
+from .models import OTPVerification, SMSMessage
+from .otp import DatabaseOTPBackend
+
+
+class ExpiredOTPPurge(Purge):
+    """Used or expired codes; codes inside the rate-limit window are kept because they still count"""
+    name = 'otps'
+    default_days = 1
+    batch_size = 5000
+
+    def cutoff(self):
+        return min(super().cutoff(), timezone.now() - DatabaseOTPBackend().rate_window)
+
+    def get_queryset(self):
+        return OTPVerification.objects.filter(
+            models.Q(is_used=True) | models.Q(expires_at__lt=timezone.now()),
+            created_at__lt=self.cutoff(),
+        )
+
+
+class SMSOutboxPurge(Purge):
+    """Sent or failed messages; pending ones are kept however old"""
+    name = 'sms'
+    default_days = 30
+    batch_size = 5000
+
+    def get_queryset(self):
+        return SMSMessage.objects.filter(status__in=['sent', 'failed'], created_at__lt=self.cutoff())
@@ -2,7 +2,8 @@
 from django.contrib.auth import login
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from .models import OTPVerification
+from .otp import OTPNotFound, get_otp_backend
+from .sms import send_otp
 import logging
 
 User = get_user_model()
@@ -20,12 +21,10 @@ class OTPAuthService:
                 return False, "Invalid Iranian phone number format"
             
             # Generate OTP
-            otp = OTPVerification.generate_otp(clean_phone)
+            otp = get_otp_backend().issue(clean_phone)
             
-            # TODO: Integrate with SMS service (Kavenegar, etc.)
-            # For development, we'll just log the OTP
-            logger.info(f"OTP for {clean_phone}: {otp.otp_code}")
-            print(f"🔐 OTP for {clean_phone}: {otp.otp_code}")  # Remove in production
+            # Queued in the SMS outbox; the background worker calls the provider
+            send_otp(clean_phone, otp.otp_code)
             
             return True, "OTP sent successfully"
             
@@ -39,18 +38,12 @@ class OTPAuthService:
         try:
             clean_phone = phone_number.replace(' ', '').replace('-', '')
             
-            # Get the latest OTP for this phone number
+            # Verify the pending OTP for this phone number
             try:
-                otp_obj = OTPVerification.objects.filter(
-                    phone_number=clean_phone,
-                    is_used=False
-                ).latest('created_at')
-            except OTPVerification.DoesNotExist:
+                is_valid, message = get_otp_backend().verify(clean_phone, otp_code)
+            except OTPNotFound:
                 return False, "No valid OTP found. Please request a new one."
             
-            # Verify OTP
-            is_valid, message = otp_obj.verify_otp(otp_code)
-            
             if not is_valid:
                 return False, message
             
@@ -63,10 +56,10 @@ class OTPAuthService:
                 }
             )
             
-            if not created:
+            if not created and not user.is_phone_verified:
                 # Update verification status for existing user
                 user.is_phone_verified = True
-                user.save()
+                user.save(update_fields=['is_phone_verified'])
             
             # Login user
             login(request, user)
@@ -0,0 +1,255 @@
+# users/sms.py
+"""
+Text messages go through a durable outbox instead of the request thread.
+
+``send_sms`` stores an ``SMSMessage`` and, once the transaction commits,
+wakes ``sms_worker``, a background thread that runs
+``SMSDispatcher.dispatch_pending``. The dispatcher claims due messages
+in batches, hands them to the provider on a pool limited to the
+provider's ``max_concurrency`` and retries failures with exponential
+backoff. Claims are leases, so a message whose worker died is picked up
+again, and the ``send_sms`` command can drain the outbox from a separate
+process. With ``SMS_ASYNC = False`` messages are sent inline.
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+OTP_MESSAGE = 'کد تأیید شما: {code}\nداروخانه لقمان'
+
+
+class SMSProviderError(Exception):
+    """The provider refused or failed to send a message"""
+
+
+class BaseSMSProvider:
+    """
+    Sends messages through one SMS gateway. ``max_concurrency`` caps the
+    calls in flight and ``batch_size`` the messages per ``send_many`` call;
+    both can be overridden in ``SMS_PROVIDER_OPTIONS``.
+    """
+    max_concurrency = 4
+    batch_size = 1
+
+    def __init__(self, max_concurrency=None, batch_size=None, **options):
+        self.max_concurrency = max_concurrency or self.max_concurrency
+        self.batch_size = batch_size or self.batch_size
+        self.options = options
+
+    def send(self, phone_number, body):
+        """Send one message and return the provider's message id"""
+        raise NotImplementedError('SMS providers must implement send()')
+
+    def send_many(self, messages):
+        """
+        Send ``(phone_number, body)`` pairs and return one result per
+        message: a message id, or the exception it failed with.
+        """
+        results = []
+        for phone_number, body in messages:
+            try:
+                results.append(self.send(phone_number, body))
+            except Exception as error:
+                results.append(error)
+        return results
+
+
+class ConsoleSMSProvider(BaseSMSProvider):
+    """
+    Development provider: prints the message instead of sending it. It
+    refuses to start outside ``DEBUG`` so a deployment that forgot to set
+    ``SMS_PROVIDER`` does not write OTPs to its logs.
+    """
+
+    def __init__(self, **options):
+        if not settings.DEBUG:
+            raise ImproperlyConfigured('ConsoleSMSProvider prints messages and only runs with DEBUG; set SMS_PROVIDER.')
+        super().__init__(**options)
+
+    def send(self, phone_number, body):
+        print(f'[DEV] SMS to {phone_number}: {body}')
+        return ''
+
+
+class FakeSMSProvider(BaseSMSProvider):
+    """
+    Test provider. Sent messages are appended to ``FakeSMSProvider.outbox``;
+    ``delay`` simulates gateway latency and ``fail`` makes every call
+    raise ``SMSProviderError``.
+    """
+    outbox = []
+    _lock = threading.Lock()
+
+    def send(self, phone_number, body):
+        delay = self.options.get('delay', 0)
+        if delay:
+            threading.Event().wait(delay)
+        if self.options.get('fail'):
+            raise SMSProviderError('fake provider failure')
+        with self._lock:
+            self.outbox.append((phone_number, body))
+            return f'fake-{len(self.outbox)}'
+
+
+def get_sms_provider():
+    """A new instance of ``SMS_PROVIDER`` built with ``SMS_PROVIDER_OPTIONS``"""
+    provider_class = import_string(getattr(settings, 'SMS_PROVIDER', 'users.sms.ConsoleSMSProvider'))
+    return provider_class(**getattr(settings, 'SMS_PROVIDER_OPTIONS', {}))
+
+
+class SMSDispatcher:
+    """Claims due outbox rows and sends them; all database work stays on the calling thread"""
+
+    def __init__(self, provider=None):
+        self.provider = provider or get_sms_provider()
+        self.batch_size = getattr(settings, 'SMS_BATCH_SIZE', 50)
+        self.max_attempts = getattr(settings, 'SMS_MAX_ATTEMPTS', 5)
+        self.retry_delay = getattr(settings, 'SMS_RETRY_DELAY', 30)
+        self.lease = timedelta(seconds=getattr(settings, 'SMS_LEASE_SECONDS', 60))
+
+    def dispatch_pending(self):
+        """Send every due message, batch by batch; returns how many were sent"""
+        sent = 0
+        with ThreadPoolExecutor(max_workers=self.provider.max_concurrency, thread_name_prefix='sms') as pool:
+            while True:
+                messages = self.claim()
+                if not messages:
+                    return sent
+                sent += self.send(messages, pool)
+
+    def claim(self):
+        """Lease up to ``batch_size`` due messages to this dispatcher"""
+        from .models import SMSMessage
+
+        now = timezone.now()
+        due = SMSMessage.objects.filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+        ids = list(due.order_by('next_attempt_at').values_list('pk', flat=True)[:self.batch_size])
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        # Rows another dispatcher claimed in the meantime no longer match
+        due.filter(pk__in=ids).update(status='sending', claim_token=token, next_attempt_at=now + self.lease)
+        return list(SMSMessage.objects.filter(claim_token=token, status='sending'))
+
+    def send(self, messages, pool):
+        """Send claimed messages through the provider and record the outcome"""
+        from .models import SMSMessage
+
+        size = self.provider.batch_size
+        chunks = [messages[start:start + size] for start in range(0, len(messages), size)]
+        futures = [
+            pool.submit(self.provider.send_many, [(message.phone_number, message.body) for message in chunk])
+            for chunk in chunks
+        ]
+        tokens = {message.claim_token for message in messages}
+        sent = 0
+        for chunk, future in zip(chunks, futures):
+            try:
+                results = future.result()
+            except Exception as error:
+                results = [error] * len(chunk)
+            now = timezone.now()
+            for message, result in zip(chunk, results):
+                message.attempts += 1
+                message.claim_token = ''
+                if isinstance(result, Exception):
+                    self._failed(message, result, now)
+                else:
+                    message.status, message.sent_at = 'sent', now
+                    message.provider_message_id = result or ''
+                    sent += 1
+        # Only rows still leased to this dispatcher; a lease that ran out
+        # belongs to whichever dispatcher claimed the row since
+        updated = SMSMessage.objects.filter(claim_token__in=tokens).bulk_update(messages, [
+            'status', 'attempts', 'claim_token', 'next_attempt_at', 'sent_at', 'provider_message_id', 'last_error',
+        ])
+        if updated < len(messages):
+            logger.warning('%d SMS results dropped: their lease expired while sending', len(messages) - updated)
+        return sent
+
+    def send_now(self, message):
+        """Claim and send one stored message inline"""
+        from .models import SMSMessage
+
+        token = uuid.uuid4().hex
+        SMSMessage.objects.filter(pk=message.pk, status='pending').update(
+            status='sending', claim_token=token, next_attempt_at=timezone.now() + self.lease,
+        )
+        claimed = list(SMSMessage.objects.filter(pk=message.pk, claim_token=token))
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return self.send(claimed, pool) if claimed else 0
+
+    def _failed(self, message, error, now):
+        message.last_error = str(error)
+        if message.attempts >= self.max_attempts:
+            message.status = 'failed'
+            logger.error('SMS %s to %s failed after %d attempts: %s', message.pk, message.phone_number, message.attempts, error)
+        else:
+            message.status = 'pending'
+            message.next_attempt_at = now + timedelta(seconds=self.retry_delay * 2 ** (message.attempts - 1))
+
+
+class SMSWorker:
+    """
+    Background thread draining the outbox. ``wake`` starts it on first use
+    and triggers an immediate pass; it also polls every
+    ``SMS_POLL_INTERVAL`` seconds so retries go out when they fall due.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def wake(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.loop, name='sms-worker', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def loop(self):
+        while True:
+            self._wake.wait(getattr(settings, 'SMS_POLL_INTERVAL', 5))
+            self._wake.clear()
+            try:
+                SMSDispatcher().dispatch_pending()
+            except Exception:
+                logger.exception('SMS dispatch failed')
+            finally:
+                close_old_connections()
+
+
+sms_worker = SMSWorker()
+
+
+def send_sms(phone_number, body):
+    """Queue a message and return its outbox row without waiting for the provider"""
+    from .models import SMSMessage
+
+    message = SMSMessage.objects.create(phone_number=phone_number, body=body)
+    if getattr(settings, 'SMS_ASYNC', True):
+        transaction.on_commit(sms_worker.wake)
+    else:
+        SMSDispatcher().send_now(message)
+    return message
+
+
+def send_otp(phone_number, otp_code):
+    return send_sms(phone_number, OTP_MESSAGE.format(code=otp_code))
+
+
+async def asend_otp(phone_number, otp_code):
+    # One thread hop: on_commit needs the sync connection state
+    return await sync_to_async(send_otp)(phone_number, otp_code)
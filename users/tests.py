@@ -1,3 +1,228 @@
-from django.test import TestCase
+import contextlib
+import datetime
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import use_async_views
+from .models import OTPVerification, SMSMessage, User
+from .otp import DatabaseOTPBackend, OTPNotFound, get_otp_backend
+from .purges import ExpiredOTPPurge, SMSOutboxPurge
+from .sms import ConsoleSMSProvider, FakeSMSProvider, SMSDispatcher, send_sms
+
+PHONE = '09121112233'
+
+
+class OTPBackendTestsMixin:
+    """Behaviour every OTP backend shares; subclasses pick the backend"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.backend = get_otp_backend()
+
+    def test_issued_code_verifies_once(self):
+        otp = self.backend.issue(PHONE)
+
+        self.assertEqual(self.backend.latest(PHONE).otp_code, otp.otp_code)
+        self.assertGreater(self.backend.time_remaining(PHONE), 0)
+        self.assertEqual(self.backend.verify(PHONE, otp.otp_code)[0], True)
+        with self.assertRaises(OTPNotFound):
+            self.backend.verify(PHONE, otp.otp_code)
+
+    def test_wrong_guesses_are_limited(self):
+        otp = self.backend.issue(PHONE)
+        wrong = f'{(int(otp.otp_code) + 1) % 10 ** 6:06d}'
+
+        self.assertEqual(self.backend.verify(PHONE, wrong), (False, 'کد تأیید اشتباه. 2 تلاش باقی مانده'))
+        self.backend.verify(PHONE, wrong)
+        self.backend.verify(PHONE, wrong)
+
+        self.assertEqual(self.backend.verify(PHONE, otp.otp_code), (False, 'تعداد تلاش‌های مجاز تمام شده'))
+
+    def test_new_code_replaces_the_pending_one(self):
+        with mock.patch.object(self.backend, 'new_code', side_effect=['111111', '222222']):
+            self.backend.issue(PHONE)
+            self.backend.issue(PHONE)
+
+        self.assertFalse(self.backend.verify(PHONE, '111111')[0])
+        self.assertTrue(self.backend.verify(PHONE, '222222')[0])
+
+    def test_requests_are_rate_limited(self):
+        for _ in range(3):
+            self.backend.issue(PHONE)
+
+        with self.assertRaises(ValueError):
+            self.backend.issue(PHONE)
+        self.backend.issue('09121112234')
+
+    def test_async_methods_share_the_codes(self):
+        with mock.patch.object(self.backend, 'new_code', return_value='111111'):
+            async_to_sync(self.backend.aissue)(PHONE)
+
+        self.assertEqual(self.backend.latest(PHONE).otp_code, '111111')
+        self.assertGreater(async_to_sync(self.backend.atime_remaining)(PHONE), 0)
+        self.assertEqual(async_to_sync(self.backend.averify)(PHONE, '222222')[0], False)
+        self.assertEqual(async_to_sync(self.backend.averify)(PHONE, '111111')[0], True)
+        with self.assertRaises(OTPNotFound):
+            async_to_sync(self.backend.averify)(PHONE, '111111')
+
+    def test_login_flow_goes_through_the_backend(self):
+        self.assertLogsIn()
+
+    def test_async_login_flow_goes_through_the_backend(self):
+        with use_async_views():
+            self.assertLogsIn()
+
+    def assertLogsIn(self):
+        User.objects.create(phone_number=PHONE)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.post(reverse('users:phone_entry'), {'phone_number': PHONE})
+            self.assertRedirects(response, reverse('users:otp_verification'), fetch_redirect_response=False)
+            code = self.backend.latest(PHONE).otp_code
+            response = self.client.post(reverse('users:otp_verification'), {'phone_number': PHONE, 'otp_code': code})
+
+        self.assertRedirects(response, reverse('users:user_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), User.objects.get(phone_number=PHONE).pk)
+
+
+@override_settings(OTP_BACKEND='users.otp.DatabaseOTPBackend')
+class DatabaseOTPBackendTests(OTPBackendTestsMixin, TestCase):
+    def test_guess_is_one_conditional_update(self):
+        otp = self.backend.issue(PHONE)
+
+        with self.assertNumQueries(2):
+            self.backend.verify(PHONE, otp.otp_code)
+
+        otp.refresh_from_db()
+        self.assertEqual((otp.attempts, otp.is_used, otp.is_verified), (1, True, True))
+
+
+@override_settings(OTP_BACKEND='users.otp.CacheOTPBackend')
+class CacheOTPBackendTests(OTPBackendTestsMixin, TestCase):
+    def test_codes_never_touch_the_database(self):
+        with self.assertNumQueries(0):
+            otp = self.backend.issue(PHONE)
+            self.backend.verify(PHONE, otp.otp_code)
+
+        self.assertFalse(OTPVerification.objects.exists())
+
+
+class ExpiredOTPPurgeTests(TestCase):
+    def test_keeps_pending_codes_and_codes_inside_the_rate_window(self):
+        now = timezone.now()
+        backend = DatabaseOTPBackend()
+        old = backend.issue(PHONE)
+        pending = backend.issue('09121112234')
+        recent = backend.issue('09121112235')
+        OTPVerification.objects.filter(pk=recent.pk).update(is_used=True)
+        OTPVerification.objects.filter(pk=old.pk).update(created_at=now - datetime.timedelta(days=2), expires_at=now)
+        OTPVerification.objects.filter(pk=pending.pk).update(created_at=now - datetime.timedelta(days=2))
+
+        result = ExpiredOTPPurge(days=0).run()
+
+        self.assertEqual(result.rows, 1)
+        self.assertEqual(set(OTPVerification.objects.values_list('pk', flat=True)), {pending.pk, recent.pk})
+
+
+@override_settings(SMS_PROVIDER='users.sms.FakeSMSProvider', SMS_PROVIDER_OPTIONS={}, SMS_ASYNC=True)
+class SMSOutboxTests(TestCase):
+    def setUp(self):
+        FakeSMSProvider.outbox.clear()
+
+    def test_login_queues_the_code_without_calling_the_provider(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('users:phone_entry'), {'phone_number': PHONE})
+
+        message = SMSMessage.objects.get()
+        self.assertEqual(message.status, 'pending')
+        self.assertIn(get_otp_backend().latest(PHONE).otp_code, message.body)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(FakeSMSProvider.outbox, [])
+
+    def test_dispatch_sends_due_messages_in_batches(self):
+        for index in range(5):
+            send_sms(f'0912000000{index}', 'hello')
+
+        with override_settings(SMS_BATCH_SIZE=2):
+            sent = SMSDispatcher(FakeSMSProvider(batch_size=2)).dispatch_pending()
+
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(FakeSMSProvider.outbox), 5)
+        self.assertFalse(SMSMessage.objects.exclude(status='sent').exists())
+        self.assertFalse(SMSMessage.objects.filter(provider_message_id='').exists())
+
+    @override_settings(SMS_MAX_ATTEMPTS=2, SMS_RETRY_DELAY=30)
+    def test_failures_back_off_then_give_up(self):
+        message = send_sms(PHONE, 'hello')
+        dispatcher = SMSDispatcher(FakeSMSProvider(fail=True))
+
+        self.assertEqual(dispatcher.dispatch_pending(), 0)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreater(message.next_attempt_at, timezone.now() + datetime.timedelta(seconds=25))
+        self.assertEqual(dispatcher.dispatch_pending(), 0, 'not due yet')
+
+        SMSMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        with self.assertLogs('users.sms', 'ERROR'):
+            dispatcher.dispatch_pending()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('failed', 2))
+        self.assertIn('fake provider failure', message.last_error)
+
+    def test_expired_claims_are_sent_again(self):
+        message = send_sms(PHONE, 'hello')
+        SMSMessage.objects.filter(pk=message.pk).update(
+            status='sending', claim_token='dead-worker', next_attempt_at=timezone.now() - datetime.timedelta(seconds=1),
+        )
+
+        self.assertEqual(SMSDispatcher(FakeSMSProvider()).dispatch_pending(), 1)
+        self.assertEqual(FakeSMSProvider.outbox, [(PHONE, 'hello')])
+
+    def test_results_after_an_expired_lease_are_dropped(self):
+        message = send_sms(PHONE, 'hello')
+        dispatcher = SMSDispatcher(FakeSMSProvider())
+        claimed = dispatcher.claim()
+        # The lease ran out and another dispatcher took the message over
+        SMSMessage.objects.filter(pk=message.pk).update(claim_token='other-worker')
+
+        with ThreadPoolExecutor(max_workers=1) as pool, self.assertLogs('users.sms', 'WARNING'):
+            dispatcher.send(claimed, pool)
+
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.claim_token, message.attempts), ('sending', 'other-worker', 0))
+
+    def test_leased_messages_are_not_claimed_twice(self):
+        send_sms(PHONE, 'hello')
+
+        self.assertEqual(len(SMSDispatcher(FakeSMSProvider()).claim()), 1)
+        self.assertEqual(SMSDispatcher(FakeSMSProvider()).claim(), [])
+
+    @override_settings(SMS_ASYNC=False)
+    def test_inline_mode_sends_before_returning(self):
+        message = send_sms(PHONE, 'hello')
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'sent')
+        self.assertEqual(FakeSMSProvider.outbox, [(PHONE, 'hello')])
+
+    def test_console_provider_refuses_to_run_without_debug(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ConsoleSMSProvider()
+        with override_settings(DEBUG=True):
+            self.assertEqual(ConsoleSMSProvider().max_concurrency, 4)
+
+    def test_purge_keeps_pending_messages(self):
+        sent = send_sms(PHONE, 'sent')
+        pending = send_sms(PHONE, 'pending')
+        SMSMessage.objects.filter(pk=sent.pk).update(status='sent')
+
+        self.assertEqual(SMSOutboxPurge(days=0).run().rows, 1)
+        self.assertEqual(list(SMSMessage.objects.values_list('pk', flat=True)), [pending.pk])
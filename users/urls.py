@@ -1,13 +1,14 @@
 # users/urls.py
 from django.urls import path
+from core.asyncviews import pick
 from . import views
 
 app_name = 'users'
 
 urlpatterns = [
     # # Authentication URLs
-    path('login/', views.PhoneEntryView.as_view(), name='phone_entry'),
-    path('verify/', views.OTPVerificationView.as_view(), name='otp_verification'),  
+    path('login/', pick(views.PhoneEntryView, views.AsyncPhoneEntryView).as_view(), name='phone_entry'),
+    path('verify/', pick(views.OTPVerificationView, views.AsyncOTPVerificationView).as_view(), name='otp_verification'),  
     path('register/', views.UserRegistrationView.as_view(), name='user_registration'),
 
     # AJAX endpoint for OTP resend
@@ -1,11 +1,16 @@
 # Import all views to keep URLs clean
-from .auth import PhoneEntryView, OTPVerificationView, ResendOTPView, UserRegistrationView, UserLogoutView
+from .auth import (
+    PhoneEntryView, OTPVerificationView, AsyncPhoneEntryView, AsyncOTPVerificationView,
+    ResendOTPView, UserRegistrationView, UserLogoutView,
+)
 from .dashboard import UserDashboardView
 
 __all__ = [
     # auth
     'PhoneEntryView',
     'OTPVerificationView', 
+    'AsyncPhoneEntryView',
+    'AsyncOTPVerificationView',
     'ResendOTPView',
     'UserRegistrationView',
     'UserLogoutView',
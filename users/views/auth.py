@@ -3,13 +3,16 @@ from django.views.generic import FormView
 from django.contrib import messages
 from django.urls import reverse_lazy
 from django.utils import timezone
-from django.contrib.auth import login, logout
+from django.contrib.auth import alogin, login, logout
 from django.http import JsonResponse
 from datetime import timedelta
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views import View
+from core.asyncviews import AsyncViewMixin
 from users.forms import PhoneNumberForm, OTPVerificationForm, UserRegistrationForm
-from users.models import User, OTPVerification
+from users.models import User
+from users.otp import OTPNotFound, get_otp_backend
+from users.sms import asend_otp, send_otp
 
 
 class PhoneEntryView(FormView):
@@ -32,63 +35,64 @@ class PhoneEntryView(FormView):
         """Generate OTP and determine login vs register flow"""
         phone_number = form.cleaned_data['phone_number']
         
-        # CAPTURE NEXT URL FROM REQUEST - IMPORTANT FIX
-        next_url = self.request.GET.get('next') or self.request.POST.get('next')
-
         try:
             # Generate OTP with user status detection
-            otp, user_exists = OTPVerification.generate_otp_with_user_status(phone_number)
-            
-            # Store session data for next steps
-            self.request.session['phone_number'] = phone_number
-            self.request.session['user_exists'] = user_exists
-            self.request.session['otp_generated_at'] = timezone.now().isoformat()
+            otp = get_otp_backend().issue(phone_number)
+            user_exists = User.objects.filter(phone_number=phone_number).exists()
             
-            # STORE NEXT URL IN SESSION - IMPORTANT FIX
-            if next_url:
-                self.request.session['next_url'] = next_url
-
             # Send OTP via SMS
             self._send_otp_sms(phone_number, otp.otp_code)
-            
-            # User-specific success messages
-            if user_exists:
-                messages.success(
-                    self.request,
-                    f'کد تأیید برای ورود به حساب شما به {phone_number} ارسال شد'
-                )
-            else:
-                messages.success(
-                    self.request,
-                    f'کد تأیید برای ساخت حساب جدید به {phone_number} ارسال شد'
-                )
-            
-            return super().form_valid(form)
-            
-        except ValueError as e:
-            # Rate limiting or validation errors from model
-            messages.error(self.request, str(e))
-            return self.form_invalid(form)
         except Exception as e:
+            return self.otp_failed(form, e)
+        
+        return self.otp_sent(form, phone_number, user_exists)
+    
+    def otp_sent(self, form, phone_number, user_exists):
+        """Store the login state in the session and move on to verification"""
+        # CAPTURE NEXT URL FROM REQUEST - IMPORTANT FIX
+        next_url = self.request.GET.get('next') or self.request.POST.get('next')
+        
+        # Store session data for next steps
+        self.request.session['phone_number'] = phone_number
+        self.request.session['user_exists'] = user_exists
+        self.request.session['otp_generated_at'] = timezone.now().isoformat()
+        
+        # STORE NEXT URL IN SESSION - IMPORTANT FIX
+        if next_url:
+            self.request.session['next_url'] = next_url
+        
+        # User-specific success messages
+        if user_exists:
+            messages.success(
+                self.request,
+                f'کد تأیید برای ورود به حساب شما به {phone_number} ارسال شد'
+            )
+        else:
+            messages.success(
+                self.request,
+                f'کد تأیید برای ساخت حساب جدید به {phone_number} ارسال شد'
+            )
+        
+        return super().form_valid(form)
+    
+    def otp_failed(self, form, error):
+        if isinstance(error, ValueError):
+            # Rate limiting or validation errors from model
+            messages.error(self.request, str(error))
+        else:
             # Unexpected errors (SMS service, etc.)
             messages.error(
                 self.request,
                 'خطا در ارسال کد تأیید. لطفاً مجدداً تلاش کنید'
             )
-            return self.form_invalid(form)
+        return self.form_invalid(form)
     
     def _send_otp_sms(self, phone_number, otp_code):
         """
-        Send OTP via SMS service
-        TODO: Implement your SMS provider (Kavenegar, etc.)
+        Queue the OTP SMS; the provider is called by the background
+        SMS worker so the response does not wait for it
         """
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f'OTP for {phone_number}: {otp_code}')
-        
-        # For development - remove in production
-        print(f'[DEV] OTP Code: {otp_code}')
-        
+        send_otp(phone_number, otp_code)
         return True
     
     def get_context_data(self, **kwargs):
@@ -132,20 +136,13 @@ class OTPVerificationView(FormView):
         """Verify OTP and handle user authentication"""
         phone_number = form.cleaned_data['phone_number']
         entered_otp = form.cleaned_data['otp_code']
-        print(f"Before setting session: {dict(self.request.session)}")
-        self.request.session['otp_verified'] = True
-        self.request.session['phone_number'] = phone_number
-        print(f"After setting session: {dict(self.request.session)}")
+        self._start_verification(phone_number)
         try:
-            # Get the latest OTP for this phone number
-            otp_instance = OTPVerification.get_latest_otp(phone_number)
-            
-            if not otp_instance:
-                messages.error(self.request, 'کد تأیید یافت نشد. لطفاً مجدداً درخواست دهید')
-                return redirect('users:phone_entry')
-            
-            # Verify the OTP
-            is_valid, message = otp_instance.verify_otp(entered_otp)
+            # Verify the pending OTP for this phone number
+            try:
+                is_valid, message = get_otp_backend().verify(phone_number, entered_otp)
+            except OTPNotFound:
+                return self._otp_not_found()
             
             if is_valid:
                 # OTP verified successfully
@@ -167,46 +164,59 @@ class OTPVerificationView(FormView):
             messages.error(self.request, 'خطا در تأیید کد. لطفاً مجدداً تلاش کنید')
             return self.form_invalid(form)
     
+    def _start_verification(self, phone_number):
+        self.request.session['otp_verified'] = True
+        self.request.session['phone_number'] = phone_number
+    
+    def _otp_not_found(self):
+        messages.error(self.request, 'کد تأیید یافت نشد. لطفاً مجدداً درخواست دهید')
+        return redirect('users:phone_entry')
+    
     def _login_existing_user(self, phone_number):
         """Login existing user after OTP verification"""
         try:
             user = User.objects.get(phone_number=phone_number)
-            
-            # Update phone verification status
-            if not user.is_phone_verified:
-                user.is_phone_verified = True
-                user.save()
-            
-            # Login user
-            login(self.request, user)
-
-            # Get next URL BEFORE clearing session
-            next_url = self.request.session.get('next_url')
-            
-            # Clear session data
-            self._clear_auth_session()
-            
-            # Welcome message
-            messages.success(
-                self.request, 
-                f'خوش آمدید {user.get_full_name()}!'
-            )
-            
-            # IMPROVED REDIRECT LOGIC - IMPORTANT FIX
-            if next_url:
-                # Don't redirect directly to POST endpoints
-                if '/cart/add/' in next_url:
-                    # Redirect to cart page instead of direct add action
-                    messages.info(self.request, 'لطفاً محصول مورد نظر را مجدداً به سبد خرید اضافه کنید')
-                    return redirect('orders:cart')
-                else:
-                    return redirect(next_url)
-            
-            return redirect('users:user_dashboard')
-            
         except User.DoesNotExist:
-            messages.error(self.request, 'کاربر یافت نشد')
-            return redirect('users:phone_entry')
+            return self._user_not_found()
+        
+        # Update phone verification status
+        if not user.is_phone_verified:
+            user.is_phone_verified = True
+            user.save()
+        
+        # Login user
+        login(self.request, user)
+        return self._logged_in(user)
+    
+    def _logged_in(self, user):
+        """Clear the login state and redirect a freshly logged in user"""
+        # Get next URL BEFORE clearing session
+        next_url = self.request.session.get('next_url')
+        
+        # Clear session data
+        self._clear_auth_session()
+        
+        # Welcome message
+        messages.success(
+            self.request, 
+            f'خوش آمدید {user.get_full_name()}!'
+        )
+        
+        # IMPROVED REDIRECT LOGIC - IMPORTANT FIX
+        if next_url:
+            # Don't redirect directly to POST endpoints
+            if '/cart/add/' in next_url:
+                # Redirect to cart page instead of direct add action
+                messages.info(self.request, 'لطفاً محصول مورد نظر را مجدداً به سبد خرید اضافه کنید')
+                return redirect('orders:cart')
+            else:
+                return redirect(next_url)
+        
+        return redirect('users:user_dashboard')
+    
+    def _user_not_found(self):
+        messages.error(self.request, 'کاربر یافت نشد')
+        return redirect('users:phone_entry')
     
     def _handle_new_user_registration(self, phone_number):
         """Handle new user registration flow"""
@@ -243,11 +253,10 @@ class OTPVerificationView(FormView):
         else:
             masked_phone = phone_number
         
-        # Get OTP expiration info
-        otp_instance = OTPVerification.get_latest_otp(phone_number)
-        time_remaining = 0
-        if otp_instance and not otp_instance.is_expired:
-            time_remaining = otp_instance.get_time_remaining()
+        # Get OTP expiration info (async views load it beforehand)
+        time_remaining = context.get('time_remaining')
+        if time_remaining is None:
+            time_remaining = get_otp_backend().time_remaining(phone_number)
         
         context.update({
             'page_title': 'تأیید شماره موبایل',
@@ -262,6 +271,87 @@ class OTPVerificationView(FormView):
         return context
 
 
+class AsyncPhoneEntryView(AsyncViewMixin, PhoneEntryView):
+    """``PhoneEntryView`` on the async ORM, for ASGI"""
+    
+    async def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+    
+    async def post(self, request, *args, **kwargs):
+        form = self.get_form()
+        if not form.is_valid():
+            return self.form_invalid(form)
+        
+        phone_number = form.cleaned_data['phone_number']
+        try:
+            otp = await get_otp_backend().aissue(phone_number)
+            user_exists = await User.objects.filter(phone_number=phone_number).aexists()
+            await asend_otp(phone_number, otp.otp_code)
+        except Exception as e:
+            return self.otp_failed(form, e)
+        
+        return self.otp_sent(form, phone_number, user_exists)
+    
+    async def put(self, *args, **kwargs):
+        return await self.post(*args, **kwargs)
+
+
+class AsyncOTPVerificationView(AsyncViewMixin, OTPVerificationView):
+    """``OTPVerificationView`` on the async ORM, for ASGI"""
+    
+    async def get(self, request, *args, **kwargs):
+        await self._load_time_remaining()
+        return super().get(request, *args, **kwargs)
+    
+    async def post(self, request, *args, **kwargs):
+        form = self.get_form()
+        if not form.is_valid():
+            return await self._aform_invalid(form)
+        
+        phone_number = form.cleaned_data['phone_number']
+        self._start_verification(phone_number)
+        try:
+            try:
+                is_valid, message = await get_otp_backend().averify(phone_number, form.cleaned_data['otp_code'])
+            except OTPNotFound:
+                return self._otp_not_found()
+            
+            if not is_valid:
+                messages.error(self.request, message)
+                return await self._aform_invalid(form)
+            if self.request.session.get('user_exists', False):
+                return await self._alogin_existing_user(phone_number)
+            return self._handle_new_user_registration(phone_number)
+        
+        except Exception as e:
+            messages.error(self.request, 'خطا در تأیید کد. لطفاً مجدداً تلاش کنید')
+            return await self._aform_invalid(form)
+    
+    async def put(self, *args, **kwargs):
+        return await self.post(*args, **kwargs)
+    
+    async def _alogin_existing_user(self, phone_number):
+        try:
+            user = await User.objects.aget(phone_number=phone_number)
+        except User.DoesNotExist:
+            return self._user_not_found()
+        
+        if not user.is_phone_verified:
+            user.is_phone_verified = True
+            await user.asave()
+        
+        await alogin(self.request, user)
+        return self._logged_in(user)
+    
+    async def _aform_invalid(self, form):
+        await self._load_time_remaining()
+        return self.form_invalid(form)
+    
+    async def _load_time_remaining(self):
+        phone_number = self.request.session.get('phone_number')
+        self.extra_context = {'time_remaining': await get_otp_backend().atime_remaining(phone_number)}
+
+
 class ResendOTPView(FormView):
     """
     AJAX view to resend OTP code
@@ -283,8 +373,8 @@ class ResendOTPView(FormView):
             })
         
         try:
-            # Generate new OTP using simple method
-            otp = OTPVerification.generate_otp(phone_number)
+            # Generate new OTP through the configured backend
+            otp = get_otp_backend().issue(phone_number)
             
             # Send SMS
             self._send_otp_sms(phone_number, otp.otp_code)
@@ -310,10 +400,8 @@ class ResendOTPView(FormView):
             })
     
     def _send_otp_sms(self, phone_number, otp_code):
-        """Send OTP via SMS - same as PhoneEntryView"""
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f'Resend OTP for {phone_number}: {otp_code}')
+        """Queue the OTP SMS - same as PhoneEntryView"""
+        send_otp(phone_number, otp_code)
         return True
 
 